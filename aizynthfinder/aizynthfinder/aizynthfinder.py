@@ -15,13 +15,14 @@ from aizynthfinder.analysis import (
 )
 from aizynthfinder.chem import FixedRetroReaction, Molecule, TreeMolecule
 from aizynthfinder.context.config import Configuration
-from aizynthfinder.context.policy import BondFilter
+from aizynthfinder.context.policy import BondFilter, TemplateBasedExpansionStrategy
 from aizynthfinder.context.scoring import BrokenBondsScorer, CombinedScorer
 from aizynthfinder.reactiontree import ReactionTreeFromExpansion
 from aizynthfinder.search.andor_trees import AndOrSearchTreeBase
 from aizynthfinder.search.mcts import MctsSearchTree
 from aizynthfinder.utils.exceptions import MoleculeException
 from aizynthfinder.utils.loading import load_dynamic_class
+from aizynthfinder.utils.profiling import phase_profiler
 
 # This must be imported first to setup logging for rdkit, tensorflow etc
 from aizynthfinder.utils.logging import logger
@@ -144,7 +145,15 @@ class AiZynthFinder:
             "first_solution_iteration": self.search_stats.get(
                 "first_solution_iteration", 0
             ),
+            "iterations_per_second": self.search_stats.get("iterations_per_second", 0),
         }
+        for key in ["prediction_cache_hits", "prediction_cache_misses"]:
+            stats[key] = self.search_stats.get(key, 0)
+        nlookups = stats["prediction_cache_hits"] + stats["prediction_cache_misses"]
+        stats["prediction_cache_hit_rate"] = (
+            stats["prediction_cache_hits"] / nlookups if nlookups else 0.0
+        )
+        stats["phase_profile"] = self.search_stats.get("phase_profile", {})
         stats.update(self.analysis.tree_statistics())
         return stats
 
@@ -209,8 +218,11 @@ class AiZynthFinder:
         # This is for type checking, prepare_tree is creating it.
         assert self.tree is not None
         self.search_stats = {"returned_first": False, "iterations": 0}
-        
-        
+        cache_stats0 = TemplateBasedExpansionStrategy.prediction_cache_stats()
+        profiler = phase_profiler()
+        if self.config.search.profile_phases:
+            profiler.enable()
+
         time0 = time.time()
         i = 1
         self._logger.debug("Starting search")
@@ -219,36 +231,48 @@ class AiZynthFinder:
         if show_progress:
             pbar = tqdm(total=self.config.search.iteration_limit, leave=False)
 
+        try:
+            while (
+                time_past < self.config.search.time_limit
+                and i <= self.config.search.iteration_limit
+            ):
+                if show_progress:
+                    pbar.update(1)
+                self.search_stats["iterations"] += 1
+
+                try:
+                    is_solved = self.tree.one_iteration()
+                except StopIteration:
+                    break
+
+                if is_solved and "first_solution_time" not in self.search_stats:
+                    self.search_stats["first_solution_time"] = time.time() - time0
+                    self.search_stats["first_solution_iteration"] = i
+
+                if self.config.search.return_first and is_solved:
+                    self._logger.debug("Found first solved route")
+                    self.search_stats["returned_first"] = True
+                    break
+                i = i + 1
+                time_past = time.time() - time0
+        finally:
+            profile_enabled = profiler.enabled
+            profiler.disable()
 
-        while (
-            time_past < self.config.search.time_limit
-            and i <= self.config.search.iteration_limit
-        ):
-            if show_progress:
-                pbar.update(1)
-            self.search_stats["iterations"] += 1
-
-            try:
-                is_solved = self.tree.one_iteration()
-            except StopIteration:
-                break
-            
-            if is_solved and "first_solution_time" not in self.search_stats:
-                self.search_stats["first_solution_time"] = time.time() - time0
-                self.search_stats["first_solution_iteration"] = i
-
-            if self.config.search.return_first and is_solved:
-                self._logger.debug("Found first solved route")
-                self.search_stats["returned_first"] = True
-                break
-            i = i + 1
-            time_past = time.time() - time0
-        
         if show_progress:
             pbar.close()
         time_past = time.time() - time0
         self._logger.debug("Search completed")
         self.search_stats["time"] = time_past
+        self.search_stats["iterations_per_second"] = (
+            self.search_stats["iterations"] / time_past if time_past > 0 else 0
+        )
+        cache_stats = TemplateBasedExpansionStrategy.prediction_cache_stats()
+        for key in ["hits", "misses"]:
+            self.search_stats[f"prediction_cache_{key}"] = (
+                cache_stats[key] - cache_stats0[key]
+            )
+        self.search_stats["phase_profile"] = profiler.stats() if profile_enabled else {}
         return time_past
 
     def _setup_focussed_bonds(self, target_mol: Molecule) -> None:
@@ -161,8 +161,8 @@ class TreeAnalysis:
         assert isinstance(self.search_tree, MctsSearchTree)
         # This is to keep backwards compatibility, this should be investigate further
         if repr(self.scorers[0]) == "state score":
-            return list(self.search_tree.graph())
-        return [node for node in self.search_tree.graph() if not node.children]
+            return self.search_tree.nodes()
+        return self.search_tree.leaves()
 
     def _pareto_rank_sort(
         self,
@@ -268,7 +268,7 @@ class TreeAnalysis:
         top_nodes = self._top_nodes()
         assert isinstance(top_nodes[0], MctsNode)
         top_states = [node.state for node in top_nodes]  # type: ignore
-        nodes = list(self.search_tree.graph())
+        nodes = self.search_tree.nodes()
         mols_in_stock = self._top_ranked_join(
             ", ".join(
                 mol.smiles
@@ -5,6 +5,7 @@ from aizynthfinder.chem.mol import (
     MoleculeException,
     TreeMolecule,
     UniqueMolecule,
+    fingerprint_matrix,
     none_molecule,
 )
 from aizynthfinder.chem.reaction import (
@@ -2,17 +2,20 @@
 """
 from __future__ import annotations
 
+import functools
 from typing import TYPE_CHECKING
 
 import numpy as np
-from rdkit import Chem, DataStructs
-from rdkit.Chem import AllChem, Descriptors
+from rdkit import Chem
+from rdkit.Chem import AllChem, Descriptors, rdFingerprintGenerator
 
 from aizynthfinder.utils.bonds import sort_bonds
 from aizynthfinder.utils.exceptions import MoleculeException
+from aizynthfinder.utils.profiling import phase_profiler
 
 if TYPE_CHECKING:
     from aizynthfinder.utils.type_utils import (
+        Any,
         Callable,
         Dict,
         List,
@@ -20,7 +23,6 @@ if TYPE_CHECKING:
         RdMol,
         Sequence,
         Tuple,
-        Union,
     )
 
 
@@ -61,7 +63,7 @@ class Molecule:
 
         self._inchi_key: Optional[str] = None
         self._inchi: Optional[str] = None
-        self._fingerprints: Dict[Union[Tuple[int, int], Tuple[int]], np.ndarray] = {}
+        self._fingerprints: Dict[Tuple[int, int, bool], np.ndarray] = {}
         self._is_sanitized: bool = False
 
         # Atom mapping -> atom index dictionary
@@ -111,7 +113,8 @@ class Molecule:
         """
         if not self._inchi_key:
             self.sanitize(raise_exception=False)
-            self._inchi_key = Chem.MolToInchiKey(self.rd_mol)
+            with phase_profiler().phase("inchi key"):
+                self._inchi_key = Chem.MolToInchiKey(self.rd_mol)
             if self._inchi_key is None:
                 raise MoleculeException("Could not make InChI key")
         return self._inchi_key
@@ -158,23 +161,32 @@ class Molecule:
         """
         Returns the Morgan fingerprint of the molecule
 
+        The fingerprint is cached in bit-packed form, see `fingerprint_bits`.
+
         :param radius: the radius of the fingerprint
         :param nbits: the length of the fingerprint
         :param chiral: if True, include chirality information
-        :return: the fingerprint
+        :return: the fingerprint as a vector of floats
         """
-        key = radius, nbits
+        return self.fingerprint_bits(radius, nbits, chiral).astype(float)
 
-        if key not in self._fingerprints:
-            self.sanitize()
-            bitvect = AllChem.GetMorganFingerprintAsBitVect(
-                self.rd_mol, *key, useChirality=chiral
-            )
-            array = np.zeros((1,))
-            DataStructs.ConvertToNumpyArray(bitvect, array)
-            self._fingerprints[key] = array
+    def fingerprint_bits(
+        self, radius: int, nbits: int = 2048, chiral: bool = False
+    ) -> np.ndarray:
+        """
+        Returns the Morgan fingerprint of the molecule as a vector of
+        unsigned bytes, one per bit.
 
-        return self._fingerprints[key]
+        The fingerprint is cached bit-packed, i.e. with eight bits per byte.
+
+        :param radius: the radius of the fingerprint
+        :param nbits: the length of the fingerprint
+        :param chiral: if True, include chirality information
+        :return: the fingerprint
+        """
+        return np.unpackbits(
+            self._packed_fingerprint(radius, nbits, chiral), count=nbits
+        )
 
     def has_atom_mapping(self) -> bool:
         """
@@ -233,6 +245,23 @@ class Molecule:
         self._clear_cache()
         self._is_sanitized = True
 
+    def _packed_fingerprint(
+        self, radius: int, nbits: int, chiral: bool, bits: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        # If given, the unpacked fingerprint is written to `bits`
+        key = radius, nbits, chiral
+        packed = self._fingerprints.get(key)
+        if packed is None:
+            self.sanitize()
+            array = _morgan_generator(*key).GetFingerprintAsNumPy(self.rd_mol)
+            packed = np.packbits(array)
+            self._fingerprints[key] = packed
+            if bits is not None:
+                bits[:] = array
+        elif bits is not None:
+            bits[:] = np.unpackbits(packed, count=nbits)
+        return packed
+
     def _clear_cache(self):
         self._inchi = None
         self._inchi_key = None
@@ -286,6 +315,8 @@ class TreeMolecule(Molecule):
         self.original_smiles = smiles
         self.mapped_mol = Chem.Mol(self.rd_mol)
         self._atom_bonds: List[Tuple[int, int]] = []
+        # The product prepared for template application, see `chem.reaction`
+        self._rdchiral_product: Any = None
         if not self.parent:
             self._set_atom_mappings()
         elif mapping_update_callback is not None:
@@ -390,3 +421,33 @@ class UniqueMolecule(Molecule):
 def none_molecule() -> UniqueMolecule:
     """Return an empty molecule"""
     return UniqueMolecule(rd_mol=Chem.MolFromSmiles(""))
+
+
+def fingerprint_matrix(
+    molecules: Sequence[Molecule], radius: int, nbits: int = 2048, chiral: bool = False
+) -> np.ndarray:
+    """
+    Returns the Morgan fingerprints of several molecules as a matrix
+    of unsigned bytes, with one row per molecule and one column per bit.
+
+    The fingerprints are written directly into the matrix and
+    cached bit-packed on the molecules.
+
+    :param molecules: the molecules
+    :param radius: the radius of the fingerprints
+    :param nbits: the length of the fingerprints
+    :param chiral: if True, include chirality information
+    :return: the fingerprints
+    """
+    matrix = np.zeros((len(molecules), nbits), dtype=np.uint8)
+    for molecule, row in zip(molecules, matrix):
+        # pylint: disable=protected-access
+        molecule._packed_fingerprint(radius, nbits, chiral, bits=row)
+    return matrix
+
+
+@functools.lru_cache(maxsize=None)
+def _morgan_generator(radius: int, nbits: int, chiral: bool) -> Any:
+    return rdFingerprintGenerator.GetMorganGenerator(
+        radius=radius, fpSize=nbits, includeChirality=chiral
+    )
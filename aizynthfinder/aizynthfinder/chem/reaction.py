@@ -26,12 +26,15 @@ from aizynthfinder.chem.mol import (
     MoleculeException,
     TreeMolecule,
 )
+from aizynthfinder.utils.cache import LruCache
 from aizynthfinder.utils.logging import logger
+from aizynthfinder.utils.profiling import phase_profiler
 
 if TYPE_CHECKING:
     from aizynthfinder.chem.mol import UniqueMolecule
     from aizynthfinder.utils.type_utils import (
         Any,
+        Dict,
         Iterable,
         List,
         Optional,
@@ -47,6 +50,83 @@ if RDCHIRAL_CPP:
         "WARNING: C++ version of RDChiral is supported, but with limited functionality"
     )
 
+# The maximum number of compiled reactions kept in the process-wide template cache
+TEMPLATE_CACHE_SIZE = 20000
+_TEMPLATE_CACHE = LruCache(maxsize=TEMPLATE_CACHE_SIZE)
+
+
+def compiled_rdchiral_reaction(smarts: str) -> Any:
+    """
+    Return the RDChiral reaction compiled from a reaction SMARTS.
+
+    The compiled reaction is shared by all reactions in the process
+    and is kept in a bounded cache keyed by the SMARTS.
+
+    :param smarts: the reaction SMARTS
+    :return: the compiled reaction
+    """
+    return _TEMPLATE_CACHE.get_or_create(
+        ("rdchiral", smarts), lambda: rdc.rdchiralReaction(smarts)
+    )
+
+
+def compiled_rdkit_reaction(smarts: str) -> RdReaction:
+    """
+    Return the RDKit reaction compiled from a reaction SMARTS.
+
+    The compiled reaction is shared by all reactions in the process
+    and is kept in a bounded cache keyed by the SMARTS.
+
+    :param smarts: the reaction SMARTS
+    :return: the compiled reaction
+    """
+    return _TEMPLATE_CACHE.get_or_create(
+        ("rdkit", smarts), lambda: AllChem.ReactionFromSmarts(smarts)
+    )
+
+
+def rdchiral_product(mol: TreeMolecule) -> Any:
+    """
+    Return the product representation used by RDChiral for a molecule.
+
+    The representation is created the first time it is requested and is
+    then kept on the molecule, so that all templates applied to the molecule
+    share it. Release it with `release_rdchiral_product` when no more
+    templates will be applied to the molecule.
+
+    :param mol: the product molecule
+    :return: the product representation
+    """
+    # pylint: disable=protected-access
+    if mol._rdchiral_product is None:
+        mol._rdchiral_product = _RdChiralProductWrapper(mol)
+    return mol._rdchiral_product
+
+
+def release_rdchiral_product(mol: TreeMolecule) -> None:
+    """
+    Release the product representation used by RDChiral for a molecule
+
+    :param mol: the product molecule
+    """
+    # pylint: disable=protected-access
+    mol._rdchiral_product = None
+
+
+def template_cache_stats() -> Dict[str, int]:
+    """
+    Return the size and the hit and miss counters of the process-wide
+    cache of compiled reaction templates
+
+    :return: the statistics
+    """
+    return _TEMPLATE_CACHE.stats()
+
+
+def clear_template_cache() -> None:
+    """Remove all compiled reaction templates from the process-wide cache"""
+    _TEMPLATE_CACHE.clear()
+
 
 class _ReactionInterfaceMixin:
     """
@@ -306,7 +386,7 @@ class TemplatedRetroReaction(RetroReaction):
     def rd_reaction(self) -> RdReaction:
         """Return the RDKit reaction created from the SMART"""
         if self._rd_reaction is None:
-            self._rd_reaction = AllChem.ReactionFromSmarts(self.smarts)
+            self._rd_reaction = compiled_rdkit_reaction(self.smarts)
         return self._rd_reaction
 
     def to_dict(self) -> StrDict:
@@ -324,10 +404,11 @@ class TemplatedRetroReaction(RetroReaction):
         Apply a reactions smarts to a molecule and return the products (reactants for retro templates)
         Will try to sanitize the reactants, and if that fails it will not return that molecule
         """
-        reaction = rdc.rdchiralReaction(self.smarts)
-        rct = _RdChiralProductWrapper(self.mol)
+        reaction = compiled_rdchiral_reaction(self.smarts)
+        rct = rdchiral_product(self.mol)
         try:
-            reactants = rdc.rdchiralRun(reaction, rct, keep_mapnums=True)
+            with phase_profiler().phase("template application"):
+                reactants = rdc.rdchiralRun(reaction, rct, keep_mapnums=True)
         except RuntimeError as err:
             logger().debug(
                 f"Runtime error in RDChiral with template {self.smarts} on {self.mol.smiles}\n{err}"
@@ -341,22 +422,23 @@ class TemplatedRetroReaction(RetroReaction):
 
         # Turning rdchiral outcome into rdkit tuple of tuples to maintain compatibility
         outcomes = []
+        exclude_nums = set(self.mol.mapping_to_index.keys())
         for reactant_str in reactants:
             smiles_list = reactant_str.split(".")
-            exclude_nums = set(self.mol.mapping_to_index.keys())
             update_func = partial(
                 self._update_unmapped_atom_num, exclude_nums=exclude_nums
             )
             try:
-                rct_objs = tuple(
-                    TreeMolecule(
-                        parent=self.mol,
-                        smiles=smi,
-                        sanitize=True,
-                        mapping_update_callback=update_func,
+                with phase_profiler().phase("reactant sanitization"):
+                    rct_objs = tuple(
+                        TreeMolecule(
+                            parent=self.mol,
+                            smiles=smi,
+                            sanitize=True,
+                            mapping_update_callback=update_func,
+                        )
+                        for smi in smiles_list
                     )
-                    for smi in smiles_list
-                )
             except MoleculeException:
                 pass
             else:
@@ -366,9 +448,10 @@ class TemplatedRetroReaction(RetroReaction):
         return self._reactants
 
     def _apply_with_rdkit(self) -> Tuple[Tuple[TreeMolecule, ...], ...]:
-        rxn = AllChem.ReactionFromSmarts(self.smarts)
+        rxn = self.rd_reaction
         try:
-            reactants_list = rxn.RunReactants([self.mol.mapped_mol])
+            with phase_profiler().phase("template application"):
+                reactants_list = rxn.RunReactants([self.mol.mapped_mol])
         except:  # pylint: disable=bare-except
             reactants_list = []
 
@@ -377,15 +460,16 @@ class TemplatedRetroReaction(RetroReaction):
             exclude_nums = set(self.mol.mapping_to_index.keys())
             update_func = partial(self._inherit_atom_mapping, exclude_nums=exclude_nums)
             try:
-                mols = tuple(
-                    TreeMolecule(
-                        parent=self.mol,
-                        rd_mol=mol,
-                        sanitize=True,
-                        mapping_update_callback=update_func,
+                with phase_profiler().phase("reactant sanitization"):
+                    mols = tuple(
+                        TreeMolecule(
+                            parent=self.mol,
+                            rd_mol=mol,
+                            sanitize=True,
+                            mapping_update_callback=update_func,
+                        )
+                        for mol in reactants
                     )
-                    for mol in reactants
-                )
             except MoleculeException:
                 pass
             else:
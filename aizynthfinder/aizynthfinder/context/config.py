@@ -41,18 +41,22 @@ class _SearchConfiguration:
             "immediate_instantiation": (),
             "mcts_grouping": None,
             "search_rewards_weights": [],
+            "batch_size": 1,
+            "transposition_table": False,
         }
     )
     max_transforms: int = 6
     iteration_limit: int = 100
     time_limit: int = 120
     return_first: bool = False
+    profile_phases: bool = False
     exclude_target_from_stock: bool = True
     break_bonds: List[List[int]] = field(default_factory=list)
     freeze_bonds: List[List[int]] = field(default_factory=list)
     break_bonds_operator: str = "and"
     optimisation_type: str = ""
     custom_templates: str = ""
+    custom_templates_store: str = ""
 
 
 @dataclass
@@ -2,8 +2,10 @@
 """
 
 from aizynthfinder.context.policy.expansion_strategies import (
+    ActionRecord,
     ExpansionStrategy,
     MultiExpansionStrategy,
+    NovelTemplateExpansionStrategy,
     TemplateBasedDirectExpansionStrategy,
     TemplateBasedExpansionStrategy,
 )
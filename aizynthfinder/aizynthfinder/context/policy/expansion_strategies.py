@@ -4,16 +4,34 @@
 from __future__ import annotations
 
 import abc
-from typing import TYPE_CHECKING
+import hashlib
+import json
+from typing import TYPE_CHECKING, NamedTuple
 
 import numpy as np
 import pandas as pd
-
-from aizynthfinder.chem import SmilesBasedRetroReaction, TemplatedRetroReaction
-from aizynthfinder.context.policy.utils import _make_fingerprint
+from rdkit import Chem, DataStructs
+
+from aizynthfinder.chem import (
+    MoleculeException,
+    SmilesBasedRetroReaction,
+    TemplatedRetroReaction,
+    fingerprint_matrix,
+)
+from aizynthfinder.chem.reaction import (
+    compiled_rdchiral_reaction,
+    compiled_rdkit_reaction,
+)
+from aizynthfinder.context.policy.utils import (
+    _array_hash,
+    _boost_probabilities,
+    _file_hash,
+)
+from aizynthfinder.utils.cache import LruCache, SqliteStore
 from aizynthfinder.utils.exceptions import PolicyException
 from aizynthfinder.utils.logging import logger
 from aizynthfinder.utils.models import load_model
+from aizynthfinder.utils.profiling import phase_profiler
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import TreeMolecule
@@ -24,12 +42,35 @@ if TYPE_CHECKING:
         Dict,
         List,
         Optional,
+        RdMol,
         Sequence,
         StrDict,
         Tuple,
+        Union,
     )
 
 
+class ActionRecord(NamedTuple):
+    """
+    A compact description of a template-based action.
+
+    The record is turned into a reaction by the `make_action`
+    method of the expansion strategy that created it.
+
+    :ivar policy_name: the key of the expansion strategy that created the record
+    :ivar mol: the molecule to apply the template to
+    :ivar template_index: the row of the template in the template table
+    :ivar rank: the rank of the template among the predictions for the molecule
+    :ivar probability: the rounded probability of the template
+    """
+
+    policy_name: str
+    mol: TreeMolecule
+    template_index: int
+    rank: int
+    probability: float
+
+
 class ExpansionStrategy(abc.ABC):
     """
     A base class for all expansion strategies.
@@ -81,6 +122,37 @@ class ExpansionStrategy(abc.ABC):
         :return: the actions and the priors of those actions
         """
 
+    def get_action_records(
+        self,
+        molecules: Sequence[TreeMolecule],
+        cache_molecules: Optional[Sequence[TreeMolecule]] = None,
+    ) -> Tuple[List[Union[RetroReaction, ActionRecord]], List[float]]:
+        """
+        Get all the probable actions of a set of molecules, where the
+        actions may be compact records that are turned into reactions
+        with `make_action` when needed.
+
+        The default implementation returns the reactions of `get_actions`
+
+        :param molecules: the molecules to consider
+        :param cache_molecules: additional molecules to submit to the expansion
+                                  policy but that only will be cached for later use
+        :return: the actions or action records and the priors of those actions
+        """
+        return self.get_actions(molecules, cache_molecules)
+
+    def make_action(self, record: ActionRecord) -> RetroReaction:
+        """
+        Create the reaction described by an action record
+
+        :param record: the action record
+        :return: the reaction
+        :raises PolicyException: if the strategy does not create action records
+        """
+        raise PolicyException(
+            f"{self.__class__.__name__} does not create action records"
+        )
+
     def reset_cache(self) -> None:
         """Reset the prediction cache"""
 
@@ -259,15 +331,33 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
     :ivar chiral_fingerprints: if True will base expansion on chiral fingerprint
     :ivar mask: a boolean vector of masks for the reaction templates. The length of the vector should be equal to the
         number of templates. It is set to None if no mask file is provided as input.
+    :ivar template_boost: a vector of scores that boost the predicted probabilities
+        of the templates, aligned with the templates. It is set to None if no boost
+        is set, see `set_template_boost`.
+    :ivar persistent_cache: if True, the predictions are also kept in a process-wide
+        cache that is not cleared by `reset_cache`, and hence is shared between targets
+    :ivar prediction_store: the path to a SQLite database that keeps the predictions
+        between runs, empty if not used
+    :ivar prediction_cache_key: a hash of the model file and the settings that affect
+        the predictions, used together with the InChI key to look up predictions
 
     :param key: the key or label
     :param config: the configuration of the tree search
     :param model: the source of the policy model
     :param template: the path to a HDF5 file with the templates
+    :param persistent_cache: if True, keep predictions between targets,
+        defaults to False
+    :param prediction_store: the path to a SQLite database that keeps predictions
+        between runs. Setting it turns on the persistent cache.
     :raises PolicyException: if the length of the model output vector is not same as the
         number of templates
     """
 
+    # The maximum number of molecules kept in the process-wide prediction cache
+    prediction_cache_size = 100000
+    _prediction_cache = LruCache(maxsize=prediction_cache_size)
+    _prediction_store_hits = 0
+
     _required_kwargs = [
         "model",
         "template",
@@ -309,8 +399,48 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
                 f"The number of templates ({len(self.templates)}) does not agree with the "  # type: ignore
                 f"output dimensions of the model ({self.model.output_size})"
             )
+        self.template_boost: Optional[np.ndarray] = None
+        self._template_codes: List[Any] = []
+        self._template_smarts: Optional[np.ndarray] = None
+        self._template_metadata: List[StrDict] = []
         self._cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
 
+        self.prediction_store: str = kwargs.get("prediction_store", "")
+        self.persistent_cache = bool(
+            kwargs.get("persistent_cache", False) or self.prediction_store
+        )
+        self._model_hash = ""
+        self.prediction_cache_key = ""
+        self._prediction_store: Optional[SqliteStore] = None
+        if self.persistent_cache:
+            self._model_hash = _file_hash(source)
+            self._set_prediction_cache_key()
+        if self.prediction_store:
+            self._logger.info(
+                f"Keeping predictions of {self.key} in {self.prediction_store}"
+            )
+            self._prediction_store = SqliteStore(self.prediction_store)
+
+    @classmethod
+    def clear_prediction_cache(cls) -> None:
+        """Remove all items from the process-wide prediction cache"""
+        cls._prediction_cache.clear()
+        cls._prediction_store_hits = 0
+
+    @classmethod
+    def prediction_cache_stats(cls) -> Dict[str, int]:
+        """
+        Return the size and the hit and miss counters of the
+        process-wide prediction cache. Predictions that are found
+        in a prediction store count as hits.
+
+        :return: the statistics
+        """
+        stats = cls._prediction_cache.stats()
+        stats["hits"] += cls._prediction_store_hits
+        stats["misses"] -= cls._prediction_store_hits
+        return stats
+
     def get_actions(
         self,
         molecules: Sequence[TreeMolecule],
@@ -325,38 +455,117 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
         :return: the actions and the priors of those actions
         """
 
-        possible_actions = []
+        records, priors = self._get_action_records(molecules, cache_molecules)
+        possible_actions = [self.make_action(record) for record in records]
+        return possible_actions, priors  # type: ignore
+
+    def get_action_records(
+        self,
+        molecules: Sequence[TreeMolecule],
+        cache_molecules: Optional[Sequence[TreeMolecule]] = None,
+    ) -> Tuple[List[Union[RetroReaction, ActionRecord]], List[float]]:
+        """
+        Get all the probable actions of a set of molecules as compact records,
+        using the selected policies and given cutoffs
+
+        :param molecules: the molecules to consider
+        :param cache_molecules: additional molecules to submit to the expansion
+                                  policy but that only will be cached for later use
+        :return: the action records and the priors of those actions
+        """
+        return self._get_action_records(molecules, cache_molecules)  # type: ignore
+
+    def make_action(self, record: ActionRecord) -> RetroReaction:
+        """
+        Create the reaction described by an action record
+
+        :param record: the action record
+        :return: the reaction
+        """
+        if self._template_smarts is None:
+            self._set_template_columns()
+        smarts = self._template_smarts[record.template_index]  # type: ignore
+        metadata = dict(self._template_metadata[record.template_index])
+        metadata["policy_probability"] = record.probability
+        metadata["policy_probability_rank"] = record.rank
+        metadata["policy_name"] = self.key
+        metadata["template_code"] = self._template_codes[record.template_index]
+        metadata["template"] = smarts
+        if (
+            self.template_boost is not None
+            and self.template_boost[record.template_index] > 0
+        ):
+            metadata["classification"] = "optimised"
+        return TemplatedRetroReaction(
+            record.mol,
+            smarts=smarts,
+            metadata=metadata,
+            use_rdchiral=self.use_rdchiral,
+        )
+
+    def clear_template_boost(self) -> None:
+        """Remove the boost of the templates, if one is set"""
+        if self.template_boost is None:
+            return
+        self.template_boost = None
+        self.reset_cache()
+        if self.persistent_cache:
+            self._set_prediction_cache_key()
+
+    def reset_cache(self) -> None:
+        """Reset the prediction cache"""
+        self._cache = {}
+
+    def set_template_boost(self, scores: Dict[str, float]) -> None:
+        """
+        Set scores that boost the predicted probabilities of templates.
+
+        The probabilities are boosted with the same rule as the actions of other
+        strategies, see `ExpansionPolicy`, but before the cutoffs are applied,
+        so that boosted templates can be selected. The priors of the selected
+        templates are normalized, so if the same templates are selected as
+        without the boost, the priors are the same as with the other strategies.
+
+        :param scores: the boost scores, keyed by the template SMARTS
+        """
+        self.template_boost = (
+            self.templates[self.template_column]
+            .map(scores)
+            .fillna(0.0)
+            .to_numpy(dtype=float)
+        )
+        self.reset_cache()
+        if self.persistent_cache:
+            self._set_prediction_cache_key()
+
+    def _boost_predictions(self, predictions: np.ndarray) -> np.ndarray:
+        selected = self._cutoff_predictions(predictions)
+        return _boost_probabilities(predictions, self.template_boost, selected)
+
+    def _get_action_records(
+        self,
+        molecules: Sequence[TreeMolecule],
+        cache_molecules: Optional[Sequence[TreeMolecule]] = None,
+    ) -> Tuple[List[ActionRecord], List[float]]:
+        records: List[ActionRecord] = []
         priors: List[float] = []
         cache_molecules = cache_molecules or []
         self._update_cache(list(molecules) + list(cache_molecules))
+        if self._template_smarts is None:
+            self._set_template_columns()
 
         for mol in molecules:
             probable_transforms_idx, probs = self._cache[mol.inchi_key]
-            possible_moves = self.templates.iloc[probable_transforms_idx]
             if self.rescale_prior:
-                probs /= probs.sum()
+                probs = probs / probs.sum()
             priors.extend(probs)
-            for idx, (move_index, move) in enumerate(possible_moves.iterrows()):
-                metadata = dict(move)
-                del metadata[self.template_column]
-                metadata["policy_probability"] = float(probs[idx].round(4))
-                metadata["policy_probability_rank"] = idx
-                metadata["policy_name"] = self.key
-                metadata["template_code"] = move_index
-                metadata["template"] = move[self.template_column]
-                possible_actions.append(
-                    TemplatedRetroReaction(
-                        mol,
-                        smarts=move[self.template_column],
-                        metadata=metadata,
-                        use_rdchiral=self.use_rdchiral,
-                    )
+            for rank, (template_idx, probability) in enumerate(
+                zip(probable_transforms_idx.tolist(), probs.round(4).tolist())
+            ):
+                records.append(
+                    ActionRecord(self.key, mol, template_idx, rank, probability)
                 )
-        return possible_actions, priors  # type: ignore
-
-    def reset_cache(self) -> None:
-        """Reset the prediction cache"""
-        self._cache = {}
+        return records, priors
 
     def _cutoff_predictions(self, predictions: np.ndarray) -> np.ndarray:
         """
@@ -384,26 +593,107 @@ class TemplateBasedExpansionStrategy(ExpansionStrategy):
             )
         return mask
 
+    def _lookup_prediction(
+        self, inchi_key: str
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        key = f"{inchi_key}:{self.prediction_cache_key}"
+        prediction = self._prediction_cache.get(key)
+        if prediction is not None or self._prediction_store is None:
+            return prediction
+
+        value = self._prediction_store.get(key)
+        if value is None:
+            return None
+        # The value holds the template indices followed by the probabilities
+        nitems = len(value) // 16
+        prediction = (
+            np.frombuffer(value, dtype=np.int64, count=nitems),
+            np.frombuffer(value, dtype=np.float64, offset=nitems * 8),
+        )
+        self._prediction_cache[key] = prediction
+        TemplateBasedExpansionStrategy._prediction_store_hits += 1
+        return prediction
+
+    def _set_prediction_cache_key(self) -> None:
+        settings = {
+            "model": self._model_hash,
+            "ntemplates": len(self.templates),
+            "cutoff_cumulative": self.cutoff_cumulative,
+            "cutoff_number": self.cutoff_number,
+            "chiral_fingerprints": self.chiral_fingerprints,
+            "mask": _array_hash(self.mask),
+            "template_boost": _array_hash(self.template_boost),
+        }
+        self.prediction_cache_key = hashlib.sha224(
+            json.dumps(settings, sort_keys=True).encode()
+        ).hexdigest()
+
+    def _set_template_columns(self) -> None:
+        """
+        Store the template table as columns that can be indexed
+        by the predictions without going through pandas.
+        This is done on the first expansion.
+
+        The metadata of each template is kept as a single dictionary
+        that is shallow-copied into the actions.
+        """
+        self._template_codes = self.templates.index.tolist()
+        self._template_smarts = self.templates[self.template_column].to_numpy(
+            dtype=object
+        )
+        names = [
+            name for name in self.templates.columns if name != self.template_column
+        ]
+        columns = [self.templates[name].tolist() for name in names]
+        self._template_metadata = [
+            {name: column[idx] for name, column in zip(names, columns)}
+            for idx in range(len(self.templates))
+        ]
+
     def _update_cache(self, molecules: Sequence[TreeMolecule]) -> None:
         pred_inchis = []
-        fp_list = []
+        pred_molecules = []
         for molecule in molecules:
             if molecule.inchi_key in self._cache or molecule.inchi_key in pred_inchis:
                 continue
-            fp_list.append(
-                _make_fingerprint(molecule, self.model, self.chiral_fingerprints)
-            )
+            if self.persistent_cache:
+                prediction = self._lookup_prediction(molecule.inchi_key)
+                if prediction is not None:
+                    self._cache[molecule.inchi_key] = prediction
+                    continue
+            pred_molecules.append(molecule)
             pred_inchis.append(molecule.inchi_key)
 
         if not pred_inchis:
             return
 
-        pred_list = np.asarray(self.model.predict(np.vstack(fp_list)))
+        fingerprints = fingerprint_matrix(
+            pred_molecules, 2, len(self.model), self.chiral_fingerprints
+        )
+        with phase_profiler().phase("expansion model"):
+            pred_list = np.asarray(self.model.predict(fingerprints))
         for pred, inchi in zip(pred_list, pred_inchis):
+            if self.template_boost is not None:
+                pred = self._boost_predictions(pred)
             probable_transforms_idx = self._cutoff_predictions(pred)
-            self._cache[inchi] = (
-                probable_transforms_idx,
-                pred[probable_transforms_idx],
+            probs = pred[probable_transforms_idx]
+            if self.template_boost is not None:
+                probs = probs / probs.sum()
+            self._cache[inchi] = (probable_transforms_idx, probs)
+            if self.persistent_cache:
+                self._store_prediction(inchi, probable_transforms_idx, probs)
+        if self._prediction_store is not None:
+            self._prediction_store.commit()
+
+    def _store_prediction(
+        self, inchi_key: str, template_indices: np.ndarray, probs: np.ndarray
+    ) -> None:
+        key = f"{inchi_key}:{self.prediction_cache_key}"
+        self._prediction_cache[key] = (template_indices, probs)
+        if self._prediction_store is not None:
+            self._prediction_store[key] = (
+                template_indices.astype(np.int64).tobytes()
+                + probs.astype(np.float64).tobytes()
             )
 
 
@@ -447,4 +737,260 @@ class TemplateBasedDirectExpansionStrategy(TemplateBasedExpansionStrategy):
                 possible_actions.append(new_action)
                 priors.append(prior)
 
-        return possible_actions, priors  # type: ignore
\ No newline at end of file
+        return possible_actions, priors  # type: ignore
+
+    def get_action_records(
+        self,
+        molecules: Sequence[TreeMolecule],
+        cache_molecules: Optional[Sequence[TreeMolecule]] = None,
+    ) -> Tuple[List[Union[RetroReaction, ActionRecord]], List[float]]:
+        """
+        Get all the probable actions of a set of molecules.
+
+        The templates are applied directly, so this returns
+        the reactions of `get_actions`
+
+        :param molecules: the molecules to consider
+        :param cache_molecules: additional molecules to submit to the expansion
+            policy but that only will be cached for later use
+        :return: the actions and the priors of those actions
+        """
+        return self.get_actions(molecules, cache_molecules)
+
+
+class NovelTemplateExpansionStrategy(ExpansionStrategy):
+    """
+    An expansion strategy that applies a set of novel templates, i.e. templates that
+    are not predicted by an expansion model, and returns `TemplatedRetroReaction`
+    objects for the templates that produce reactants.
+
+    The templates are read from a JSON file that maps the template SMARTS to an
+    optimisation score, which is used as the prior of the actions.
+
+    The templates are compiled once. Before a template is applied to a molecule,
+    the product side of the template is screened against the molecule: first by
+    comparing pattern fingerprints and then by a substructure match.
+
+    The templates that are applicable to a molecule are kept in a process-wide cache,
+    keyed by the InChI key of the molecule and the hash of the template set, which
+    is not cleared by `reset_cache`. If an applicability store is given, the molecules
+    that are not in the cache are looked up in that SQLite database, and new molecules
+    are written to it once per call to `get_actions`. The writes are transactions, so
+    several processes can share the store.
+
+    :ivar source: the path to the template file
+    :ivar templates: the SMARTS of the novel templates
+    :ivar scores: the optimisation scores of the templates
+    :ivar template_set_hash: a hash of the SMARTS of the templates and of how
+        they are applied
+    :ivar applicability_store: the path to a SQLite database with applicable templates
+    :ivar use_rdchiral: a boolean to apply templates with RDChiral
+    :ivar rescale_prior: a boolean to normalize the priors of each molecule
+
+    :param key: the key or label
+    :param config: the configuration of the tree search
+    :param template: the path to a JSON file with the novel templates,
+        defaults to the `custom_templates` search setting
+    :param applicability_store: the path to a SQLite database with applicable templates,
+        defaults to the `custom_templates_store` search setting
+    :raises PolicyException: if no template file is given
+    """
+
+    fingerprint_size = 2048
+    # The maximum number of molecules kept in the process-wide applicability cache
+    applicability_cache_size = 100000
+    _applicability_cache = LruCache(maxsize=applicability_cache_size)
+
+    def __init__(self, key: str, config: Configuration, **kwargs: str) -> None:
+        super().__init__(key, config, **kwargs)
+        templatefile = kwargs.get("template") or config.search.custom_templates
+        if not templatefile:
+            raise PolicyException(
+                f"A {self.__class__.__name__} class needs a template file"
+            )
+        self.source = templatefile
+        self.applicability_store: str = (
+            kwargs.get("applicability_store") or config.search.custom_templates_store
+        )
+        self.use_rdchiral: bool = bool(kwargs.get("use_rdchiral", True))
+        self.rescale_prior: bool = bool(kwargs.get("rescale_prior", False))
+
+        self._logger.info(f"Loading novel templates from {templatefile} to {self.key}")
+        with open(templatefile, "r") as fileobj:
+            template_scores = json.load(fileobj)
+
+        self.templates: List[str] = []
+        scores = []
+        self._product_queries: List[List[RdMol]] = []
+        query_bits = []
+        for smarts, score in template_scores.items():
+            try:
+                queries = self._compile_template(smarts)
+            except Exception as err:  # pylint: disable=broad-except
+                self._logger.debug(f"Could not compile novel template {smarts}: {err}")
+                continue
+            self.templates.append(smarts)
+            scores.append(score)
+            self._product_queries.append(queries)
+            query_bits.append(self._pattern_bits(queries))
+        self.scores = np.asarray(scores, dtype=float)
+        self._query_bits = (
+            np.vstack(query_bits)
+            if query_bits
+            else np.zeros((0, self.fingerprint_size // 8), dtype=np.uint8)
+        )
+        self._logger.info(
+            f"Compiled {len(self.templates)} of {len(template_scores)} novel templates"
+        )
+        settings = {"templates": self.templates, "use_rdchiral": self.use_rdchiral}
+        self.template_set_hash = hashlib.sha224(
+            json.dumps(settings).encode("utf8")
+        ).hexdigest()
+        self._applicability_store: Optional[SqliteStore] = None
+        if self.applicability_store:
+            self._logger.info(
+                f"Keeping applicable novel templates in {self.applicability_store}"
+            )
+            self._applicability_store = SqliteStore(self.applicability_store)
+
+    @classmethod
+    def applicability_cache_stats(cls) -> Dict[str, int]:
+        """
+        Return the size and the hit and miss counters of the
+        process-wide cache of applicable novel templates
+
+        :return: the statistics
+        """
+        return cls._applicability_cache.stats()
+
+    @classmethod
+    def clear_applicability_cache(cls) -> None:
+        """Remove all items from the process-wide cache of applicable novel templates"""
+        cls._applicability_cache.clear()
+
+    def get_actions(
+        self,
+        molecules: Sequence[TreeMolecule],
+        cache_molecules: Optional[Sequence[TreeMolecule]] = None,
+    ) -> Tuple[List[RetroReaction], List[float]]:
+        """
+        Get the actions of the novel templates that produce reactants for a set of molecules
+
+        :param molecules: the molecules to consider
+        :param cache_molecules: not used by this strategy
+        :return: the actions and the priors of those actions
+        """
+        possible_actions: List[RetroReaction] = []
+        priors: List[float] = []
+        for mol in molecules:
+            key = (mol.inchi_key, self.template_set_hash)
+            applicable = self._lookup_applicability(key)
+            if applicable is not None:
+                actions = [self._make_action(mol, idx) for idx in applicable]
+            else:
+                actions = []
+                applicable = []
+                for template_idx in self.screen_templates(mol):
+                    reaction = self._make_action(mol, template_idx)
+                    if reaction.reactants:
+                        actions.append(reaction)
+                        applicable.append(template_idx)
+                self._store_applicability(key, applicable)
+            mol_priors = [action.metadata["opt_score"] for action in actions]
+            if self.rescale_prior and actions:
+                sum_priors = sum(mol_priors)
+                mol_priors = [prior / sum_priors for prior in mol_priors]
+            for action, prior in zip(actions, mol_priors):
+                action.metadata["policy_probability"] = round(prior, 4)
+            possible_actions.extend(actions)
+            priors.extend(mol_priors)
+        if self._applicability_store is not None:
+            self._applicability_store.commit()
+        return possible_actions, priors
+
+    def screen_templates(self, mol: TreeMolecule) -> List[int]:
+        """
+        Return the templates whose product side is a substructure of a molecule.
+        The molecule is sanitized if necessary.
+
+        :param mol: the molecule
+        :return: the indices of the templates that passed the screen
+        """
+        if not self.templates:
+            return []
+        try:
+            mol.sanitize()
+        except MoleculeException:
+            return []
+        mol_bits = self._pattern_bits([mol.rd_mol])
+        candidates = np.flatnonzero(
+            ~np.any(self._query_bits & ~mol_bits, axis=1)
+        ).tolist()
+        return [
+            idx
+            for idx in candidates
+            if all(
+                mol.rd_mol.HasSubstructMatch(query)
+                for query in self._product_queries[idx]
+            )
+        ]
+
+    def _lookup_applicability(self, key: Tuple[str, str]) -> Optional[List[int]]:
+        applicable = self._applicability_cache.get(key)
+        if applicable is not None or self._applicability_store is None:
+            return applicable
+
+        value = self._applicability_store.get(f"{key[0]}:{key[1]}")
+        if value is None:
+            return None
+        # The value holds the indices of the applicable templates
+        if len(value) % 8:
+            self._logger.warning(
+                f"Skipping a corrupt entry of {key[0]} "
+                f"in the applicability store {self.applicability_store}"
+            )
+            return None
+        applicable = np.frombuffer(value, dtype=np.int64).tolist()
+        self._applicability_cache[key] = applicable
+        return applicable
+
+    def _make_action(self, mol: TreeMolecule, template_idx: int) -> RetroReaction:
+        smarts = self.templates[template_idx]
+        metadata = {
+            "template": smarts,
+            "classification": "novel",
+            "policy_name": self.key,
+            "opt_score": float(self.scores[template_idx]),
+        }
+        return TemplatedRetroReaction(
+            mol,
+            smarts=smarts,
+            metadata=metadata,
+            use_rdchiral=self.use_rdchiral,
+        )
+
+    def _store_applicability(self, key: Tuple[str, str], applicable: List[int]) -> None:
+        self._applicability_cache[key] = applicable
+        if self._applicability_store is not None:
+            self._applicability_store[f"{key[0]}:{key[1]}"] = np.asarray(
+                applicable, dtype=np.int64
+            ).tobytes()
+
+    def _compile_template(self, smarts: str) -> List[RdMol]:
+        if self.use_rdchiral:
+            compiled_rdchiral_reaction(smarts)
+        rxn = compiled_rdkit_reaction(smarts)
+        queries = []
+        for query in rxn.GetReactants():
+            query.UpdatePropertyCache(strict=False)
+            queries.append(query)
+        return queries
+
+    def _pattern_bits(self, mols: List[RdMol]) -> np.ndarray:
+        bits = np.zeros(self.fingerprint_size, dtype=np.uint8)
+        for mol in mols:
+            fingerprint = Chem.PatternFingerprint(mol, self.fingerprint_size)
+            arr = np.zeros(self.fingerprint_size, dtype=np.uint8)
+            DataStructs.ConvertToNumpyArray(fingerprint, arr)
+            bits |= arr
+        return np.packbits(bits)
@@ -10,7 +10,9 @@ from typing import TYPE_CHECKING
 
 from aizynthfinder.context.collection import ContextCollection
 from aizynthfinder.context.policy.expansion_strategies import (
+    ActionRecord,
     ExpansionStrategy,
+    NovelTemplateExpansionStrategy,
     TemplateBasedExpansionStrategy,
 )
 from aizynthfinder.context.policy.expansion_strategies import (
@@ -24,16 +26,23 @@ from aizynthfinder.context.policy.filter_strategies import (
 from aizynthfinder.context.policy.filter_strategies import (
     __name__ as filter_strategy_module,
 )
+from aizynthfinder.context.policy.utils import _boost_probabilities
 from aizynthfinder.utils.exceptions import PolicyException
 from aizynthfinder.utils.loading import load_dynamic_class
 
-from aizynthfinder.chem.reaction import TemplatedRetroReaction
-
 if TYPE_CHECKING:
     from aizynthfinder.chem import TreeMolecule
     from aizynthfinder.chem.reaction import RetroReaction, TemplatedRetroReaction
     from aizynthfinder.context.config import Configuration
-    from aizynthfinder.utils.type_utils import Any, Dict, List, Sequence, Tuple
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        Tuple,
+        Union,
+    )
 
 
 class ExpansionPolicy(ContextCollection):
@@ -50,6 +59,10 @@ class ExpansionPolicy(ContextCollection):
     def __init__(self, config: Configuration) -> None:
         super().__init__()
         self._config = config
+        self._optimised_templates: List[Tuple[str, float]] = []
+        self._optimised_templates_source = ""
+        self._boosted_strategies: Dict[str, str] = {}
+        self._novel_strategy: Optional[NovelTemplateExpansionStrategy] = None
 
     def __call__(
         self,
@@ -61,147 +74,160 @@ class ExpansionPolicy(ContextCollection):
     def _get_optimised_templates(self) -> list[tuple[str, float]]:
         """
         Get the optimised templates from the optimisation data.
-        
-        :param novel: if True, get the novel templates, otherwise get the popular or overlooked templates
+
+        The file is only read the first time, or when the setting changes.
         """
-       
-        if self._config.search.custom_templates is not None:
-            with open(self._config.search.custom_templates, 'r') as f:
-                optimised_templates = json.load(f)
-            optimised_templates = [(k, v) for k, v in optimised_templates.items()]
-            return optimised_templates
-        else:
+        filename = self._config.search.custom_templates
+        if not filename:
             raise PolicyException("No optimisation data for novel templates")
+
+        if filename != self._optimised_templates_source:
+            with open(filename, 'r') as f:
+                optimised_templates = json.load(f)
+            self._optimised_templates = [(k, v) for k, v in optimised_templates.items()]
+            self._optimised_templates_source = filename
+        return self._optimised_templates
             
-    def _check_novel_compatibility(self, novel_templates: list[tuple], molecules: list[TreeMolecule]) -> dict[TreeMolecule, list[str]]:
+    def _get_novel_strategy(self) -> NovelTemplateExpansionStrategy:
         """
-        Check if the novel templates are compatible with the target molecules. 
-        
-        :param novel_templates: the novel templates to check
-        :param molecules: the target molecules
-        :return: the compatible templates
+        Return the strategy that applies the novel templates,
+        creating it if the template file has not been loaded before.
         """
-        found = False
-        compatible_templates = {}
-        for mol in molecules:
-            comp_temps = []
-            for template in novel_templates:
-                reaction = rdc.rdchiralReaction(template[0])
-                reactants = rdc.rdchiralReactants(mol.smiles)
-                try:
-                    outcomes = rdc.rdchiralRun(reaction, reactants)
-                    if len(outcomes) > 0:
-                        comp_temps.append(template)
-                except Exception as e:
-                    continue
-                compatible_templates[mol] = comp_temps
-                if len(comp_temps) > 0:
-                    found = True
-                    print(f'POL: Num: compatible templates for {mol}: {len(comp_temps)}')
-            return compatible_templates, found
-    
-    def _integrate_novel_templates(self, possible_actions, priors, compatible_templates, novel_templates, molecules: Sequence[TreeMolecule]):
+        filename = self._config.search.custom_templates
+        if self._novel_strategy is None or self._novel_strategy.source != filename:
+            self._novel_strategy = NovelTemplateExpansionStrategy(
+                "external", self._config, template=filename
+            )
+        return self._novel_strategy
+
+    def _integrate_novel_templates(
+        self,
+        possible_actions: List[RetroReaction],
+        priors: List[float],
+        novel_actions: List[RetroReaction],
+        novel_scores: List[float],
+    ) -> Tuple[List[RetroReaction], List[float]]:
         """
-        Integrate novel templates into the possible actions.
-        
+        Integrate the actions of novel templates into the possible actions.
+
+        The prior of a novel action is estimated from its optimisation score
+        and the smallest prior and the variance of the priors of the possible
+        actions. The priors are then normalised and the actions are sorted
+        by their prior.
+
         :param possible_actions: the possible actions
         :param priors: the priors of the possible actions
-        :param novel_templates: the novel templates to integrate
+        :param novel_actions: the actions of the novel templates,
+            which already have their reactants
+        :param novel_scores: the optimisation scores of the novel actions
         :return: the updated possible actions and priors
         """
-        
-        print('B: PRIOR RANGE: ', max(priors) - min(priors))
-        print("B: PRIOR VARIANCE: ", np.var(priors))
-        print("B: PRIOR MEAN: ", np.mean(priors))
-        
-        max_prior = max(priors) if priors else 0.0
         min_prior = min(priors) if priors else 0.0
-        # prior_range = max_prior - min_prior
-        prior_variance = np.var(priors) if priors else 0.0
-       
-        print(f'BEFORE: Total actions: {len(possible_actions)}', flush=True)
-        print('POL: actions reactans:', type(possible_actions[0]))
-        
-        for molecule, comp_templates in compatible_templates.items():
-            print('POL: comp Templates: ', comp_templates)
-            for temp in comp_templates:
-                    score = temp[1]
-                    
-                    metadata = {
-                        'template': temp[0],
-                        'classification': 'novel',
-                        'policy_name': 'external',
-                        'opt_score': score,
-                    }
-                    new_action = TemplatedRetroReaction(
-                        mol=molecule, 
-                        index=0,
-                        smarts=temp[0],
-                        metadata=metadata,
-                        use_rdchiral=True,
-                    )
+        prior_variance = float(np.var(priors)) if priors else 0.0
+        self._logger.debug(
+            f"Priors before novel templates: range "
+            f"{max(priors, default=0.0) - min_prior}, variance {prior_variance}, "
+            f"mean {np.mean(priors) if priors else 0.0}"
+        )
+
+        possible_actions = list(possible_actions)
+        priors = list(priors)
+        for action, score in zip(novel_actions, novel_scores):
+            # estimate prior for novel template based on opt score and min prior,
+            # and add an optimisation factor
+            estimated_prior = min_prior + (score * prior_variance)
+            optimisation_factor = score * prior_variance
+            new_prior = estimated_prior + optimisation_factor
+            action.metadata["policy_probability"] = new_prior
+            possible_actions.append(action)
+            priors.append(new_prior)
+        self._logger.debug(
+            f"Integrated {len(novel_actions)} novel actions, "
+            f"{len(possible_actions)} actions in total"
+        )
 
-                
-                    # estimate prior for novel template based on opt score, prior range and min prior
-                    estimated_prior = min_prior + (score * prior_variance)
-                    
-                    # calculate opt factor, and new prior
-                    optimisation_factor = score * prior_variance
-                    new_prior = estimated_prior + optimisation_factor
-                    new_action.metadata['policy_probability'] = new_prior
-                    
-                    possible_actions.append(new_action)
-                    priors.append(new_prior)
-                
-        print(f"Novel templates integrated: {len(novel_templates)}", flush=True)
-        print(f"AFTER: Total actions: {len(possible_actions)}", flush=True)
-        print('POL: new action reactants: ', possible_actions[-1].reactants)
-            
         # normalise and reorder the priors
-        norm_priors = [float(i)/sum(priors) for i in priors]
-        print('First action: ', possible_actions[0])
-        print('Last action: ', possible_actions[-1])
-        possible_actions = [x for _, x in sorted(zip(norm_priors, possible_actions), key=lambda pair: pair[0], reverse=True)]
-        norm_priors = sorted(norm_priors, reverse=True)
-        
-        print('A: PRIOR RANGE: ', max(priors) - min(priors))
-        print("A: PRIOR VARIANCE: ", np.var(priors))
-        print("A: PRIOR MEAN: ", np.mean(priors))
-        return possible_actions, norm_priors
-    
+        sum_priors = sum(priors)
+        if sum_priors > 0:
+            priors = [float(prior) / sum_priors for prior in priors]
+        possible_actions = [
+            action
+            for _, action in sorted(
+                zip(priors, possible_actions), key=lambda pair: pair[0], reverse=True
+            )
+        ]
+        return possible_actions, sorted(priors, reverse=True)
+
     def _optimise_templates(self, possible_actions, priors, optimised_templates):
         """
         Adjust the priors of the possible actions if they are to be optimised.
-        
+
+        The priors of the actions of each molecule are boosted with the same rule
+        as the predictions of template-based strategies, see
+        `TemplateBasedExpansionStrategy.set_template_boost`. The actions have
+        already been selected by the strategy, so all of them are used for the
+        variance and the boost cannot change which actions are selected.
+
         :param possible_actions: the possible actions
         :param priors: the priors of the possible actions
         :param optimised_templates: the optimised templates
         :return: the updated possible actions and priors
         """
-        max_prior = max(priors)
-        prior_range = max_prior - min(priors)
-        prior_variance = np.var(priors)
+        if not priors:
+            return possible_actions, priors
 
-        # Assuming optimised_templates is a list of tuples (template, score)
+        # optimised_templates is a list of tuples (template, score)
         # where score is a number between 0 and 1
+        scores = dict(optimised_templates)
+        indices_by_mol: Dict[TreeMolecule, List[int]] = {}
         for index, transformation in enumerate(possible_actions):
-            template = transformation.metadata['template']
-
-            for opt_template, score in optimised_templates:
-                if template == opt_template:
-                    original_prior = priors[index]
-                    
-                    # Boost factor based on score and prior distribution
-                    optimisation_factor = score * prior_variance  
-                    new_prior = original_prior + optimisation_factor
-                    
-                    priors[index] = new_prior
-                    transformation.metadata['policy_probability'] = new_prior
-                    transformation.metadata['classification'] = 'optimised'
-                    break 
-
-        norm_priors = [float(i)/sum(priors) for i in priors]
-        return possible_actions, norm_priors
+            indices_by_mol.setdefault(transformation.mol, []).append(index)
+
+        new_priors = [float(prior) for prior in priors]
+        for indices in indices_by_mol.values():
+            mol_scores = np.asarray(
+                [
+                    scores.get(possible_actions[index].metadata.get("template"), 0.0)
+                    for index in indices
+                ]
+            )
+            mol_priors = _boost_probabilities(
+                np.asarray([new_priors[index] for index in indices]),
+                mol_scores,
+                np.arange(len(indices)),
+            )
+            for index, prior, score in zip(indices, mol_priors, mol_scores):
+                new_priors[index] = float(prior)
+                if score > 0:
+                    metadata = possible_actions[index].metadata
+                    metadata["policy_probability"] = float(prior)
+                    metadata["classification"] = "optimised"
+        return possible_actions, new_priors
+
+    def _clear_template_boosts(self) -> None:
+        """Remove the boost from all template-based strategies that have one"""
+        for key in list(self._boosted_strategies):
+            del self._boosted_strategies[key]
+            if key in self._items:
+                self._items[key].clear_template_boost()
+
+    def _set_template_boost(
+        self,
+        strategy: TemplateBasedExpansionStrategy,
+        optimised_templates: List[Tuple[str, float]],
+    ) -> None:
+        """
+        Boost the optimised templates of a template-based strategy,
+        unless that has already been done with the same optimisation data.
+
+        :param strategy: the expansion strategy
+        :param optimised_templates: the optimised templates
+        """
+        source = self._optimised_templates_source
+        if self._boosted_strategies.get(strategy.key) == source:
+            return
+        strategy.set_template_boost(dict(optimised_templates))
+        self._boosted_strategies[strategy.key] = source
 
     def get_actions(
         self,
@@ -224,29 +250,44 @@ class ExpansionPolicy(ContextCollection):
         all_priors = []
         
         if self._config.search.optimisation_type == 'novel':
+            self._clear_template_boosts()
+            # Equal molecules share their novel actions, so each is only screened once
+            novel_actions, novel_scores = self._get_novel_strategy().get_actions(
+                list(dict.fromkeys(molecules))
+            )
+            for index, name in enumerate(self.selection):
+                possible_actions, priors = self[name].get_actions(molecules)
+                if novel_actions:
+                    # The copies keep the reactants, so the templates are not re-applied
+                    actions = (
+                        novel_actions
+                        if index == 0
+                        else [action.copy() for action in novel_actions]
+                    )
+                    possible_actions, priors = self._integrate_novel_templates(
+                        possible_actions, priors, actions, novel_scores
+                    )
+                all_possible_actions.extend(possible_actions)
+                all_priors.extend(priors)
+        elif self._config.search.optimisation_type in ['popular', 'overlooked']:
             templates = self._get_optimised_templates()
-            
+
             for name in self.selection:
-                compatible_templates, found_templates = self._check_novel_compatibility(templates, molecules)
-                
-                if found_templates:
-                    possible_actions, priors = self[name].get_actions(molecules)
-                    possible_actions, priors = self._integrate_novel_templates(possible_actions, priors, compatible_templates, templates, molecules)
-                    all_possible_actions.extend(possible_actions)
-                    all_priors.extend(priors)
+                strategy = self[name]
+                if isinstance(strategy, TemplateBasedExpansionStrategy):
+                    self._set_template_boost(strategy, templates)
+                    possible_actions, priors = strategy.get_actions(
+                        molecules, cache_molecules
+                    )
                 else:
-                    possible_actions, priors = self[name].get_actions(molecules)
-                    all_possible_actions.extend(possible_actions)
-                    all_priors.extend(priors)
-        elif self._config.search.optimisation_type == 'popular' or self._config.search.optimisation_type == 'overlooked':
-            templates = self._get_optimised_templates()
-            
-            for name in self.selection:
-                possible_actions, priors = self[name].get_actions(molecules)
-                possible_actions, priors = self._optimise_templates(possible_actions, priors, templates)
+                    possible_actions, priors = strategy.get_actions(molecules)
+                    possible_actions, priors = self._optimise_templates(
+                        possible_actions, priors, templates
+                    )
                 all_possible_actions.extend(possible_actions)
                 all_priors.extend(priors)
         else:
+            self._clear_template_boosts()
             for name in self.selection:
                 possible_actions, priors = self[name].get_actions(
                     molecules, cache_molecules
@@ -255,6 +296,66 @@ class ExpansionPolicy(ContextCollection):
                 all_priors.extend(priors)
         return all_possible_actions, all_priors
 
+    def get_action_records(
+        self,
+        molecules: Sequence[TreeMolecule],
+        cache_molecules: Sequence[TreeMolecule] = None,
+    ) -> Tuple[List[Union[RetroReaction, ActionRecord]], List[float]]:
+        """
+        Get all the probable actions of a set of molecules, using the selected policies.
+        The actions may be compact records that are turned into reactions
+        with `make_action`.
+
+        When novel templates are integrated or when templates are optimised with
+        a strategy that is not template-based, the actions are always reactions.
+
+        :param molecules: the molecules to consider
+        :param cache_molecules: additional molecules that potentially are sent to
+                                  the expansion model but for which predictions are not returned
+        :return: the actions or action records and the priors of those actions
+        :raises: PolicyException: if the policy isn't selected
+        """
+        optimisation_type = self._config.search.optimisation_type
+        boost_templates = optimisation_type in ["popular", "overlooked"]
+        if optimisation_type == "novel" or (
+            boost_templates
+            and not all(
+                isinstance(self[name], TemplateBasedExpansionStrategy)
+                for name in self.selection
+            )
+        ):
+            return self.get_actions(molecules, cache_molecules)  # type: ignore
+
+        if not self.selection:
+            raise PolicyException("No expansion policy selected")
+
+        if not boost_templates:
+            self._clear_template_boosts()
+        all_records: List[Union[RetroReaction, ActionRecord]] = []
+        all_priors: List[float] = []
+        for name in self.selection:
+            if boost_templates:
+                templates = self._get_optimised_templates()
+                self._set_template_boost(self[name], templates)  # type: ignore
+            records, priors = self[name].get_action_records(molecules, cache_molecules)
+            all_records.extend(records)
+            all_priors.extend(priors)
+        return all_records, all_priors
+
+    def make_action(self, record: Union[RetroReaction, ActionRecord]) -> RetroReaction:
+        """
+        Create the reaction described by an action record, using
+        the expansion strategy that created the record.
+
+        Reactions are returned as they are.
+
+        :param record: the action record or reaction
+        :return: the reaction
+        """
+        if isinstance(record, ActionRecord):
+            return self[record.policy_name].make_action(record)
+        return record
+
     def load(self, source: ExpansionStrategy) -> None:  # type: ignore
         """
         Add a pre-initialized expansion strategy object to the policy
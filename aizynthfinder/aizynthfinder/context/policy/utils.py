@@ -2,6 +2,8 @@
 """
 from __future__ import annotations
 
+import hashlib
+import os
 from typing import TYPE_CHECKING
 
 import numpy as np
@@ -9,7 +11,7 @@ import numpy as np
 if TYPE_CHECKING:
     from aizynthfinder.chem import TreeMolecule
     from aizynthfinder.chem.reaction import RetroReaction
-    from aizynthfinder.utils.type_utils import Any, Union
+    from aizynthfinder.utils.type_utils import Any, Optional, Union
 
 
 def _make_fingerprint(
@@ -17,3 +19,40 @@ def _make_fingerprint(
 ) -> np.ndarray:
     fingerprint = obj.fingerprint(radius=2, nbits=len(model), chiral=chiral)
     return fingerprint.reshape([1, len(model)])
+
+
+def _array_hash(array: Optional[np.ndarray]) -> str:
+    if array is None:
+        return ""
+    return hashlib.sha224(np.ascontiguousarray(array).tobytes()).hexdigest()
+
+
+def _boost_probabilities(
+    probabilities: np.ndarray, scores: np.ndarray, selected: np.ndarray
+) -> np.ndarray:
+    """
+    Boost the probabilities of the templates of one molecule, the rule of
+    the "popular" and "overlooked" optimisations.
+
+    Each probability is increased by its score times the variance of the
+    probabilities of the templates selected without a boost, and the
+    boosted probabilities are normalized to sum to one.
+
+    :param probabilities: the probabilities of the templates
+    :param scores: the boost score of each template
+    :param selected: the indices of the templates selected without a boost
+    :return: the boosted probabilities
+    """
+    boosted = probabilities + scores * np.var(probabilities[selected])
+    return boosted / boosted.sum()
+
+
+def _file_hash(source: str) -> str:
+    # Remote models or models that are not files are identified by their source
+    if not os.path.isfile(source):
+        return hashlib.sha224(source.encode()).hexdigest()
+    sha = hashlib.sha224()
+    with open(source, "rb") as fileobj:
+        for chunk in iter(lambda: fileobj.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
@@ -20,12 +20,12 @@ else:
     SUPPORT_DISTANCES = True
 
 from aizynthfinder.chem import TreeMolecule
-from aizynthfinder.context.stock import StockException
 from aizynthfinder.reactiontree import ReactionTree
 from aizynthfinder.search.mcts import MctsNode
 from aizynthfinder.utils.bonds import BrokenBonds
 from aizynthfinder.utils.exceptions import ScorerException
 from aizynthfinder.utils.logging import logger
+from aizynthfinder.utils.profiling import phase_profiler
 from aizynthfinder.utils.sc_score import SCScore
 
 if TYPE_CHECKING:
@@ -121,11 +121,15 @@ class Scorer(abc.ABC):
         scorer = MyScorer()
         scores = scorer([node1, node2])
 
+    If the score of a node only depends on the state of the node, and not on
+    the reactions that lead to it, the class sets `state_only` to True.
+
     :param config: the configuration the tree search
     :param scaler_params: the parameter settings of the scaler
     """
 
     scorer_name = "base"
+    state_only = False
 
     def __init__(
         self,
@@ -149,7 +153,8 @@ class Scorer(abc.ABC):
         if isinstance(item, SequenceAbc):
             return self._score_many(item)
         if isinstance(item, (MctsNode, ReactionTree)):
-            return self._score_just_one(item)  # type: ignore
+            with phase_profiler().phase(f"scoring: {self.scorer_name}"):
+                return self._score_just_one(item)  # type: ignore
         raise ScorerException(
             f"Unable to score item from class {item.__class__.__name__}"
         )
@@ -209,6 +214,7 @@ class StateScorer(Scorer):
     """Class for scoring nodes based on the state score"""
 
     scorer_name = "state score"
+    state_only = True
 
     def __init__(
         self, config: Configuration, scaler_params: Optional[StrDict] = None
@@ -241,6 +247,7 @@ class MaxTransformScorerer(Scorer):
     """Class for scoring nodes based on the maximum transform"""
 
     scorer_name = "max transform"
+    state_only = True
 
     def _score_node(self, node: MctsNode) -> float:
         return node.state.max_transforms
@@ -259,6 +266,7 @@ class FractionInStockScorer(Scorer):
     """Class for scoring nodes based on the fraction in stock"""
 
     scorer_name = "fraction in stock"
+    state_only = True
 
     def __init__(
         self, config: Configuration, scaler_params: Optional[StrDict] = None
@@ -274,7 +282,7 @@ class FractionInStockScorer(Scorer):
 
     def _score_reaction_tree(self, tree: ReactionTree) -> float:
         leaves = list(tree.leafs())
-        num_in_stock = sum(mol in self._config.stock for mol in leaves)
+        num_in_stock = sum(self._config.stock.contains_many(leaves))
         num_molecules = len(leaves)
         return float(num_in_stock) / float(num_molecules)
 
@@ -388,15 +396,13 @@ class PriceSumScorer(Scorer):
         self, leafs: Union[Sequence[Molecule], Iterable[Molecule]]
     ) -> dict:
         costs = {}
-        for mol in leafs:
-            if mol not in self._config.stock:
-                continue
-            try:
-                cost = self._config.stock.price(mol)
-            except StockException:
-                costs[mol] = self.default_cost
-            else:
-                costs[mol] = cost
+        leafs = list(leafs)
+        stock = self._config.stock
+        mols_in_stock = [
+            mol for mol, in_stock in zip(leafs, stock.contains_many(leafs)) if in_stock
+        ]
+        for mol, price in zip(mols_in_stock, stock.prices_many(mols_in_stock)):
+            costs[mol] = self.default_cost if price is None else price
 
         max_cost = max(costs.values()) if costs else self.default_cost
         return defaultdict(lambda: max_cost * self.not_in_stock_multiplier, costs)
@@ -558,8 +564,14 @@ class StockAvailabilityScorer(Scorer):
     ) -> float:
         assert self._config is not None
         prod = 1.0
-        for mol in leafs:
-            availability = self._config.stock.availability_list(mol)
+        leafs = list(leafs)
+        stock = self._config.stock
+        availabilities = stock.availability_lists(leafs)
+        if self.other_source_score:
+            in_stock_list = stock.contains_many(leafs)
+        else:
+            in_stock_list = [False] * len(leafs)
+        for availability, in_stock in zip(availabilities, in_stock_list):
             scores = [
                 self.source_score[source]
                 for source in availability
@@ -567,7 +579,7 @@ class StockAvailabilityScorer(Scorer):
             ]
             if scores:
                 prod *= max(scores)
-            elif self.other_source_score and mol in self._config.stock:
+            elif self.other_source_score and in_stock:
                 prod *= self.other_source_score
             else:
                 prod *= self.default_score
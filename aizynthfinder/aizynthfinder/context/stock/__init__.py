@@ -1,8 +1,11 @@
 """ Sub-package containing stock routines
 """
 from aizynthfinder.context.stock.queries import (
+    CachedStockQuery,
     InMemoryInchiKeyQuery,
+    MemoryMappedInchiKeyQuery,
     MongoDbInchiKeyQuery,
+    SqliteInchiKeyQuery,
     StockQueryMixin,
 )
 from aizynthfinder.context.stock.stock import Stock
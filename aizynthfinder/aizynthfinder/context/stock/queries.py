@@ -3,9 +3,18 @@
 
 from __future__ import annotations
 
+import hashlib
+import math
+import itertools
 import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
 from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -16,14 +25,28 @@ else:
     HAS_MOLBLOOM = True
 
 from aizynthfinder.chem import Molecule
+from aizynthfinder.utils.cache import LruCache
 from aizynthfinder.utils.exceptions import StockException
+from aizynthfinder.utils.loading import load_dynamic_class
 from aizynthfinder.utils.mongo import get_mongo_client
 
 if TYPE_CHECKING:
     from pymongo.collection import Collection as MongoCollection
     from pymongo.database import Database as MongoDatabase
 
-    from aizynthfinder.utils.type_utils import Optional, Set, StrDict
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        Iterable,
+        Iterator,
+        List,
+        Optional,
+        Sequence,
+        Set,
+        StrDict,
+        Tuple,
+        Union,
+    )
 
 
 class StockQueryMixin:
@@ -72,6 +95,24 @@ class StockQueryMixin:
     def clear_cache(self) -> None:
         """Clear the internal search cache if available"""
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        """
+        Returns if each of a number of molecules is in stock
+
+        :param mols: the query molecules
+        :return: if each molecule is in stock
+        """
+        return [mol in self for mol in mols]
+
+    def inchi_keys(self) -> Iterator[str]:
+        """
+        Returns the InChI keys of the molecules in stock
+
+        :raises StockException: if the keys cannot be listed
+        :return: an iterator over the keys
+        """
+        raise StockException("Cannot list the InChI keys")
+
     def price(self, mol: Molecule) -> float:
         """
         Returns the minimum price of the molecule in stock
@@ -82,6 +123,21 @@ class StockQueryMixin:
         """
         raise StockException("Cannot compute price")
 
+    def prices_many(self, mols: Sequence[Molecule]) -> List[Optional[float]]:
+        """
+        Returns the minimum price of each of a number of molecules
+
+        :param mols: the query molecules
+        :return: the price of each molecule, or None if it cannot be computed
+        """
+        prices: List[Optional[float]] = []
+        for mol in mols:
+            try:
+                prices.append(self.price(mol))
+            except StockException:
+                prices.append(None)
+        return prices
+
 
 class InMemoryInchiKeyQuery(StockQueryMixin):
     """
@@ -156,6 +212,14 @@ class InMemoryInchiKeyQuery(StockQueryMixin):
         """Return the InChiKeys in this stock"""
         return self._stock_inchikeys
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        inchi_keys = [mol.inchi_key for mol in mols]
+        found = self._stock_inchikeys.intersection(inchi_keys)
+        return [inchi_key in found for inchi_key in inchi_keys]
+
+    def inchi_keys(self) -> Iterator[str]:
+        return iter(self._stock_inchikeys)
+
     def price(self, mol: Molecule) -> float:
         if not self._price_dict:
             raise StockException(
@@ -165,6 +229,351 @@ class InMemoryInchiKeyQuery(StockQueryMixin):
             return self._price_dict[mol.inchi_key]
         raise StockException(f"no price info available for {mol.smiles}")
 
+    def prices_many(self, mols: Sequence[Molecule]) -> List[Optional[float]]:
+        return [self._price_dict.get(mol.inchi_key) for mol in mols]
+
+
+class MemoryMappedInchiKeyQuery(StockQueryMixin):
+    """
+    A stock query class that is based on a memory-mapped file of
+    sorted InChI keys, optionally with a price for each key.
+
+    The keys are stored as fixed-width bytes and are looked up by binary search.
+    The file is not read into memory, so all processes that use the same file share
+    the pages cached by the operating system.
+
+    The file is created with the `create` method, or with the ``smiles2stock`` tool.
+
+    :parameter path: the path to the file
+    """
+
+    _MAGIC = b"AZINCHI1"
+    # The magic bytes, the number of keys, the width of a key and if there are prices
+    _HEADER = struct.Struct("<8sQQQ")
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as fileobj:
+            header = fileobj.read(self._HEADER.size)
+        if len(header) != self._HEADER.size:
+            raise StockException(f"{path} is not a memory-mapped stock file")
+        magic, nkeys, width, has_prices = self._HEADER.unpack(header)
+        if magic != self._MAGIC:
+            raise StockException(f"{path} is not a memory-mapped stock file")
+
+        self._width = width
+        if nkeys == 0:
+            self._keys = np.zeros(0, dtype=f"S{max(width, 1)}")
+            self._prices = np.zeros(0, dtype=np.float32) if has_prices else None
+            return
+
+        # Plain array views of the memory maps are faster to index
+        offset = self._HEADER.size
+        self._keys = np.memmap(
+            path, dtype=f"S{width}", mode="r", offset=offset, shape=(nkeys,)
+        ).view(np.ndarray)
+        self._prices = None
+        if has_prices:
+            self._prices = np.memmap(
+                path,
+                dtype=np.float32,
+                mode="r",
+                offset=self._prices_offset(nkeys, width),
+                shape=(nkeys,),
+            ).view(np.ndarray)
+
+    def __contains__(self, mol: Molecule) -> bool:
+        return self._index(mol.inchi_key) >= 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def create(
+        cls,
+        filename: str,
+        inchi_keys: Iterable[str],
+        prices: Optional[Iterable[float]] = None,
+    ) -> None:
+        """
+        Create a memory-mapped stock file. Only unique InChI keys are stored,
+        and if a key is given several times, its lowest price is stored.
+
+        :param filename: the path to the file
+        :param inchi_keys: the InChI keys
+        :param prices: the price of each key, optional
+        :raises StockException: if the prices are not valid
+        """
+        data = pd.DataFrame({"inchi_key": list(inchi_keys)})
+        if prices is not None:
+            data["price"] = list(prices)
+            if data["price"].isnull().sum() != 0 or data["price"].min() < 0:
+                raise StockException("expected non-negative prices without nulls")
+            data = data.groupby("inchi_key", as_index=False)["price"].min()
+        else:
+            data = data.drop_duplicates("inchi_key")
+        keys = data["inchi_key"].to_numpy(dtype=bytes)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        width = keys.dtype.itemsize if len(keys) else 0
+
+        with open(filename, "wb") as fileobj:
+            fileobj.write(
+                cls._HEADER.pack(cls._MAGIC, len(keys), width, prices is not None)
+            )
+            fileobj.write(keys.tobytes())
+            if prices is not None:
+                fileobj.write(
+                    b"\0" * (cls._prices_offset(len(keys), width) - fileobj.tell())
+                )
+                fileobj.write(data["price"].to_numpy(dtype=np.float32)[order].tobytes())
+
+    @classmethod
+    def create_from_sorted(
+        cls,
+        filename: str,
+        chunks: Iterable[Any],
+        width: int,
+        with_prices: bool = False,
+    ) -> int:
+        """
+        Create a memory-mapped stock file, writing one chunk of InChI keys
+        at a time. The keys must be unique and sorted, also across the chunks.
+
+        If the stock has prices, each chunk is a tuple of the keys and their
+        prices. The prices are written to a temporary file next to the stock
+        until all the keys are written.
+
+        :param filename: the path to the file
+        :param chunks: the chunks of sorted InChI keys, or of keys and prices
+        :param width: the length in bytes of the longest key
+        :param with_prices: if True, the chunks have prices
+        :raises StockException: if the prices are not valid
+        :return: the number of keys
+        """
+        nkeys = 0
+        dirname = os.path.dirname(os.path.abspath(filename))
+        with open(filename, "wb") as fileobj, tempfile.TemporaryFile(
+            dir=dirname
+        ) as pricesobj:
+            fileobj.write(cls._HEADER.pack(cls._MAGIC, 0, width, with_prices))
+            for chunk in chunks:
+                if with_prices:
+                    chunk, prices = chunk
+                    prices = np.asarray(prices, dtype=np.float32)
+                    if np.isnan(prices).any() or (prices < 0).any():
+                        raise StockException(
+                            "expected non-negative prices without nulls"
+                        )
+                    pricesobj.write(prices.tobytes())
+                if not len(chunk):
+                    continue
+                keys = np.asarray([key.encode() for key in chunk], dtype=f"S{width}")
+                fileobj.write(keys.tobytes())
+                nkeys += len(keys)
+            if with_prices:
+                fileobj.write(
+                    b"\0" * (cls._prices_offset(nkeys, width) - fileobj.tell())
+                )
+                pricesobj.seek(0)
+                shutil.copyfileobj(pricesobj, fileobj)
+            # The number of keys is known when all the chunks are written
+            fileobj.seek(0)
+            fileobj.write(cls._HEADER.pack(cls._MAGIC, nkeys, width, with_prices))
+        return nkeys
+
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        return [idx >= 0 for idx in self._indices(mols)]
+
+    def inchi_keys(self) -> Iterator[str]:
+        return (key.decode() for key in self._keys)
+
+    def price(self, mol: Molecule) -> float:
+        if self._prices is None:
+            raise StockException(
+                "no prices created, check the path type and if price column is supplied"
+            )
+        idx = self._index(mol.inchi_key)
+        if idx < 0:
+            raise StockException(f"no price info available for {mol.smiles}")
+        return float(self._prices[idx])
+
+    def prices_many(self, mols: Sequence[Molecule]) -> List[Optional[float]]:
+        if self._prices is None:
+            return [None] * len(mols)
+        prices = self._prices
+        return [float(prices[idx]) if idx >= 0 else None for idx in self._indices(mols)]
+
+    def _index(self, inchi_key: str) -> int:
+        key = inchi_key.encode()
+        if not key or len(key) > self._width:
+            return -1
+        idx = int(self._keys.searchsorted(key))
+        if idx < len(self._keys) and self._keys[idx] == key:
+            return idx
+        return -1
+
+    def _indices(self, mols: Sequence[Molecule]) -> List[int]:
+        if not mols or not len(self._keys):
+            return [-1] * len(mols)
+        keys = [mol.inchi_key.encode() for mol in mols]
+        # Keys that are longer than the stored ones cannot be in stock,
+        # and would be truncated when converted to the array type
+        queries = np.asarray(keys, dtype=self._keys.dtype)
+        indices = np.minimum(self._keys.searchsorted(queries), len(self._keys) - 1)
+        found = (self._keys[indices] == queries) & np.asarray(
+            [0 < len(key) <= self._width for key in keys]
+        )
+        return np.where(found, indices, -1).tolist()
+
+    @classmethod
+    def _prices_offset(cls, nkeys: int, width: int) -> int:
+        # The prices are aligned to 8 bytes
+        size = cls._HEADER.size + nkeys * width
+        return size + (-size % 8)
+
+
+class SqliteInchiKeyQuery(StockQueryMixin):
+    """
+    A stock query class that is looking up InChI keys in a SQLite database,
+    for stocks that are too large to be kept in memory.
+
+    The database has a table with one row for each InChI key, the primary key,
+    and optionally the price and amount of the compound. The database is
+    created with the `create` method, or with the ``smiles2stock`` tool.
+
+    Each process opens its own read-only connection to the database, when
+    the first molecule is looked up.
+
+    :parameter path: the path to the database
+    """
+
+    # The maximum number of InChI keys in one query, below the SQLite limit
+    _BATCH_SIZE = 500
+    _CHUNK_SIZE = 100000
+
+    def __init__(self, path: str) -> None:
+        if not os.path.exists(path):
+            raise StockException(f"{path} is not a SQLite stock file")
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._len: Optional[int] = None
+
+    def __contains__(self, mol: Molecule) -> bool:
+        return bool(self._execute("SELECT 1", "= ?", [mol.inchi_key]))
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = (
+                self._database().execute("SELECT COUNT(*) FROM molecules").fetchone()[0]
+            )
+        return self._len
+
+    def __str__(self) -> str:
+        return f"'SQLite stock {self.path}'"
+
+    @classmethod
+    def create(
+        cls,
+        filename: str,
+        rows: Iterable[Tuple[str, Optional[float], Optional[float]]],
+    ) -> int:
+        """
+        Create a SQLite stock database, overwriting an existing file.
+
+        The rows are written in chunks, so they can be streamed from files
+        larger than the memory. If an InChI key is given several times,
+        e.g. by several vendors, its lowest price and highest amount are stored.
+
+        :param filename: the path to the database
+        :param rows: the InChI key, the price and the amount of each compound,
+                     the price and amount can be None
+        :raises StockException: if the prices or amounts are negative
+        :return: the number of unique InChI keys
+        """
+        if os.path.exists(filename):
+            os.remove(filename)
+        connection = sqlite3.connect(filename)
+        try:
+            connection.execute(
+                "CREATE TABLE staging (inchi_key TEXT NOT NULL, price REAL, amount REAL)"
+            )
+            rows = iter(rows)
+            while True:
+                chunk = list(itertools.islice(rows, cls._CHUNK_SIZE))
+                if not chunk:
+                    break
+                connection.executemany("INSERT INTO staging VALUES (?, ?, ?)", chunk)
+            nnegatives = connection.execute(
+                "SELECT COUNT(*) FROM staging WHERE price < 0 OR amount < 0"
+            ).fetchone()[0]
+            if nnegatives:
+                raise StockException("expected non-negative prices and amounts")
+
+            # The keys are sorted and grouped by SQLite, on the disk if necessary
+            connection.execute(
+                "CREATE TABLE molecules (inchi_key TEXT PRIMARY KEY, price REAL, "
+                "amount REAL) WITHOUT ROWID"
+            )
+            connection.execute(
+                "INSERT INTO molecules SELECT inchi_key, MIN(price), MAX(amount) "
+                "FROM staging GROUP BY inchi_key"
+            )
+            connection.execute("DROP TABLE staging")
+            connection.commit()
+            connection.execute("VACUUM")
+            return connection.execute("SELECT COUNT(*) FROM molecules").fetchone()[0]
+        finally:
+            connection.close()
+
+    def amount(self, mol: Molecule) -> float:
+        rows = self._execute("SELECT amount", "= ?", [mol.inchi_key])
+        if not rows or rows[0][0] is None:
+            raise StockException(f"no amount info available for {mol.smiles}")
+        return rows[0][0]
+
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        found = {row[0] for row in self._execute_many("SELECT inchi_key", mols)}
+        return [mol.inchi_key in found for mol in mols]
+
+    def inchi_keys(self) -> Iterator[str]:
+        cursor = self._database().execute("SELECT inchi_key FROM molecules")
+        for row in cursor:
+            yield row[0]
+
+    def price(self, mol: Molecule) -> float:
+        rows = self._execute("SELECT price", "= ?", [mol.inchi_key])
+        if not rows or rows[0][0] is None:
+            raise StockException(f"no price info available for {mol.smiles}")
+        return rows[0][0]
+
+    def prices_many(self, mols: Sequence[Molecule]) -> List[Optional[float]]:
+        prices = dict(self._execute_many("SELECT inchi_key, price", mols))
+        return [prices.get(mol.inchi_key) for mol in mols]
+
+    def _database(self) -> sqlite3.Connection:
+        # A connection cannot be shared with forked processes
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._pid = os.getpid()
+        return self._connection
+
+    def _execute(self, select: str, condition: str, inchi_keys: List[str]) -> List:
+        return (
+            self._database()
+            .execute(f"{select} FROM molecules WHERE inchi_key {condition}", inchi_keys)
+            .fetchall()
+        )
+
+    def _execute_many(self, select: str, mols: Sequence[Molecule]) -> List:
+        inchi_keys = list({mol.inchi_key for mol in mols})
+        rows = []
+        for start in range(0, len(inchi_keys), self._BATCH_SIZE):
+            batch = inchi_keys[start : start + self._BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(self._execute(select, f"IN ({placeholders})", batch))
+        return rows
+
 
 class MongoDbInchiKeyQuery(StockQueryMixin):
     """
@@ -218,6 +627,19 @@ class MongoDbInchiKeyQuery(StockQueryMixin):
         ]
         return ",".join(sources)
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        inchi_keys = [mol.inchi_key for mol in mols]
+        if not inchi_keys:
+            return []
+        found = set(
+            self.molecules.distinct("inchi_key", {"inchi_key": {"$in": inchi_keys}})
+        )
+        return [inchi_key in found for inchi_key in inchi_keys]
+
+    def inchi_keys(self) -> Iterator[str]:
+        for document in self.molecules.find({}, {"inchi_key": 1, "_id": 0}):
+            yield document["inchi_key"]
+
 
 class MolbloomFilterQuery(StockQueryMixin):
     """
@@ -242,9 +664,236 @@ class MolbloomFilterQuery(StockQueryMixin):
             return mol.smiles in self._filter
         return mol.inchi_key in self._filter
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        filter_ = self._filter
+        if self._smiles_based:
+            return [mol.smiles in filter_ for mol in mols]
+        return [mol.inchi_key in filter_ for mol in mols]
+
+
+class CachedStockQuery(StockQueryMixin):
+    """
+    A stock query class that puts a negative filter and a cache of recent
+    answers in front of another stock query class, e.g. a MongoDB stock
+    where every lookup is a round trip to the database server.
+
+    A molecule whose InChI key is not in the filter is not in stock, and is
+    rejected without querying the wrapped stock. The filter is either a molbloom
+    filter of the InChI keys of the wrapped stock, or a bloom filter that is built
+    from the InChI keys listed by the wrapped stock when this query is created.
+    The filter can let through some molecules that are not in stock, and these
+    are answered by the wrapped stock. The answers of the wrapped stock are kept
+    in a bounded cache.
+
+    The wrapped stock can be given as an object or as a configuration, e.g.
+
+    .. code-block:: yaml
+
+        stock:
+            zinc:
+                type: cached
+                query:
+                    type: mongodb
+                    host: localhost
+                build_filter: True
+
+    :ivar query: the wrapped stock query
+    :ivar cache: the cached answers of the wrapped stock, by InChI key
+
+    :parameter query: the wrapped stock query, or a dictionary with the type of
+                      the query class and the arguments to it
+    :parameter bloom_path: the path to a molbloom filter of the InChI keys
+                           in the wrapped stock, defaults to None
+    :parameter build_filter: if True, build a filter from the InChI keys of the
+                             wrapped stock, defaults to False
+    :parameter false_positive_rate: the false positive rate of a built filter
+    :parameter cache_size: the maximum number of cached answers
+    """
+
+    def __init__(
+        self,
+        query: Union[StockQueryMixin, StrDict],
+        bloom_path: Optional[str] = None,
+        build_filter: bool = False,
+        false_positive_rate: float = 0.01,
+        cache_size: int = 100000,
+    ) -> None:
+        if isinstance(query, dict):
+            kwargs = dict(query)
+            name = kwargs.pop("type", "inchiset")
+            cls = load_dynamic_class(
+                STOCK_QUERY_ALIAS.get(name, name), __name__, StockException
+            )
+            query = cls(**kwargs)
+        self.query: StockQueryMixin = query  # type: ignore
+        self.cache = LruCache(cache_size)
+        self._counters = {"lookups": 0, "filtered": 0, "backend_queries": 0}
+
+        self._filter: Any = None
+        if bloom_path:
+            if not HAS_MOLBLOOM:
+                raise ImportError(
+                    "Cannot use a molbloom filter because it seems like molbloom is not installed. "
+                    "Please install aizynthfinder with extras dependencies."
+                )
+            self._filter = molbloom.BloomFilter(bloom_path)
+        elif build_filter:
+            self._filter = _InchiKeyBloomFilter(
+                self.query.inchi_keys(), len(self.query), false_positive_rate
+            )
+
+    def __contains__(self, mol: Molecule) -> bool:
+        return self.contains_many([mol])[0]
+
+    def __len__(self) -> int:
+        return len(self.query)
+
+    def __str__(self) -> str:
+        return str(self.query)
+
+    def amount(self, mol: Molecule) -> float:
+        return self.query.amount(mol)
+
+    def availability_string(self, mol: Molecule) -> str:
+        return self.query.availability_string(mol)
+
+    def clear_cache(self) -> None:
+        """
+        Clear the internal search cache of the wrapped stock.
+
+        The cached answers are kept, they are cleared with ``cache.clear()``
+        """
+        self.query.clear_cache()
+
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        inchi_keys = [mol.inchi_key for mol in mols]
+        self._counters["lookups"] += len(mols)
+        # Each InChI key is only looked up once, even if it is given several times
+        unique_mols = dict(zip(inchi_keys, mols))
+        answers: Dict[str, bool] = {}
+        missing = []
+        for inchi_key, mol in unique_mols.items():
+            if self._filter is not None and inchi_key not in self._filter:
+                self._counters["filtered"] += 1
+                answers[inchi_key] = False
+                continue
+            answer = self.cache.get(inchi_key)
+            if answer is None:
+                missing.append(mol)
+            else:
+                answers[inchi_key] = answer
+
+        if missing:
+            self._counters["backend_queries"] += 1
+            found = self.query.contains_many(missing)
+            for mol, answer in zip(missing, found):
+                answers[mol.inchi_key] = answer
+                self.cache[mol.inchi_key] = answer
+        return [answers[inchi_key] for inchi_key in inchi_keys]
+
+    def inchi_keys(self) -> Iterator[str]:
+        return self.query.inchi_keys()
+
+    def price(self, mol: Molecule) -> float:
+        return self.query.price(mol)
+
+    def prices_many(self, mols: Sequence[Molecule]) -> List[Optional[float]]:
+        return self.query.prices_many(mols)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the counters of the lookups:
+            * lookups: the number of molecules that were looked up
+            * filtered: the number of molecules rejected by the filter
+            * cache_hits: the number of molecules answered by the cache
+            * backend_queries: the number of queries to the wrapped stock
+            * backend_lookups: the number of molecules looked up in the wrapped stock
+
+        :return: the counters by name
+        """
+        stats = dict(self._counters)
+        stats["cache_hits"] = self.cache.hits
+        stats["backend_lookups"] = self.cache.misses
+        return stats
+
+
+class _InchiKeyBloomFilter:
+    """
+    A bloom filter of InChI keys in a bit array.
+
+    Each key sets the bits at a number of positions, computed by double hashing
+    of the BLAKE2 digest of the key.
+
+    :param inchi_keys: the InChI keys to put in the filter
+    :param nkeys: the approximate number of keys, used to size the filter
+    :param false_positive_rate: the expected false positive rate
+    """
+
+    _CHUNK_SIZE = 100000
+    _MASK = 2**64 - 1
+
+    def __init__(
+        self, inchi_keys: Iterable[str], nkeys: int, false_positive_rate: float
+    ) -> None:
+        nkeys = max(nkeys, 1)
+        self._nbits = max(
+            int(math.ceil(-nkeys * math.log(false_positive_rate) / math.log(2) ** 2)),
+            64,
+        )
+        self._nhashes = max(int(round(self._nbits / nkeys * math.log(2))), 1)
+        bits = np.zeros((self._nbits + 7) // 8, dtype=np.uint8)
+
+        chunk: List[int] = []
+        for inchi_key in inchi_keys:
+            chunk.extend(self._hashes(inchi_key))
+            if len(chunk) >= 2 * self._CHUNK_SIZE:
+                self._set_bits(bits, chunk)
+                chunk = []
+        self._set_bits(bits, chunk)
+        self._bits = bits.tobytes()
+
+    def __contains__(self, inchi_key: str) -> bool:
+        bits = self._bits
+        for position in self._positions(*self._hashes(inchi_key)):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _hashes(self, inchi_key: str) -> Tuple[int, int]:
+        digest = hashlib.blake2b(inchi_key.encode(), digest_size=16).digest()
+        return (
+            int.from_bytes(digest[:8], sys.byteorder),
+            int.from_bytes(digest[8:], sys.byteorder),
+        )
+
+    def _positions(self, hash1: int, hash2: int) -> Iterable[int]:
+        return (
+            ((hash1 + idx * hash2) & self._MASK) % self._nbits
+            for idx in range(self._nhashes)
+        )
+
+    def _set_bits(self, bits: np.ndarray, hashes: List[int]) -> None:
+        if not hashes:
+            return
+        hashes_arr = np.asarray(hashes, dtype=np.uint64).reshape(-1, 2)
+        # The unsigned arithmetic wraps around at 2**64, like the masked lookups
+        positions = (
+            hashes_arr[:, :1]
+            + np.arange(self._nhashes, dtype=np.uint64) * hashes_arr[:, 1:]
+        ) % np.uint64(self._nbits)
+        positions = positions.ravel()
+        np.bitwise_or.at(
+            bits,
+            (positions >> np.uint64(3)).astype(np.intp),
+            (np.uint64(1) << (positions & np.uint64(7))).astype(np.uint8),
+        )
+
 
 STOCK_QUERY_ALIAS = {
     "inchiset": "InMemoryInchiKeyQuery",
     "mongodb": "MongoDbInchiKeyQuery",
     "bloom": "MolbloomFilterQuery",
+    "mmap": "MemoryMappedInchiKeyQuery",
+    "cached": "CachedStockQuery",
+    "sqlite": "SqliteInchiKeyQuery",
 }
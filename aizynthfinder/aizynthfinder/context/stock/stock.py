@@ -10,13 +10,16 @@ from aizynthfinder.chem import Molecule
 from aizynthfinder.context.collection import ContextCollection
 from aizynthfinder.context.stock.queries import (
     InMemoryInchiKeyQuery,
+    MemoryMappedInchiKeyQuery,
     MolbloomFilterQuery,
+    SqliteInchiKeyQuery,
     STOCK_QUERY_ALIAS,
     StockQueryMixin,
 )
 from aizynthfinder.context.stock.queries import __name__ as queries_module
 from aizynthfinder.utils.exceptions import StockException
 from aizynthfinder.utils.loading import load_dynamic_class
+from aizynthfinder.utils.profiling import phase_profiler
 
 if TYPE_CHECKING:
     from aizynthfinder.utils.type_utils import (
@@ -24,6 +27,7 @@ if TYPE_CHECKING:
         Dict,
         List,
         Optional,
+        Sequence,
         Set,
         StrDict,
         Union,
@@ -53,6 +57,13 @@ class Stock(ContextCollection):
 
         number_of_molecules = len(stock)
 
+    A number of molecules can be queried at once, which lets the stock
+    queries look them up together:
+
+    .. code-block::
+
+        in_stock_list = stock.contains_many(mols)
+
     """
 
     _collection_name = "stock"
@@ -67,13 +78,14 @@ class Stock(ContextCollection):
         if not self.selection or mol.inchi_key in self._exclude:
             return False
 
-        if self._use_stop_criteria:
-            return self._apply_stop_criteria(mol)
+        with phase_profiler().phase("stock lookup"):
+            if self._use_stop_criteria:
+                return self._apply_stop_criteria(mol)
 
-        for key in self.selection:
-            if mol in self[key]:
-                return True
-        return False
+            for key in self.selection:
+                if mol in self[key]:
+                    return True
+            return False
 
     def __len__(self) -> int:
         return sum(len(self[key]) for key in self.selection or [])
@@ -115,6 +127,28 @@ class Stock(ContextCollection):
                 availability.append(key)
         return sorted(list(set(availability)))
 
+    def availability_lists(self, mols: Sequence[Molecule]) -> List[List[str]]:
+        """
+        Return a list of what stocks each of a number of molecules is available in,
+        see `availability_list`
+
+        :param mols: the molecules to query
+        :returns: the list of stocks for each molecule
+        """
+        availabilities: List[Set[str]] = [set() for _ in mols]
+        for key in self.selection or []:
+            query = self[key]
+            for mol, availability, in_stock in zip(
+                mols, availabilities, query.contains_many(mols)
+            ):
+                if not in_stock:
+                    continue
+                try:
+                    availability.update(query.availability_string(mol).split(","))
+                except (StockException, AttributeError):
+                    availability.add(key)
+        return [sorted(availability) for availability in availabilities]
+
     def availability_string(self, mol: Molecule) -> str:
         """
         Return a string of what stocks a given mol is available
@@ -129,6 +163,42 @@ class Stock(ContextCollection):
             return ",".join(availability)
         return "Not in stock"
 
+    def contains_many(self, mols: Sequence[Molecule]) -> List[bool]:
+        """
+        Return if each of a number of molecules is in the selected stocks.
+
+        The molecules are looked up together in each stock query, and only
+        the molecules that were not found are looked up in the next query.
+
+        :param mols: the molecules to query
+        :returns: if each molecule is in stock
+        """
+        in_stock_list = [False] * len(mols)
+        if not self.selection:
+            return in_stock_list
+
+        remaining = [
+            idx for idx, mol in enumerate(mols) if mol.inchi_key not in self._exclude
+        ]
+        with phase_profiler().phase("stock lookup"):
+            if self._use_stop_criteria:
+                for idx in remaining:
+                    in_stock_list[idx] = self._apply_stop_criteria(mols[idx])
+                return in_stock_list
+
+            for key in self.selection:
+                if not remaining:
+                    break
+                found = self[key].contains_many([mols[idx] for idx in remaining])
+                not_found = []
+                for idx, in_stock in zip(remaining, found):
+                    if in_stock:
+                        in_stock_list[idx] = True
+                    else:
+                        not_found.append(idx)
+                remaining = not_found
+        return in_stock_list
+
     def exclude(self, mol: Molecule) -> None:
         """
         Exclude a molecule from the stock.
@@ -182,6 +252,10 @@ class Stock(ContextCollection):
                 kwargs = {"path": stock_config}
                 if stock_config.endswith(".bloom"):
                     cls: Any = MolbloomFilterQuery
+                elif stock_config.endswith(".mmap"):
+                    cls = MemoryMappedInchiKeyQuery
+                elif stock_config.endswith(".sqlite"):
+                    cls = SqliteInchiKeyQuery
                 else:
                     cls = InMemoryInchiKeyQuery
             else:
@@ -214,6 +288,21 @@ class Stock(ContextCollection):
             raise StockException("Could not obtain price of molecule")
         return min(prices)
 
+    def prices_many(self, mols: Sequence[Molecule]) -> List[Optional[float]]:
+        """
+        Calculate the minimum price of each of a number of molecules in stock
+
+        :param mols: the molecules to query
+        :return: the minimum price of each molecule, or None if it could not be computed
+        """
+        prices: List[Optional[float]] = [None] * len(mols)
+        for key in self.selection or []:
+            for idx, price in enumerate(self[key].prices_many(mols)):
+                current = prices[idx]
+                if price is not None and (current is None or price < current):
+                    prices[idx] = price
+        return prices
+
     def reset_exclusion_list(self) -> None:
         """Remove all molecules in the exclusion list"""
         self._exclude = set()
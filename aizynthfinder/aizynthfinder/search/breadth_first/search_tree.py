@@ -5,6 +5,7 @@ from __future__ import annotations
 import json
 from typing import TYPE_CHECKING
 
+from aizynthfinder.chem.reaction import release_rdchiral_product
 from aizynthfinder.chem.serialization import MoleculeDeserializer, MoleculeSerializer
 from aizynthfinder.search.andor_trees import AndOrSearchTreeBase, SplitAndOrTree
 from aizynthfinder.search.breadth_first.nodes import MoleculeNode
@@ -157,6 +158,7 @@ class SearchTree(AndOrSearchTreeBase):
             for idx, _ in enumerate(reaction.reactants):
                 rxn_copy = reaction.copy(idx)
                 reactions_to_expand.append(rxn_copy)
+        release_rdchiral_product(node.mol)
 
         for rxn in reactions_to_expand:
             new_nodes = node.add_stub(rxn)
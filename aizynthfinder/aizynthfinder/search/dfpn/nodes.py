@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING
 import numpy as np
 
 from aizynthfinder.chem import TreeMolecule
+from aizynthfinder.chem.reaction import release_rdchiral_product
 from aizynthfinder.search.andor_trees import TreeNodeMixin
 
 if TYPE_CHECKING:
@@ -163,6 +164,7 @@ class MoleculeNode(_SuperNode):
                 rxn_copy = reaction.copy(idx)
                 reactions_to_expand.append(rxn_copy)
                 reaction_costs.append(cost)
+        release_rdchiral_product(self.mol)
 
         for cost, rxn in zip(reaction_costs, reactions_to_expand):
             self._add_child(rxn, cost)
@@ -0,0 +1,240 @@
+""" Module containing a search that runs several independent MCTS trees on one target
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import random
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from aizynthfinder.analysis import RouteSelectionArguments, TreeAnalysis
+from aizynthfinder.chem import TreeMolecule
+from aizynthfinder.reactiontree import ReactionTree
+from aizynthfinder.search.andor_trees import AndOrSearchTreeBase, TreeNodeMixin
+from aizynthfinder.search.mcts.search import MctsSearchTree
+from aizynthfinder.utils.logging import logger
+
+if TYPE_CHECKING:
+    from aizynthfinder.chem import UniqueMolecule
+    from aizynthfinder.context.config import Configuration
+    from aizynthfinder.utils.type_utils import List, Optional, StrDict, Tuple
+
+# The configuration and target of the members run by a pool of forked processes
+_MEMBER_SETUP: Optional[Tuple[Configuration, str]] = None
+
+
+class MctsEnsembleSearch(AndOrSearchTreeBase):
+    """
+    Encapsulation of a root-parallel MCTS search.
+
+    A number of independent MCTS trees with different random seeds search
+    the same target, each one in its own process. The top-ranked routes of
+    each tree are merged, duplicated routes are removed by their hash key,
+    and the remaining routes are ranked together by the analysis of the search.
+
+    All the trees are grown by the first call to `one_iteration`, and each
+    tree respects the time limit, the iteration limit and the `return_first`
+    setting of the search. The next call raises `StopIteration`.
+
+    The ensemble is set up by the ``ensemble_size``, ``ensemble_seed`` and
+    ``ensemble_processes`` settings of the algorithm configuration. The other
+    settings are used by the MCTS trees. If processes cannot be forked on the
+    platform, or only one process is used, the trees are searched one after
+    the other.
+
+    :ivar config: settings of the tree search algorithm
+    :ivar ensemble_size: the number of MCTS trees
+    :ivar seeds: the random seed of each tree
+    :ivar processes: the number of processes that the trees are searched in
+    :ivar profiling: the summed profiling of the trees
+
+    :param config: settings of the tree search algorithm
+    :param root_smiles: the root will be set to a node representing this molecule, defaults to None
+    """
+
+    def __init__(
+        self, config: Configuration, root_smiles: Optional[str] = None
+    ) -> None:
+        super().__init__(config, root_smiles)
+        self._logger = logger()
+        algorithm_config = config.search.algorithm_config
+        self.ensemble_size = max(int(algorithm_config.get("ensemble_size", 4)), 1)
+        seed = int(algorithm_config.get("ensemble_seed", 0))
+        self.seeds = [seed + idx for idx in range(self.ensemble_size)]
+        self.processes = min(
+            int(algorithm_config.get("ensemble_processes", os.cpu_count() or 1)),
+            self.ensemble_size,
+        )
+        self.profiling = {"ensemble_size": self.ensemble_size}
+        self._routes: List[ReactionTree] = []
+        self._mol_nodes: List[_RouteNode] = []
+        self._searched = False
+
+    @property
+    def mol_nodes(self) -> List[TreeNodeMixin]:  # type: ignore
+        """Return the molecule nodes of the merged routes"""
+        if self._routes and not self._mol_nodes:
+            for route in self._routes:
+                _RouteNode.from_route(route, route.root, self._mol_nodes)
+        return self._mol_nodes  # type: ignore
+
+    def one_iteration(self) -> bool:
+        """
+        Search the target with all the MCTS trees of the ensemble
+        and merge their routes
+
+        :raises StopIteration: if the trees have already been searched
+        :raises ValueError: if the root is undefined
+        :return: if a solved route was found
+        """
+        if self._root_smiles is None:
+            raise ValueError("Root is undefined. Cannot make an iteration")
+        if self._searched:
+            raise StopIteration
+        self._searched = True
+
+        self._logger.debug(
+            f"Searching with {self.ensemble_size} MCTS trees "
+            f"in {self.processes} processes"
+        )
+        if self.processes > 1 and "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            with context.Pool(
+                self.processes,
+                initializer=_setup_member,
+                initargs=(self.config, self._root_smiles),
+            ) as pool:
+                results = pool.map(_search_setup_member, self.seeds)
+        else:
+            results = [
+                _search_member(self.config, self._root_smiles, seed)
+                for seed in self.seeds
+            ]
+        self._merge(results)
+        return any(route.is_solved for route in self._routes)
+
+    def routes(self) -> List[ReactionTree]:
+        """
+        Return the merged routes of the MCTS trees
+
+        :return: the routes
+        """
+        return self._routes
+
+    def _merge(self, results: List[StrDict]) -> None:
+        seen_hashes = set()
+        for result in results:
+            for key, value in result["profiling"].items():
+                self.profiling[key] = self.profiling.get(key, 0) + value
+            for route_dict in result["routes"]:
+                route = ReactionTree.from_dict(route_dict)
+                route_hash = route.hash_key()
+                if route_hash in seen_hashes:
+                    continue
+                seen_hashes.add(route_hash)
+                self._routes.append(route)
+        self._mol_nodes = []
+
+
+class _RouteNode(TreeNodeMixin):
+    """A molecule or reaction of a merged route, in the shape of an AND/OR tree node"""
+
+    def __init__(self, prop: StrDict) -> None:
+        self._prop = prop
+        self._children: List[_RouteNode] = []
+
+    @classmethod
+    def from_route(
+        cls,
+        route: ReactionTree,
+        mol: UniqueMolecule,
+        mol_nodes: List[_RouteNode],
+    ) -> _RouteNode:
+        """
+        Create the node of a molecule in a route and the nodes below it
+
+        :param route: the route
+        :param mol: the molecule
+        :param mol_nodes: the list that the new molecule nodes are added to
+        :return: the created node
+        """
+        transform = route.graph.nodes[mol].get("transform", 0)
+        node = cls(
+            {
+                "mol": TreeMolecule(
+                    parent=None, smiles=mol.smiles, transform=transform
+                ),
+                "solved": route.in_stock(mol),
+            }
+        )
+        mol_nodes.append(node)
+        for reaction in route.graph.successors(mol):
+            reaction_node = cls({"reaction": reaction})
+            reaction_node._children = [
+                cls.from_route(route, reactant, mol_nodes)
+                for reactant in route.graph.successors(reaction)
+            ]
+            node._children.append(reaction_node)
+        return node
+
+    @property
+    def prop(self) -> StrDict:
+        return self._prop
+
+    @property
+    def children(self) -> List[_RouteNode]:  # type: ignore
+        return self._children
+
+
+def _search_member(config: Configuration, root_smiles: str, seed: int) -> StrDict:
+    """
+    Search a target with one MCTS tree of the ensemble and return
+    the top-ranked routes as dictionaries, together with the profiling of the tree
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    tree = MctsSearchTree(config, root_smiles)
+    time0 = time.time()
+    iteration = 1
+    while (
+        time.time() - time0 < config.search.time_limit
+        and iteration <= config.search.iteration_limit
+    ):
+        try:
+            is_solved = tree.one_iteration()
+        except StopIteration:
+            break
+        if config.search.return_first and is_solved:
+            break
+        iteration += 1
+
+    scorers = [
+        config.scorers[name]
+        for name in config.search.algorithm_config["search_rewards"]
+    ]
+    selection = RouteSelectionArguments(
+        nmin=config.post_processing.min_routes,
+        nmax=config.post_processing.max_routes,
+        return_all=config.post_processing.all_routes,
+    )
+    nodes, _ = TreeAnalysis(tree, scorers).sort(selection)
+    return {
+        "routes": [
+            node.to_reaction_tree().to_dict(include_metadata=True)  # type: ignore
+            for node in nodes
+        ],
+        "profiling": dict(tree.profiling),
+    }
+
+
+def _search_setup_member(seed: int) -> StrDict:
+    assert _MEMBER_SETUP is not None
+    return _search_member(*_MEMBER_SETUP, seed)
+
+
+def _setup_member(config: Configuration, root_smiles: str) -> None:
+    global _MEMBER_SETUP  # pylint: disable=global-statement
+    _MEMBER_SETUP = (config, root_smiles)
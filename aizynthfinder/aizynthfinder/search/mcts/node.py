@@ -8,7 +8,13 @@ from typing import TYPE_CHECKING
 import numpy as np
 from paretoset import paretoset
 
-from aizynthfinder.chem import TreeMolecule, deserialize_action, serialize_action
+from aizynthfinder.chem import (
+    RetroReaction,
+    TreeMolecule,
+    deserialize_action,
+    serialize_action,
+)
+from aizynthfinder.chem.reaction import release_rdchiral_product
 from aizynthfinder.search.mcts.state import MctsState
 from aizynthfinder.search.mcts.utils import ReactionTreeFromSuperNode, route_to_node
 from aizynthfinder.utils.exceptions import (
@@ -16,17 +22,22 @@ from aizynthfinder.utils.exceptions import (
     RejectionException,
 )
 from aizynthfinder.utils.logging import logger
+from aizynthfinder.utils.profiling import phase_profiler
 
 if TYPE_CHECKING:
-    from aizynthfinder.chem import (
-        MoleculeDeserializer,
-        MoleculeSerializer,
-        RetroReaction,
-    )
+    from aizynthfinder.chem import MoleculeDeserializer, MoleculeSerializer
     from aizynthfinder.context.config import Configuration
+    from aizynthfinder.context.policy import ActionRecord
     from aizynthfinder.reactiontree import ReactionTree
-    from aizynthfinder.search.mcts.search import MctsSearchTree
-    from aizynthfinder.utils.type_utils import List, Optional, StrDict, Tuple
+    from aizynthfinder.search.mcts.search import MctsSearchTree, TranspositionRecord
+    from aizynthfinder.utils.type_utils import (
+        Dict,
+        List,
+        Optional,
+        StrDict,
+        Tuple,
+        Union,
+    )
 
 
 class MctsNode:
@@ -35,6 +46,8 @@ class MctsNode:
 
     The children are instantiated lazily for efficiency: only when
     a child is selected the reaction to create that child is applied.
+    The actions of the children are kept as the compact records returned
+    by the expansion policy until they are needed.
 
     Properties of an instantiated children to a node can be access with:
 
@@ -45,9 +58,16 @@ class MctsNode:
     the return value is a dictionary with keys "action", "value", "prior"
     and "visitations".
 
+    The values, priors and visitations of the children are kept in NumPy arrays
+    that grow when an action produces more than one child. Each child knows its
+    index in the arrays of its parent, so looking up the statistics of a child
+    does not scan the children.
+
     :ivar is_expanded: if the node has had children added to it
     :ivar is_expandable: if the node is expandable
     :ivar tree: the tree owning this node
+    :ivar transposition: the statistics shared with other nodes with the same state,
+                         None if the tree does not use a transposition table
 
     :param state: the state of the node
     :param owner: the tree that owns this node
@@ -73,14 +93,24 @@ class MctsNode:
 
         if owner is None:
             self.created_at_iteration: Optional[int] = None
+            self.transposition: Optional[TranspositionRecord] = None
         else:
             self.created_at_iteration = self.tree.profiling["iterations"]
+            self.transposition = self.tree.transposition(state)
 
-        self._children_values: List[float] = []
-        self._children_priors: List[float] = []
-        self._children_visitations: List[int] = []
-        self._children_actions: List[RetroReaction] = []
+        self._children_values: np.ndarray = np.zeros(0)
+        self._children_priors: np.ndarray = np.zeros(0)
+        self._children_visitations: np.ndarray = np.zeros(0, dtype=int)
+        self._children_actions: List[Union[RetroReaction, ActionRecord]] = []
         self._children: List[Optional[MctsNode]] = []
+        # The arrays that hold the children statistics, which have room for more
+        # children than there are. The statistics attributes are views of these.
+        self._children_stats_buffers: Dict[str, np.ndarray] = {}
+        self._index_in_parent = -1
+        self._index_in_tree = -1
+        self._unqueried_actions = 0
+        # The instantiated children by the hash used by the degeneracy check
+        self._children_by_state: Dict[int, MctsNode] = {}
 
         self.blacklist = set(mol.inchi_key for mol in state.expandable_mols)
         if parent:
@@ -93,12 +123,12 @@ class MctsNode:
         self._logger = logger()
 
     def __getitem__(self, node: "MctsNode") -> StrDict:
-        idx = self._children.index(node)
+        idx = self._child_index(node)
         return {
-            "action": self._children_actions[idx],
-            "value": self._children_values[idx],
-            "prior": self._children_priors[idx],
-            "visitations": self._children_visitations[idx],
+            "action": self._child_action(idx),
+            "value": self._children_values[idx].tolist(),
+            "prior": self._children_priors[idx].tolist(),
+            "visitations": int(self._children_visitations[idx]),
         }
 
     @classmethod
@@ -141,19 +171,21 @@ class MctsNode:
         node = cls(state=state, owner=tree, config=config, parent=parent)
         node.is_expanded = dict_["is_expanded"]
         node.is_expandable = dict_["is_expandable"]
-        node._children_values = dict_["children_values"]
-        node._children_priors = dict_["children_priors"]
-        node._children_visitations = dict_["children_visitations"]
+        node._set_children_stats(
+            _children_values=np.asarray(dict_["children_values"], dtype=float),
+            _children_priors=np.asarray(dict_["children_priors"], dtype=float),
+            _children_visitations=np.asarray(dict_["children_visitations"], dtype=int),
+            **node._pooled_children_stats(len(dict_["children_visitations"])),
+        )
         node._children_actions = [
             deserialize_action(action_dict, molecules)
             for action_dict in dict_["children_actions"]
         ]
-        node._children = [
-            cls.from_dict(child, tree, config, molecules, parent=node)
-            if child
-            else None
-            for child in dict_["children"]
-        ]
+        node._children = [None] * len(dict_["children"])
+        for idx, child_dict in enumerate(dict_["children"]):
+            if child_dict:
+                child = cls.from_dict(child_dict, tree, config, molecules, parent=node)
+                node._set_child(idx, child)
         return node
 
     @property
@@ -193,6 +225,15 @@ class MctsNode:
         """
         return self.path_to()[0]
 
+    def add_virtual_loss(self, child: "MctsNode") -> None:
+        """
+        Add a visit without a value to a child, which makes it
+        less likely to be selected until the loss is removed.
+
+        :param child: the child node
+        """
+        self._children_visitations[self._child_index(child)] += 1
+
     def backpropagate(self, child: "MctsNode", value_estimate: float) -> None:
         """
         Update the number of visitations of a particular child and its value.
@@ -200,7 +241,7 @@ class MctsNode:
         :param child: the child node
         :param value_estimate: the value to add to the child value
         """
-        idx = self._children.index(child)
+        idx = self._child_index(child)
         self._children_visitations[idx] += 1
         self._children_values[idx] += value_estimate
 
@@ -216,10 +257,12 @@ class MctsNode:
         :return: the view
         """
         return {
-            "actions": list(self._children_actions),
-            "values": list(self._children_values),
-            "priors": list(self._children_priors),
-            "visitations": list(self._children_visitations),
+            "actions": [
+                self._child_action(idx) for idx in range(len(self._children_actions))
+            ],
+            "values": self._children_values.tolist(),
+            "priors": self._children_priors.tolist(),
+            "visitations": self._children_visitations.tolist(),
             "objects": list(self._children),
         }
 
@@ -252,19 +295,31 @@ class MctsNode:
 
         # Calculate the possible actions, fill the child_info lists
         # Actions by default only assumes 1 set of reactants
-        actions, priors = self._expansion_policy(
-            self.state.expandable_mols, cache_molecules
-        )
+        if self.transposition and self.transposition.has_expansion:
+            actions, priors = self.transposition.expansion(self.state.expandable_mols)
+            self.tree.profiling["transposition_hits"] += 1
+        else:
+            with phase_profiler().phase("expansion policy"):
+                actions, priors = self._expansion_policy.get_action_records(
+                    self.state.expandable_mols, cache_molecules
+                )
+            if self.transposition:
+                self.transposition.store_expansion(actions, priors)
+            if self.tree:
+                self.tree.profiling["expansion_calls"] += 1
         self._fill_children_lists(actions, priors)
+        self._unqueried_actions = sum(
+            not isinstance(action, RetroReaction) or action.unqueried
+            for action in actions
+        )
+        if self._unqueried_actions == 0:
+            self._release_products()
 
         # Reverse the expansion if it did not produce any children
         if len(actions) == 0:
             self.is_expandable = False
             self.is_expanded = False
 
-        if self.tree:
-            self.tree.profiling["expansion_calls"] += 1
-
         if not self._algo_config["immediate_instantiation"]:
             return
         # Instantiate all children actions created by the marked policy,
@@ -272,7 +327,10 @@ class MctsNode:
         # to instantiation
         nactions = len(actions)
         for child_idx, action in enumerate(self._children_actions[:nactions]):
-            policy_name = action.metadata.get("policy_name")
+            if isinstance(action, RetroReaction):
+                policy_name = action.metadata.get("policy_name")
+            else:
+                policy_name = action.policy_name
             if (
                 policy_name
                 and policy_name in self._algo_config["immediate_instantiation"]
@@ -321,9 +379,18 @@ class MctsNode:
             )
             self.is_expanded = False
             self.is_expandable = False
+            self._release_products()
 
         return child
 
+    def remove_virtual_loss(self, child: "MctsNode") -> None:
+        """
+        Remove a visit added with `add_virtual_loss`
+
+        :param child: the child node
+        """
+        self._children_visitations[self._child_index(child)] -= 1
+
     def serialize(self, molecule_store: MoleculeSerializer) -> StrDict:
         """
         Serialize the node object to a dictionary.
@@ -335,10 +402,10 @@ class MctsNode:
             "state": self.state.serialize(molecule_store),
             "children_values": self._serialize_stats_list("_children_values"),
             "children_priors": self._serialize_stats_list("_children_priors"),
-            "children_visitations": self._children_visitations,
+            "children_visitations": self._children_visitations.tolist(),
             "children_actions": [
-                serialize_action(action, molecule_store)
-                for action in self._children_actions
+                serialize_action(self._child_action(idx), molecule_store)
+                for idx in range(len(self._children_actions))
             ],
             "children": [
                 child.serialize(molecule_store) if child else None
@@ -356,6 +423,17 @@ class MctsNode:
         """
         return ReactionTreeFromSuperNode(self).tree
 
+    def _child_action(self, child_idx: int) -> RetroReaction:
+        """
+        Return the reaction of a child, creating it from the
+        action record if that has not been done before
+        """
+        action = self._children_actions[child_idx]
+        if not isinstance(action, RetroReaction):
+            action = self._expansion_policy.make_action(action)
+            self._children_actions[child_idx] = action
+        return action
+
     def _check_child_reaction(self, reaction: RetroReaction) -> bool:
         if not reaction.reactants:
             self._logger.debug(f"{reaction} did not produce any reactants")
@@ -369,13 +447,26 @@ class MctsNode:
 
         return True
 
+    def _child_index(self, child: "MctsNode") -> int:
+        # pylint: disable=protected-access
+        idx = child._index_in_parent
+        if 0 <= idx < len(self._children) and self._children[idx] is child:
+            return idx
+        return self._children.index(child)
+
     def _children_q(self) -> np.ndarray:
-        return np.array(self._children_values) / np.array(self._children_visitations)
+        children_q = self._children_values / self._children_visitations
+        if "_children_pooled" in self._children_stats_buffers:
+            children_q = np.where(
+                self._children_pooled, self._children_pooled_q, children_q
+            )
+        return children_q
 
     def _children_u(self) -> np.ndarray:
-        total_visits = np.log(np.sum(self._children_visitations))
-        child_visits = np.array(self._children_visitations)
-        return self._algo_config["C"] * np.sqrt(2 * total_visits / child_visits)
+        total_visits = np.log(self._children_visitations.sum())
+        return self._algo_config["C"] * np.sqrt(
+            2 * total_visits / self._children_visitations
+        )
 
     def _create_children_nodes(
         self, states: List[MctsState], child_idx: int
@@ -401,34 +492,54 @@ class MctsNode:
                 new_node = self.__class__(
                     state=state, owner=self.tree, config=self._config, parent=self
                 )
-                self._children[child_idx] = new_node
+                self._set_child(child_idx, new_node)
                 new_nodes.append(new_node)
         return new_nodes
 
+    def _degeneracy_hash(self, state: MctsState) -> int:
+        if self._degeneracy_check == "partial":
+            return state.expandables_hash
+        return hash(state)
+
     def _disable_child(self, child_idx: int) -> None:
         self._children_values[child_idx] = -1e6
 
     def _expand_children_lists(self, old_index: int, action_index: int) -> int:
         new_action = self._children_actions[old_index].copy(index=action_index)
         self._children_actions.append(new_action)
-        self._children_priors.append(self._children_priors[old_index])
-        self._children_values.append(self._children_values[old_index])
-        self._children_visitations.append(self._children_visitations[old_index])
+        nchildren = len(self._children)
+        for name, buffer in self._children_stats_buffers.items():
+            # Double the capacity of a full buffer so that appending is amortized O(1)
+            if nchildren == len(buffer):
+                buffer = np.concatenate([buffer, np.zeros_like(buffer)])
+                self._children_stats_buffers[name] = buffer
+            buffer[nchildren] = buffer[old_index]
+            setattr(self, name, buffer[: nchildren + 1])
+        if "_children_pooled" in self._children_stats_buffers:
+            # The new child does not have a node, so its value is not pooled yet
+            self._children_pooled[nchildren] = False
         self._children.append(None)
-        return len(self._children) - 1
+        return nchildren
 
     def _fill_children_lists(
-        self, actions: List[RetroReaction], priors: List[float]
+        self, actions: List[Union[RetroReaction, ActionRecord]], priors: List[float]
     ) -> None:
         self._children_actions = actions
-        self._children_priors = priors
         nactions = len(actions)
-        self._children_visitations = [1] * nactions
         self._children = [None] * nactions
+        children_priors = np.asarray(priors, dtype=float)
         if self._algo_config["use_prior"]:
-            self._children_values = list(self._children_priors)
+            children_values = children_priors.copy()
         else:
-            self._children_values = [self._algo_config["default_prior"]] * nactions
+            children_values = np.full(
+                nactions, self._algo_config["default_prior"], dtype=float
+            )
+        self._set_children_stats(
+            _children_values=children_values,
+            _children_priors=children_priors,
+            _children_visitations=np.ones(nactions, dtype=int),
+            **self._pooled_children_stats(nactions),
+        )
 
     def _filter_child_reaction(self, reaction: RetroReaction) -> bool:
         if self._regenerated_blacklisted(reaction):
@@ -441,7 +552,8 @@ class MctsNode:
         if not self._filter_policy.selection:
             return False
         try:
-            self._filter_policy(reaction)
+            with phase_profiler().phase("filter policy"):
+                self._filter_policy(reaction)
         except RejectionException as err:
             self._logger.debug(str(err))
             return True
@@ -459,27 +571,16 @@ class MctsNode:
 
         The metadata of the degenerate action will be added to the metadata
         of the previously created equal state.
-        """
-
-        def equal_states(query_state):
-            if self._degeneracy_check == "partial":
-                return query_state.expandables_hash == new_state.expandables_hash
-            return query_state == new_state
 
+        The children are looked up by the hash of their state, so that
+        the check does not depend on the number of children.
+        """
         if self._degeneracy_check not in ["partial", "full"]:
             return False
-        previous_action = None
-        for child, action in zip(self._children, self._children_actions):
-            if (
-                child is not None
-                and not child.is_terminal()
-                and equal_states(child.state)
-            ):
-                previous_action = action
-                break
-
-        if previous_action is None:
+        child = self._children_by_state.get(self._degeneracy_hash(new_state))
+        if child is None or child.is_terminal():
             return False
+        previous_action = self._children_actions[self._child_index(child)]
 
         # No need to copy the metadata because it will be the same
         if previous_action is self._children_actions[child_idx]:
@@ -507,23 +608,38 @@ class MctsNode:
         if self._children[child_idx] is not None:
             raise NodeUnexpectedBehaviourException("Node already instantiated")
 
-        reaction = self._children_actions[child_idx]
+        reaction = self._child_action(child_idx)
         if reaction.unqueried:
             if self.tree:
                 self.tree.profiling["reactants_generations"] += 1
             _ = reaction.reactants
+            self._unqueried_actions -= 1
+            if self._unqueried_actions == 0:
+                self._release_products()
 
         if not self._check_child_reaction(reaction):
             self._disable_child(child_idx)
             return []
 
-        keep_mols = [mol for mol in self.state.mols if mol is not reaction.mol]
         new_states = [
-            MctsState(keep_mols + list(reactants), self._config)
+            MctsState.from_parent(self.state, reaction.mol, reactants, self._config)
             for reactants in reaction.reactants
         ]
         return self._create_children_nodes(new_states, child_idx)
 
+    def _pooled_children_stats(self, nactions: int) -> Dict[str, np.ndarray]:
+        """
+        Return the arrays that hold the values of the children pooled over all
+        the nodes with the same state, empty if the tree does not use a
+        transposition table
+        """
+        if self.tree is None or self.tree.transpositions is None:
+            return {}
+        return {
+            "_children_pooled_q": np.zeros(nactions),
+            "_children_pooled": np.zeros(nactions, dtype=bool),
+        }
+
     def _regenerated_blacklisted(self, reaction: RetroReaction) -> bool:
         if not self._algo_config["prune_cycles_in_search"]:
             return False
@@ -533,8 +649,16 @@ class MctsNode:
                     return True
         return False
 
+    def _release_products(self) -> None:
+        """
+        Release the prepared products of the expandable molecules
+        when no more templates will be applied to them from this node
+        """
+        for mol in self.state.expandable_mols:
+            release_rdchiral_product(mol)
+
     def _score_and_select(self) -> Optional["MctsNode"]:
-        if not max(self._children_values) > 0:
+        if not (len(self._children_values) and self._children_values.max() > 0):
             raise ValueError("Has no selectable children")
         scores = self._children_q() + self._children_u()
         indices = np.where(scores == scores.max())[0]
@@ -559,6 +683,49 @@ class MctsNode:
     def _serialize_stats_list(self, name: str) -> List[float]:
         return [float(value) for value in getattr(self, name)]
 
+    def _set_child(self, child_idx: int, child: "MctsNode") -> None:
+        # pylint: disable=protected-access
+        child._index_in_parent = child_idx
+        self._children[child_idx] = child
+        if self.tree is not None:
+            self.tree.add_node(child)
+        if (
+            child.transposition is not None
+            and "_children_pooled" in self._children_stats_buffers
+        ):
+            child.transposition.add_position(self, child_idx)
+        if self._degeneracy_check not in ["partial", "full"]:
+            return
+        # Terminal children are not considered by the degeneracy check,
+        # so an equal child created later takes the place of a terminal one
+        key = self._degeneracy_hash(child.state)
+        previous = self._children_by_state.get(key)
+        if previous is None or previous.is_terminal():
+            self._children_by_state[key] = child
+
+    def _set_children_stats(self, **arrays: np.ndarray) -> None:
+        """
+        Set the statistics of the children, the arrays are used as
+        buffers that will be replaced when they need to grow
+        """
+        for name, array in arrays.items():
+            self._children_stats_buffers[name] = array
+            setattr(self, name, array[: len(array)])
+
+    def _set_pooled_q(self, child_idx: int, record: TranspositionRecord) -> None:
+        """
+        Set the value of a child pooled over all the nodes with its state,
+        starting from the initial value of the child
+        """
+        if self._algo_config["use_prior"]:
+            initial_value = self._children_priors[child_idx]
+        else:
+            initial_value = self._algo_config["default_prior"]
+        self._children_pooled_q[child_idx] = (initial_value + record.value) / (
+            1 + record.visitations
+        )
+        self._children_pooled[child_idx] = True
+
 
 class ParetoMctsNode(MctsNode):
     """
@@ -592,9 +759,12 @@ class ParetoMctsNode(MctsNode):
         self._num_objectives = len(self._algo_config["search_rewards"])
         self._prior_weight = 1
         self._direction = "max"  # current implementation assumes maximisation
-        self._children_rewards_cummulative: List[List[float]]
-        self._children_values: List[List[float]]  # type: ignore
-        self._children_priors: List[List[float]]  # type: ignore
+        # The statistics are arrays of shape: num_children x num_objectives
+        self._children_rewards_cummulative: np.ndarray = np.zeros(
+            (0, self._num_objectives)
+        )
+        self._children_values = np.zeros((0, self._num_objectives))
+        self._children_priors = np.zeros((0, self._num_objectives))
 
     def backpropagate(self, child: "MctsNode", value_estimate: List[float]) -> None:  # type: ignore
         """
@@ -603,17 +773,11 @@ class ParetoMctsNode(MctsNode):
         :param child: the child node
         :param value_estimate: the value to add to the child value
         """
-        idx = self._children.index(child)
+        idx = self._child_index(child)
         self._children_visitations[idx] += 1
         # here we only update the cummulative rewards,
         #  _children_values are updated at selection time
-        new_value_estimate = [
-            cum_reward + new_reward
-            for cum_reward, new_reward in zip(
-                self._children_rewards_cummulative[idx], value_estimate
-            )
-        ]
-        self._children_rewards_cummulative[idx] = new_value_estimate
+        self._children_rewards_cummulative[idx] += value_estimate
 
     def children_view(self) -> StrDict:
         """
@@ -627,7 +791,7 @@ class ParetoMctsNode(MctsNode):
         :return: the view
         """
         dict_ = super().children_view()
-        dict_["rewards_cum"] = list(self._children_rewards_cummulative)
+        dict_["rewards_cum"] = self._children_rewards_cummulative.tolist()
         return dict_
 
     def serialize(self, molecule_store: MoleculeSerializer) -> StrDict:
@@ -644,59 +808,45 @@ class ParetoMctsNode(MctsNode):
         return dict_
 
     def _disable_child(self, child_idx: int) -> None:
-        self._children_rewards_cummulative[child_idx] = [-1e6] * self._num_objectives
-
-    def _expand_children_lists(self, old_index: int, action_index: int) -> int:
-        ret = super()._expand_children_lists(old_index, action_index)
-        # These lists are nested lists, so need to make sure that the inner lists are also new
-        self._children_values[-1] = list(self._children_values[-1])
-        self._children_priors[-1] = list(self._children_priors[-1])
-        self._children_rewards_cummulative.append(
-            list(self._children_rewards_cummulative[old_index])
-        )
-        return ret
+        self._children_rewards_cummulative[child_idx] = -1e6
 
     def _fill_children_lists(
-        self, actions: List[RetroReaction], priors: List[float]
+        self, actions: List[Union[RetroReaction, ActionRecord]], priors: List[float]
     ) -> None:
         self._children_actions = actions
         nactions = len(actions)
-        # shape: num_actions x 1
-        self._children_visitations = [1] * nactions
         self._children = [None] * nactions
-        # shape: num_actions x num_objectives
-        self._children_rewards_cummulative = [[0.0] * self._num_objectives] * nactions
+        shape = (nactions, self._num_objectives)
         if self._algo_config["use_prior"]:
-            # shape: num_actions x num_objectives
             # for children i, 3 objectives -> [prior i, prior i, prior i]
-            self._children_priors = [[prior] * self._num_objectives for prior in priors]
-
+            children_priors = np.repeat(
+                np.asarray(priors, dtype=float).reshape(-1, 1),
+                axis=1,
+                repeats=self._num_objectives,
+            )
         else:
-            self._children_priors = [
-                [self._algo_config["default_prior"]] * self._num_objectives
-            ] * nactions
-
-        # at initialisation, values = prior as cummulative rewards are zero
-        self._children_values = [
-            [prior * self._prior_weight for prior in priors]
-            for priors in self._children_priors
-        ]
+            children_priors = np.full(
+                shape, self._algo_config["default_prior"], dtype=float
+            )
+        self._set_children_stats(
+            _children_visitations=np.ones(nactions, dtype=int),
+            _children_rewards_cummulative=np.zeros(shape),
+            _children_priors=children_priors,
+            # at initialisation, values = prior as cummulative rewards are zero
+            _children_values=children_priors * self._prior_weight,
+        )
 
     def _children_q(self, children_values_arr):
-        children_visitations_expanded = np.repeat(
-            np.array(self._children_visitations).reshape(-1, 1),
-            axis=1,
-            repeats=self._num_objectives,
-        )
-        return children_values_arr / children_visitations_expanded
+        return children_values_arr / self._children_visitations.reshape(-1, 1)
 
     def _compute_children_scores(self) -> np.ndarray:
         """Compute the modified ucb scores: alpha * prior + average reward + exploration."""
         # update prior to zero once the node has been visited
         children_priors_arr = self._prior_schedule_oneoff()
         # compute prior_weight * prior + cummulative rewards
-        children_values_arr = self._prior_weight * children_priors_arr + np.array(
-            self._children_rewards_cummulative
+        children_values_arr = (
+            self._prior_weight * children_priors_arr
+            + self._children_rewards_cummulative
         )
         expanded_u = np.repeat(
             self._children_u().reshape(-1, 1), axis=1, repeats=self._num_objectives
@@ -708,22 +858,20 @@ class ParetoMctsNode(MctsNode):
                 f"expected second dimension to have {self._num_objectives},"
                 f"currently has {children_scores.shape[1]}"
             )
-        self._children_values = children_values_arr.tolist()
-        self._children_priors = children_priors_arr.tolist()
+        self._children_values[:] = children_values_arr
+        self._children_priors[:] = children_priors_arr
         return children_scores
 
     def _prior_schedule_oneoff(self) -> np.ndarray:
         # shape: num_children x 1
-        visted_mask = (np.array(self._children_visitations) > 1).reshape(-1, 1)
-        # shape: num_children x num_objectives
-        visted_mask = np.repeat(visted_mask, axis=1, repeats=self._num_objectives)
+        visted_mask = self._children_visitations > 1
         # set the prior weights for visited children to be zero
-        children_priors_arr = np.array(self._children_priors)
+        children_priors_arr = self._children_priors.copy()
         children_priors_arr[visted_mask] = 0
         return children_priors_arr
 
     def _score_and_select(self) -> Optional["MctsNode"]:
-        if not max(max(value_list) for value_list in self._children_values) > 0:
+        if not (len(self._children_values) and self._children_values.max() > 0):
             raise ValueError("Has no selectable children")
         children_scores = self._compute_children_scores()
         pareto_idxs = self._update_pareto_front(children_scores)
@@ -731,9 +879,7 @@ class ParetoMctsNode(MctsNode):
         return self._select_child(index)
 
     def _serialize_stats_list(self, name: str):
-        return [
-            [float(value) for value in value_list] for value_list in getattr(self, name)
-        ]
+        return getattr(self, name).tolist()
 
     def _update_pareto_front(self, children_scores: np.ndarray) -> np.ndarray:
         """
@@ -7,14 +7,27 @@ import logging
 from typing import TYPE_CHECKING
 
 import networkx as nx
+import numpy as np
 
-from aizynthfinder.chem import MoleculeDeserializer, MoleculeSerializer
+from aizynthfinder.chem import MoleculeDeserializer, MoleculeSerializer, RetroReaction
+from aizynthfinder.chem.reaction import template_cache_stats
 from aizynthfinder.search.mcts.node import MctsNode, ParetoMctsNode
 from aizynthfinder.utils.logging import logger
 
 if TYPE_CHECKING:
+    from aizynthfinder.chem import TreeMolecule
     from aizynthfinder.context.config import Configuration
-    from aizynthfinder.utils.type_utils import List, Optional, Sequence, Union
+    from aizynthfinder.context.policy import ActionRecord
+    from aizynthfinder.search.mcts.state import MctsState
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        Tuple,
+        Union,
+    )
 
 
 _MODE2NODECLASS = {
@@ -28,8 +41,16 @@ class MctsSearchTree:
     """
     Encapsulation of the search tree.
 
+    The tree keeps a registry of its nodes in the order they were added,
+    together with the index of the parent of each node, so that the nodes
+    can be listed without traversing the tree. A networkx graph of the tree
+    is only created by `graph`.
+
     :ivar root: the root node
     :ivar config: the configuration of the search tree
+    :ivar batch_size: the number of leaves that are selected and expanded together
+    :ivar transpositions: the records of the states in the tree, None if the
+                          transposition table is not used
 
     :param config: settings of the tree search algorithm
     :param root_smiles: the root will be set to a node representing this molecule, defaults to None
@@ -43,19 +64,31 @@ class MctsSearchTree:
             "expansion_calls": 0,
             "reactants_generations": 0,
             "iterations": 0,
+            "expansion_batches": 0,
+            "template_cache_hits": 0,
+            "template_cache_misses": 0,
+            "transposition_hits": 0,
         }
+        self._template_cache_offset = template_cache_stats()
         self.config = config
         self.mode = self._check_mode()
+        self.batch_size = max(
+            int(config.search.algorithm_config.get("batch_size", 1)), 1
+        )
+        self._batch_results: List[bool] = []
+        self.transpositions: Optional[Dict[Tuple[int, int], TranspositionRecord]] = (
+            {} if config.search.algorithm_config.get("transposition_table") else None
+        )
         self._logger.debug(f"MCTS mode: {self.mode}")
 
+        self._graph: Optional[nx.DiGraph] = None
+        self._nodes: List[MctsNode] = []
+        self._node_parents: List[int] = []
+        self._root: Optional[MctsNode] = None
         if root_smiles:
-            self.root: Optional[MctsNode] = _MODE2NODECLASS[self.mode].create_root(
+            self.root = _MODE2NODECLASS[self.mode].create_root(
                 smiles=root_smiles, tree=self, config=config
             )
-        else:
-            self.root = None
-
-        self._graph: Optional[nx.DiGraph] = None
 
         # For backward compatibility
         if "search_reward" in config.search.algorithm_config:
@@ -67,6 +100,9 @@ class MctsSearchTree:
         self._logger.debug(f"Selecting reward scorers: {config_rewards}")
         self.reward_scorer = self.config.scorers.make_subset(config_rewards)
         self._logger.setLevel(logging.DEBUG)
+        self._share_rewards = all(
+            scorer.state_only for scorer in self.reward_scorer.objects()
+        )
         if self.mode == "single-objective":
             self.reward_scorer_name = config_rewards[0]
 
@@ -88,6 +124,41 @@ class MctsSearchTree:
         )
         return tree
 
+    @property
+    def root(self) -> Optional[MctsNode]:
+        """Return the root node"""
+        return self._root
+
+    @root.setter
+    def root(self, node: Optional[MctsNode]) -> None:
+        """
+        Set the root node, and register it and the nodes below it
+        in a depth-first order
+        """
+        self._root = node
+        self._nodes = []
+        self._node_parents = []
+        self._graph = None
+        stack = [(node, -1)] if node is not None else []
+        while stack:
+            current, parent_idx = stack.pop()
+            idx = self._register_node(current, parent_idx)
+            stack.extend((child, idx) for child in reversed(current.children))
+
+    def add_node(self, node: MctsNode) -> None:
+        """
+        Add a node that has been created below a node of the tree to the registry
+
+        :param node: the new node
+        """
+        # pylint: disable=protected-access
+        parent = node.parent
+        # Nodes created before the root is set, e.g. when deserializing a tree,
+        # are registered again when the root is set
+        if parent is None or parent._index_in_tree < 0:
+            return
+        self._register_node(node, parent._index_in_tree)
+
     def backpropagate(self, from_node: MctsNode) -> None:
         """
         Backpropagate the value estimate and update all nodes from a
@@ -103,6 +174,8 @@ class MctsSearchTree:
             # For mypy, parent should never by None unless current is the root
             assert parent is not None
             parent.backpropagate(current, value_estimate)  # type: ignore
+            if current.transposition is not None:
+                current.transposition.add_visit(value_estimate)
             current = parent
 
     def compute_reward(self, node: MctsNode) -> Union[float, Sequence[float]]:
@@ -113,18 +186,65 @@ class MctsSearchTree:
             2. Multi-objective
             3. Weighted-sum of multiple specified rewards
 
+        If the transposition table is used and all the reward scorers only
+        depend on the state, the reward is only computed for the first node
+        with a given state. Otherwise, it is computed for every node.
+
         :param node: the node to compute the reward for
         :returns: the value from the scorer(s)
         """
-        if self.mode == "single-objective":
-            return self.reward_scorer[self.reward_scorer_name](node)
-
-        if self.mode == "multi-objective":
-            return self.reward_scorer.score_vector(node)
-
-        return self.reward_scorer.weighted_score(
-            node, self.config.search.algorithm_config["search_rewards_weights"]
-        )
+        record = node.transposition
+        if record is None or not self._share_rewards:
+            return self._compute_reward(node)
+        if record.reward is None:
+            record.reward = self._compute_reward(node)
+        return record.reward
+
+    def batch_iterations(self, batch_size: int) -> List[bool]:
+        """
+        Perform several iterations at once, sharing the expansion policy
+        calls between them.
+
+        Up to `batch_size` leaves are selected in turn. A virtual loss is
+        added to the path of each selected leaf so that the next selection
+        is steered towards other parts of the tree. The leaves are then
+        expanded and rolled out together, so that the expansion model makes
+        one prediction per step for all of the leaves, before the virtual
+        losses are removed and the rewards are backpropagated.
+
+        :param batch_size: the maximum number of leaves to select
+        :return: for each iteration, if a solution was found
+        """
+        leaves: List[MctsNode] = []
+        for _ in range(batch_size):
+            leaf = self.select_leaf()
+            if leaf in leaves:
+                break
+            leaves.append(leaf)
+            self._apply_virtual_loss(leaf, add=True)
+        self.profiling["iterations"] += len(leaves)
+        selected = list(leaves)
+
+        self._expand_nodes(leaves)
+        while True:
+            children = []
+            for idx, leaf in enumerate(leaves):
+                if leaf.is_terminal():
+                    continue
+                child = leaf.promising_child()
+                if child:
+                    children.append(child)
+                    leaves[idx] = child
+            if not children and all(leaf.is_terminal() for leaf in leaves):
+                break
+            self._expand_nodes(children)
+
+        for leaf in selected:
+            self._apply_virtual_loss(leaf, add=False)
+        for leaf in leaves:
+            self.backpropagate(leaf)
+        self._update_template_cache_profiling()
+        return [leaf.state.is_solved for leaf in leaves]
 
     def graph(self, recreate: bool = False) -> nx.DiGraph:
         """
@@ -141,21 +261,23 @@ class MctsSearchTree:
         if not recreate and self._graph:
             return self._graph
 
-        def add_node(node):
-            self._graph.add_edge(node.parent, node, action=node.parent[node]["action"])
-            for grandchild in node.children:
-                add_node(grandchild)
-
-        self._graph = nx.DiGraph()
+        graph = nx.DiGraph()
         # Always add the root
-        self._graph.add_node(self.root)
-        for child in self.root.children:
-            add_node(child)
+        graph.add_node(self.root)
+        for node, parent_idx in zip(self._nodes[1:], self._node_parents[1:]):
+            parent = self._nodes[parent_idx]
+            graph.add_edge(parent, node, action=parent[node]["action"])
+        self._graph = graph
         return self._graph
 
+    def leaves(self) -> List[MctsNode]:
+        """Return the nodes in the search tree that have no instantiated children"""
+        parents = set(self._node_parents)
+        return [node for idx, node in enumerate(self._nodes) if idx not in parents]
+
     def nodes(self) -> List[MctsNode]:
         """Return all the nodes in the search tree"""
-        return list(self.graph())
+        return list(self._nodes)
 
     def one_iteration(self) -> bool:
         """
@@ -165,8 +287,17 @@ class MctsSearchTree:
             3. Rollout
             4. Backpropagation
 
+        If the batch size of the tree is larger than one, several iterations
+        are performed at once with `batch_iterations` and their outcomes
+        are returned one at a time by subsequent calls.
+
         :return: if a solution was found
         """
+        if self.batch_size > 1:
+            if not self._batch_results:
+                self._batch_results = self.batch_iterations(self.batch_size)
+            return self._batch_results.pop(0)
+
         self.profiling["iterations"] += 1
         leaf = self.select_leaf()
         leaf.expand()
@@ -177,6 +308,7 @@ class MctsSearchTree:
                 leaf = child
 
         self.backpropagate(leaf)
+        self._update_template_cache_profiling()
         return leaf.state.is_solved
 
     def select_leaf(self) -> MctsNode:
@@ -214,6 +346,83 @@ class MctsSearchTree:
         with open(filename, "w") as fileobj:
             json.dump(dict_, fileobj, indent=2)
 
+    def transposition(self, state: MctsState) -> Optional[TranspositionRecord]:
+        """
+        Return the record of a state in the transposition table,
+        adding a new record if the state has not been seen before.
+
+        The states are identified by their hash and their maximum transform,
+        because the reward of a state depends on its depth.
+
+        :param state: the state
+        :return: the record, or None if the transposition table is not used
+        """
+        if self.transpositions is None:
+            return None
+        key = (hash(state), state.max_transforms)
+        record = self.transpositions.get(key)
+        if record is None:
+            record = TranspositionRecord()
+            self.transpositions[key] = record
+        record.nodes += 1
+        return record
+
+    def _apply_virtual_loss(self, leaf: MctsNode, add: bool) -> None:
+        current = leaf
+        while current is not self.root:
+            parent = current.parent
+            assert parent is not None
+            if add:
+                parent.add_virtual_loss(current)
+            else:
+                parent.remove_virtual_loss(current)
+            current = parent
+
+    def _compute_reward(self, node: MctsNode) -> Union[float, Sequence[float]]:
+        if self.mode == "single-objective":
+            return self.reward_scorer[self.reward_scorer_name](node)
+
+        if self.mode == "multi-objective":
+            return self.reward_scorer.score_vector(node)
+
+        return self.reward_scorer.weighted_score(
+            node, self.config.search.algorithm_config["search_rewards_weights"]
+        )
+
+    def _expand_nodes(self, nodes: Sequence[MctsNode]) -> None:
+        # Request the predictions for all the nodes, and the molecules
+        # that expand() will add to the cache, with one call to the
+        # expansion policy. The expansions will then hit the cache.
+        nodes = [node for node in nodes if node.is_expandable and not node.is_expanded]
+        if len(nodes) > 1:
+            molecules = []
+            for node in nodes:
+                molecules.extend(node.state.expandable_mols)
+                if node.parent:
+                    for sibling in node.parent.children:
+                        if sibling is not node:
+                            molecules.extend(sibling.state.expandable_mols)
+            self.config.expansion_policy.get_action_records([], molecules)
+            self.profiling["expansion_batches"] += 1
+        for node in nodes:
+            node.expand()
+
+    def _register_node(self, node: MctsNode, parent_idx: int) -> int:
+        # pylint: disable=protected-access
+        node._index_in_tree = len(self._nodes)
+        self._nodes.append(node)
+        self._node_parents.append(parent_idx)
+        return node._index_in_tree
+
+    def _update_template_cache_profiling(self) -> None:
+        # The template cache is shared by the process, so only count the
+        # lookups made since this tree was created
+        stats = template_cache_stats()
+        for key in ["hits", "misses"]:
+            self.profiling[f"template_cache_{key}"] = (
+                stats[key] - self._template_cache_offset[key]
+            )
+
     def _check_mode(self) -> str:
         # if no objective weights are supplied, use multi-objective search
         # if only one objective is specified, search will in be in multi objective mode,
@@ -234,3 +443,94 @@ class MctsSearchTree:
                 f"currently have {nweights} weights and {nrewards} objectives)"
             )
         return mode
+
+
+class TranspositionRecord:
+    """
+    The statistics that are shared by all the nodes with the same state.
+
+    The expansion is kept as action records, which are re-targeted to the
+    molecules of each node that re-uses it. Expansions that contain
+    reactions, i.e. not created by template-based strategies, are not shared.
+
+    :ivar nodes: the number of nodes with the state
+    :ivar visitations: the number of times the state was visited
+    :ivar value: the sum of the rewards backpropagated through the state
+    :ivar reward: the reward of the state, if computed
+    """
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.visitations = 0
+        self.value: Any = 0.0
+        self.reward: Optional[Union[float, Sequence[float]]] = None
+        self._actions: Optional[List[ActionRecord]] = None
+        self._priors: List[float] = []
+        # The parents of the nodes with the state and the indices of the nodes
+        # in their parents, which keep the pooled value of the state
+        self._positions: List[Tuple[MctsNode, int]] = []
+
+    @property
+    def has_expansion(self) -> bool:
+        """Return if an expansion of the state has been stored"""
+        return self._actions is not None
+
+    def add_position(self, parent: MctsNode, child_idx: int) -> None:
+        """
+        Add a node with the state, as a child of another node.
+        The pooled value of the state is kept up to date in the parent.
+
+        :param parent: the parent of the node
+        :param child_idx: the index of the node in its parent
+        """
+        self._positions.append((parent, child_idx))
+        self._update_positions()
+
+    def add_visit(self, value_estimate: Union[float, Sequence[float]]) -> None:
+        """
+        Add a visit to the state
+
+        :param value_estimate: the reward that was backpropagated
+        """
+        self.visitations += 1
+        self.value = self.value + np.asarray(value_estimate)
+        self._update_positions()
+
+    def expansion(
+        self, molecules: Sequence[TreeMolecule]
+    ) -> Tuple[List[ActionRecord], List[float]]:
+        """
+        Return the stored expansion, applied to the molecules of another node
+
+        :param molecules: the expandable molecules of the node
+        :return: the action records and the priors of those actions
+        """
+        assert self._actions is not None
+        mols = {mol.inchi_key: mol for mol in molecules}
+        actions = [
+            action._replace(mol=mols[action.mol.inchi_key]) for action in self._actions
+        ]
+        return actions, list(self._priors)
+
+    def store_expansion(
+        self,
+        actions: Sequence[Union[RetroReaction, ActionRecord]],
+        priors: Sequence[float],
+    ) -> None:
+        """
+        Store the expansion of the state, if it only consists of action records
+
+        :param actions: the actions or action records of the expansion
+        :param priors: the priors of those actions
+        """
+        if any(isinstance(action, RetroReaction) for action in actions):
+            return
+        self._actions = list(actions)  # type: ignore
+        self._priors = list(priors)
+
+    def _update_positions(self) -> None:
+        # The value is only pooled when more than one node has the state
+        if self.nodes < 2:
+            return
+        for parent, child_idx in self._positions:
+            parent._set_pooled_q(child_idx, self)  # pylint: disable=protected-access
@@ -2,6 +2,7 @@
 """
 from __future__ import annotations
 
+import bisect
 import os
 from typing import TYPE_CHECKING
 
@@ -27,6 +28,10 @@ class MctsState:
 
     The class is hashable and comparable by the inchi keys of all the molecules.
 
+    The state created by applying a reaction to a molecule of another state
+    should be created with `from_parent`, which only looks up the new molecules
+    in the stock.
+
     :ivar mols: the list of molecules
     :ivar expandable_mols: the list of molecules not in stock
     :ivar stock: the configured stock
@@ -43,7 +48,7 @@ class MctsState:
     def __init__(self, mols: Sequence[TreeMolecule], config: Configuration) -> None:
         self.mols = mols
         self.stock = config.stock
-        self.in_stock_list = [mol in self.stock for mol in self.mols]
+        self.in_stock_list = self.stock.contains_many(self.mols)
         self.expandable_mols = [
             mol for mol, in_stock in zip(self.mols, self.in_stock_list) if not in_stock
         ]
@@ -54,11 +59,13 @@ class MctsState:
             self.max_transforms >= config.search.max_transforms
         ) or self.is_solved
 
-        inchis = [mol.inchi_key for mol in self.mols]
-        self._hash = hash(tuple(sorted(inchis)))
+        self._inchis = tuple(sorted(mol.inchi_key for mol in self.mols))
+        self._hash = hash(self._inchis)
 
-        inchis = [mol.inchi_key for mol in self.expandable_mols]
-        self.expandables_hash = hash(tuple(sorted(inchis)))
+        self._expandable_inchis = tuple(
+            sorted(mol.inchi_key for mol in self.expandable_mols)
+        )
+        self.expandables_hash = hash(self._expandable_inchis)
 
     def __hash__(self) -> int:
         return self._hash
@@ -78,6 +85,76 @@ class MctsState:
         )
         return string
 
+    @classmethod
+    def from_parent(
+        cls,
+        parent: "MctsState",
+        mol: TreeMolecule,
+        reactants: Sequence[TreeMolecule],
+        config: Configuration,
+    ) -> "MctsState":
+        """
+        Create the state in which a molecule of a parent state is replaced
+        by the reactants of a reaction applied to it.
+
+        The stock availability and the sorted inchi keys of the other molecules
+        are taken from the parent state, so only the reactants are looked up
+        in the stock. The new state is equal to the state created from all
+        the molecules.
+
+        :param parent: the parent state
+        :param mol: the molecule of the parent state that was reacted
+        :param reactants: the reactants of the reaction
+        :param config: settings of the tree search algorithm
+        :return: the new state
+        """
+        state = cls.__new__(cls)
+        state.stock = config.stock
+        state._stock_availability = None
+
+        mols = []
+        in_stock_list = []
+        expandable_mols = []
+        mol_in_stock = False
+        for parent_mol, in_stock in zip(parent.mols, parent.in_stock_list):
+            if parent_mol is mol:
+                mol_in_stock = in_stock
+                continue
+            mols.append(parent_mol)
+            in_stock_list.append(in_stock)
+            if not in_stock:
+                expandable_mols.append(parent_mol)
+
+        inchis = list(parent._inchis)
+        inchis.remove(mol.inchi_key)
+        expandable_inchis = list(parent._expandable_inchis)
+        if not mol_in_stock:
+            expandable_inchis.remove(mol.inchi_key)
+        for reactant, in_stock in zip(reactants, state.stock.contains_many(reactants)):
+            mols.append(reactant)
+            in_stock_list.append(in_stock)
+            bisect.insort(inchis, reactant.inchi_key)
+            if not in_stock:
+                expandable_mols.append(reactant)
+                bisect.insort(expandable_inchis, reactant.inchi_key)
+
+        state.mols = mols
+        state.in_stock_list = in_stock_list
+        state.expandable_mols = expandable_mols
+        state.is_solved = not expandable_mols
+        # The reactants are deeper in the tree than the molecule they replace
+        state.max_transforms = max(
+            [parent.max_transforms] + [reactant.transform for reactant in reactants]
+        )
+        state.is_terminal = (
+            state.max_transforms >= config.search.max_transforms
+        ) or state.is_solved
+        state._inchis = tuple(inchis)
+        state._hash = hash(state._inchis)
+        state._expandable_inchis = tuple(expandable_inchis)
+        state.expandables_hash = hash(state._expandable_inchis)
+        return state
+
     @classmethod
     def from_dict(
         cls, dict_: StrDict, config: Configuration, molecules: MoleculeDeserializer
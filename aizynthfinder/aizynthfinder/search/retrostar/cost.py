@@ -7,12 +7,13 @@ from typing import TYPE_CHECKING
 import numpy as np
 
 from aizynthfinder.search.retrostar.cost import __name__ as retrostar_cost_module
+from aizynthfinder.utils.cache import LruCache
 from aizynthfinder.utils.loading import load_dynamic_class
 
 if TYPE_CHECKING:
     from aizynthfinder.chem import Molecule
     from aizynthfinder.context.config import Configuration
-    from aizynthfinder.utils.type_utils import Any, List, Tuple
+    from aizynthfinder.utils.type_utils import Any, Dict, List, Sequence, Tuple
 
 
 class MoleculeCost:
@@ -37,6 +38,10 @@ class MoleculeCost:
         calculator = MyCost(config)
         cost = calculator.calculate(molecule)
 
+    The costs of several molecules, e.g. the reactants of an expansion, can be
+    computed together by `precompute`. If the cost class has a `calculate_many`
+    method, it is used to compute them in one batch.
+
     :param config: the configuration of the tree search
     """
 
@@ -52,9 +57,27 @@ class MoleculeCost:
         del kwargs["cost"]
 
         self.molecule_cost = cls(**kwargs) if kwargs else cls()
+        self._precomputed: Dict[str, float] = {}
 
     def __call__(self, mol: Molecule) -> float:
-        return self.molecule_cost.calculate(mol)
+        cost = self._precomputed.get(mol.inchi_key) if self._precomputed else None
+        if cost is None:
+            return self.molecule_cost.calculate(mol)
+        return cost
+
+    def precompute(self, mols: Sequence[Molecule]) -> None:
+        """
+        Compute the costs of a number of molecules. The costs are returned
+        when the object is called with these molecules, until the next call
+        to this method.
+
+        :param mols: the molecules
+        """
+        if hasattr(self.molecule_cost, "calculate_many"):
+            costs = self.molecule_cost.calculate_many(mols)
+        else:
+            costs = [self.molecule_cost.calculate(mol) for mol in mols]
+        self._precomputed = {mol.inchi_key: cost for mol, cost in zip(mols, costs)}
 
 
 class RetroStarCost:
@@ -71,15 +94,24 @@ class RetroStarCost:
         scorer = RetroStarCost()
         score = scorer.calculate(mol)
 
+    The costs of several molecules are predicted in one batch by `calculate_many`.
+
     The model provided when creating the scorer object should be a pickled
     tuple.
     The first item of the tuple should be a list of the model weights for each layer.
     The second item of the tuple should be a list of the model biases for each layer.
+    The weights and biases are used in single precision.
+
+    As in the original model, drop-out is applied when predicting the cost,
+    unless the deterministic mode is used. In the deterministic mode,
+    the costs are also cached by the InChI key of the molecules.
 
     :param model_path: the filename of the model weights and biases
     :param fingerprint_length: the number of bits in the fingerprint
     :param fingerprint_radius: the radius of the fingerprint
     :param dropout_rate: the dropout_rate
+    :param deterministic: if True, no drop-out is applied, defaults to False
+    :param cache_size: the maximum number of cached costs, defaults to 100000
     """
 
     _required_kwargs = ["model_path"]
@@ -89,28 +121,52 @@ class RetroStarCost:
         self.fingerprint_length: int = int(kwargs.get("fingerprint_length", 2048))
         self.fingerprint_radius: int = int(kwargs.get("fingerprint_radius", 2))
         self.dropout_rate: float = float(kwargs.get("dropout_rate", 0.1))
+        self.deterministic: bool = (
+            bool(kwargs.get("deterministic", False)) or self.dropout_rate == 0.0
+        )
 
         self._dropout_prob = 1.0 - self.dropout_rate
         self._weights, self._biases = self._load_model(model_path)
+        self._cache = LruCache(maxsize=int(kwargs.get("cache_size", 100000)))
 
     def __repr__(self) -> str:
         return "retrostar"
 
     def calculate(self, mol: Molecule) -> float:
-        # pylint: disable=invalid-name
-        mol.sanitize()
-        vec = mol.fingerprint(
-            radius=self.fingerprint_radius, nbits=self.fingerprint_length
-        )
-        for W, b in zip(self._weights[:-1], self._biases[:-1]):
-            vec = np.matmul(vec, W) + b
-            vec *= vec > 0  # ReLU
-            # Drop-out
-            vec *= np.random.binomial(1, self._dropout_prob, size=vec.shape) / (
-                self._dropout_prob
-            )
-        vec = np.matmul(vec, self._weights[-1]) + self._biases[-1]
-        return float(np.log(1 + np.exp(vec)))
+        return self.calculate_many([mol])[0]
+
+    def calculate_many(self, mols: Sequence[Molecule]) -> List[float]:
+        """
+        Predict the costs of a number of molecules in one batch
+
+        :param mols: the molecules
+        :return: the costs
+        """
+        costs: List[float] = []
+        missing = []
+        for idx, mol in enumerate(mols):
+            cost = self._cache.get(mol.inchi_key) if self.deterministic else None
+            costs.append(cost)  # type: ignore
+            if cost is None:
+                missing.append(idx)
+        if not missing:
+            return costs
+
+        for idx in missing:
+            mols[idx].sanitize()
+        fingerprints = np.stack(
+            [
+                mols[idx].fingerprint_bits(
+                    radius=self.fingerprint_radius, nbits=self.fingerprint_length
+                )
+                for idx in missing
+            ]
+        ).astype(np.float32)
+        for idx, cost in zip(missing, self._predict(fingerprints).tolist()):
+            costs[idx] = cost
+            if self.deterministic:
+                self._cache[mols[idx].inchi_key] = cost
+        return costs
 
     @staticmethod
     def _load_model(model_path: str) -> Tuple[List[np.ndarray], List[np.ndarray]]:
@@ -118,10 +174,24 @@ class RetroStarCost:
             weights, biases = pickle.load(fileobj)
 
         return (
-            [np.asarray(item) for item in weights],
-            [np.asarray(item) for item in biases],
+            [np.asarray(item, dtype=np.float32) for item in weights],
+            [np.asarray(item, dtype=np.float32) for item in biases],
         )
 
+    def _predict(self, fingerprints: np.ndarray) -> np.ndarray:
+        # pylint: disable=invalid-name
+        vecs = fingerprints
+        for W, b in zip(self._weights[:-1], self._biases[:-1]):
+            vecs = np.matmul(vecs, W) + b
+            np.maximum(vecs, 0, out=vecs)  # ReLU
+            if not self.deterministic:
+                # Drop-out
+                vecs *= np.random.binomial(1, self._dropout_prob, size=vecs.shape) / (
+                    self._dropout_prob
+                )
+        vecs = np.matmul(vecs, self._weights[-1]) + self._biases[-1]
+        return np.log(1 + np.exp(vecs.astype(float).reshape(len(vecs), -1)[:, 0]))
+
 
 class ZeroMoleculeCost:
     """Encapsulation of a Zero cost model"""
@@ -131,3 +201,7 @@ class ZeroMoleculeCost:
 
     def calculate(self, _mol: Molecule) -> float:  # pytest: disable=unused-argument
         return 0.0
+
+    def calculate_many(self, mols: Sequence[Molecule]) -> List[float]:
+        """Return a zero cost for each molecule"""
+        return [0.0] * len(mols)
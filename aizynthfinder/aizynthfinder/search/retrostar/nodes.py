@@ -204,12 +204,13 @@ class MoleculeNode(TreeNodeMixin):
         dict_["children"] = [child.serialize(molecule_store) for child in self.children]
         return dict_
 
-    def update(self, solved: bool) -> None:
+    def update(self, solved: bool) -> List[ReactionNode]:
         """
         Update the node as part of the update algorithm,
         calling the `update()` method of its parent if available.
 
         :param solved: if the child node was solved
+        :return: the reaction nodes whose target value was changed
         """
         new_value = np.min([child.value for child in self.children])
         new_solv = self.solved or solved
@@ -220,7 +221,8 @@ class MoleculeNode(TreeNodeMixin):
         self.solved = new_solv
 
         if updated and self.parent:
-            self.parent.update(v_delta, from_mol=self.mol)
+            return self.parent.update(v_delta, from_mol=self.mol)
+        return []
 
 
 class ReactionNode(TreeNodeMixin):
@@ -341,28 +343,41 @@ class ReactionNode(TreeNodeMixin):
         dict_["children"] = [child.serialize(molecule_store) for child in self.children]
         return dict_
 
-    def update(self, value: float, from_mol: Optional[TreeMolecule] = None) -> None:
+    def update(
+        self, value: float, from_mol: Optional[TreeMolecule] = None
+    ) -> List[ReactionNode]:
         """
         Update the node as part of the update algorithm,
         calling the `update()` method of its parent
 
         :param value: the delta V value
         :param from_mol: the molecule being expanded, used for excluding propagation
+        :return: the reaction nodes whose target value was changed
         """
         self.value += value
         self.target_value += value
         self.solved = all(node.solved for node in self.children)
 
+        changed: List[ReactionNode] = []
         if value != 0:
-            self._propagate(value, exclude=from_mol)
+            changed.append(self)
+            self._propagate(value, changed, exclude=from_mol)
 
-        self.parent.update(self.solved)
+        changed.extend(self.parent.update(self.solved))
+        return changed
 
-    def _propagate(self, value: float, exclude: Optional[TreeMolecule] = None) -> None:
+    def _propagate(
+        self,
+        value: float,
+        changed: List[ReactionNode],
+        exclude: Optional[TreeMolecule] = None,
+    ) -> None:
         if not exclude:
             self.target_value += value
+            changed.append(self)
 
         for child in self.children:
             if exclude is None or child.mol is not exclude:
                 for grandchild in child.children:
-                    grandchild._propagate(value)  # pylint: disable=protected-access
+                    # pylint: disable=protected-access
+                    grandchild._propagate(value, changed)
@@ -2,15 +2,17 @@
 """
 from __future__ import annotations
 
+import heapq
 import json
 from typing import TYPE_CHECKING
 
 import numpy as np
 
+from aizynthfinder.chem.reaction import release_rdchiral_product
 from aizynthfinder.chem.serialization import MoleculeDeserializer, MoleculeSerializer
 from aizynthfinder.search.andor_trees import AndOrSearchTreeBase, SplitAndOrTree
 from aizynthfinder.search.retrostar.cost import MoleculeCost
-from aizynthfinder.search.retrostar.nodes import MoleculeNode
+from aizynthfinder.search.retrostar.nodes import MoleculeNode, ReactionNode
 from aizynthfinder.utils.exceptions import RejectionException
 from aizynthfinder.utils.logging import logger
 
@@ -18,13 +20,25 @@ if TYPE_CHECKING:
     from aizynthfinder.chem import RetroReaction
     from aizynthfinder.context.config import Configuration
     from aizynthfinder.reactiontree import ReactionTree
-    from aizynthfinder.utils.type_utils import List, Optional, Sequence
+    from aizynthfinder.utils.type_utils import (
+        Dict,
+        Iterable,
+        List,
+        Optional,
+        Sequence,
+        Tuple,
+    )
 
 
 class SearchTree(AndOrSearchTreeBase):
     """
     Encapsulation of the Retro* search tree (an AND/OR tree).
 
+    The expandable molecule nodes are kept in a priority queue by their
+    target value. The queue is updated when the target values are changed,
+    and outdated entries are discarded when they are popped, so that the
+    next node to expand is found in logarithmic time.
+
     :ivar config: settings of the tree search algorithm
     :ivar root: the root node
 
@@ -37,6 +51,10 @@ class SearchTree(AndOrSearchTreeBase):
     ) -> None:
         super().__init__(config, root_smiles)
         self._mol_nodes: List[MoleculeNode] = []
+        # The priority queue of the frontier, holding the target value and the
+        # index of a molecule node, created when the first node is selected
+        self._frontier: Optional[List[Tuple[float, int]]] = None
+        self._mol_node_indices: Dict[MoleculeNode, int] = {}
         self._logger = logger()
         self.molecule_cost = MoleculeCost(config)
 
@@ -170,10 +188,17 @@ class SearchTree(AndOrSearchTreeBase):
                     continue
                 reactions_to_expand.append(rxn_copy)
                 reaction_costs.append(cost)
+        release_rdchiral_product(node.mol)
 
+        self.molecule_cost.precompute(
+            [mol for rxn in reactions_to_expand for mol in rxn.reactants[rxn.index]]
+        )
         for cost, rxn in zip(reaction_costs, reactions_to_expand):
             new_nodes = node.add_stub(cost, rxn)
-            self._mol_nodes.extend(new_nodes)
+            for new_node in new_nodes:
+                self._mol_node_indices[new_node] = len(self._mol_nodes)
+                self._mol_nodes.append(new_node)
+                self._push_frontier(new_node)
 
     def _filter_reaction(self, reaction: RetroReaction) -> bool:
         if not self.config.filter_policy.selection:
@@ -185,21 +210,47 @@ class SearchTree(AndOrSearchTreeBase):
             return True
         return False
 
-    def _select(self) -> Optional[MoleculeNode]:
-        scores = np.asarray(
-            [
-                node.target_value if node.expandable else np.inf
-                for node in self._mol_nodes
-            ]
+    def _push_frontier(self, node: MoleculeNode) -> None:
+        if self._frontier is None or not node.expandable:
+            return
+        heapq.heappush(
+            self._frontier, (node.target_value, self._mol_node_indices[node])
         )
 
-        if scores.min() == np.inf:
-            return None
+    def _rebuild_frontier(self) -> None:
+        self._mol_node_indices = {node: idx for idx, node in enumerate(self._mol_nodes)}
+        self._frontier = [
+            (node.target_value, idx)
+            for idx, node in enumerate(self._mol_nodes)
+            if node.expandable
+        ]
+        heapq.heapify(self._frontier)
 
-        return self._mol_nodes[int(np.argmin(scores))]
-
-    @staticmethod
-    def _update(node: MoleculeNode) -> None:
+    def _select(self) -> Optional[MoleculeNode]:
+        # Outdated entries are left in the queue, it is rebuilt when they
+        # outnumber the molecule nodes
+        if self._frontier is None or len(self._frontier) > 2 * len(self._mol_nodes):
+            self._rebuild_frontier()
+        assert self._frontier is not None
+
+        while self._frontier:
+            value, idx = self._frontier[0]
+            if value == np.inf:
+                return None
+            node = self._mol_nodes[idx]
+            # The entry is kept until the node is closed by the update
+            if node.expandable and value == node.target_value:
+                return node
+            heapq.heappop(self._frontier)
+        return None
+
+    def _update(self, node: MoleculeNode) -> None:
         v_delta = node.close()
         if node.parent and np.isfinite(v_delta):
-            node.parent.update(v_delta, from_mol=node.mol)
+            changed = node.parent.update(v_delta, from_mol=node.mol)
+            self._update_frontier(changed)
+
+    def _update_frontier(self, reaction_nodes: Iterable[ReactionNode]) -> None:
+        for reaction_node in reaction_nodes:
+            for child in reaction_node.children:
+                self._push_frontier(child)
@@ -4,6 +4,11 @@ from __future__ import annotations
 
 import argparse
 import importlib
+import itertools
+import multiprocessing
+import os
+import tempfile
+from collections import deque
 from typing import TYPE_CHECKING
 
 try:
@@ -17,10 +22,23 @@ import pandas as pd
 from rdkit import Chem
 
 from aizynthfinder.chem import Molecule, MoleculeException
-from aizynthfinder.context.stock import MongoDbInchiKeyQuery
+from aizynthfinder.context.stock import (
+    MemoryMappedInchiKeyQuery,
+    MongoDbInchiKeyQuery,
+    SqliteInchiKeyQuery,
+)
+from aizynthfinder.utils.exceptions import StockException
 
 if TYPE_CHECKING:
-    from aizynthfinder.utils.type_utils import Iterable, List, Optional
+    from aizynthfinder.utils.type_utils import (
+        Any,
+        Dict,
+        Iterable,
+        Iterator,
+        List,
+        Optional,
+        Tuple,
+    )
 
     _StrIterator = Iterable[str]
 
@@ -35,11 +53,13 @@ def _get_arguments() -> argparse.Namespace:
     )
     parser.add_argument(
         "--source",
-        choices=["plain", "module"],
+        choices=["plain", "module", "stock"],
         help="indicates how to read the files. "
         "If 'plain' is used the input files should only contain SMILES (one on each row), "
         "if 'module' is used the SMILES are loaded from by python module"
-        " (see documentation for details)",
+        " (see documentation for details), "
+        "if 'stock' is used the input files are HDF5 or CSV stocks with InChI keys "
+        "that are converted to a memory-mapped or SQLite stock",
         default="plain",
     )
     parser.add_argument(
@@ -50,7 +70,7 @@ def _get_arguments() -> argparse.Namespace:
     )
     parser.add_argument(
         "--target",
-        choices=["hdf5", "mongo", "molbloom", "molbloom-inchi"],
+        choices=["hdf5", "mongo", "molbloom", "molbloom-inchi", "mmap", "sqlite"],
         help="type of output",
         default="hdf5",
     )
@@ -58,6 +78,31 @@ def _get_arguments() -> argparse.Namespace:
     parser.add_argument(
         "--bloom_params", nargs=2, type=int, help="the parameters to the Bloom filter"
     )
+    parser.add_argument(
+        "--inchi_key_column",
+        default="inchi_key",
+        help="the column of the InChI keys in the converted stocks",
+    )
+    parser.add_argument(
+        "--price_column",
+        help="the column of the prices in the converted stocks",
+    )
+    parser.add_argument(
+        "--amount_column",
+        help="the column of the amounts in the stocks converted to a SQLite stock",
+    )
+    parser.add_argument(
+        "--nprocs",
+        type=int,
+        default=1,
+        help="the number of processes that convert SMILES to InChI keys",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=100000,
+        help="the number of SMILES or InChI keys that are processed at a time",
+    )
     return parser.parse_args()
 
 
@@ -72,6 +117,224 @@ def _convert_smiles(smiles_list: _StrIterator) -> _StrIterator:
             )
 
 
+def _convert_smiles_chunk(smiles_list: List[str]) -> List[str]:
+    return list(_convert_smiles(smiles_list))
+
+
+def _partition_inchi_keys(
+    inchi_keys: Iterable[Any],
+    dirname: str,
+    chunk_size: int,
+    with_prices: bool = False,
+) -> Tuple[List[str], int]:
+    """
+    Write the InChI keys to one file for each of their two first characters.
+    The keys are buffered and written when ``chunk_size`` keys are buffered.
+    If ``with_prices`` is True, the items are tuples of a key and its price,
+    and each key is written with its price.
+
+    :return: the paths to the files, sorted by the first characters, and
+             the length in bytes of the longest key
+    """
+    filenames: Dict[str, str] = {}
+    buffers: Dict[str, List[str]] = {}
+    nbuffered = 0
+    width = 0
+
+    def flush() -> None:
+        for prefix, keys in buffers.items():
+            if prefix not in filenames:
+                filenames[prefix] = os.path.join(dirname, f"{len(filenames)}.txt")
+            with open(filenames[prefix], "a") as fileobj:
+                fileobj.write("\n".join(keys) + "\n")
+        buffers.clear()
+
+    lines: Iterable[Tuple[str, str]]
+    if with_prices:
+        lines = (
+            (inchi_key, f"{inchi_key}\t{float(price)!r}")
+            for inchi_key, price in inchi_keys
+        )
+    else:
+        lines = ((inchi_key, inchi_key) for inchi_key in inchi_keys)
+    for inchi_key, line in lines:
+        buffers.setdefault(inchi_key[:2], []).append(line)
+        width = max(width, len(inchi_key.encode()))
+        nbuffered += 1
+        if nbuffered >= chunk_size:
+            flush()
+            nbuffered = 0
+    flush()
+    return [filenames[prefix] for prefix in sorted(filenames)], width
+
+
+def _unique_inchi_key_chunks(
+    filenames: List[str], min_size: int = 0
+) -> Iterator[List[str]]:
+    """
+    Yield the sorted, unique InChI keys of the partitions, merging
+    consecutive partitions into chunks of at least ``min_size`` keys.
+    """
+    chunk: List[str] = []
+    for filename in filenames:
+        with open(filename, "r") as fileobj:
+            # The code point order of the keys is the same as the order of their bytes
+            chunk.extend(sorted(set(fileobj.read().splitlines())))
+        if len(chunk) >= min_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _unique_priced_inchi_key_chunks(
+    filenames: List[str],
+) -> Iterator[Tuple[List[str], List[float]]]:
+    """
+    Yield the sorted, unique InChI keys of the partitions written with prices,
+    one partition at a time, together with the lowest price of each key.
+    """
+    for filename in filenames:
+        prices: Dict[str, float] = {}
+        with open(filename, "r") as fileobj:
+            for line in fileobj:
+                inchi_key, price_str = line.rstrip("\n").split("\t")
+                price = float(price_str)
+                if inchi_key not in prices or price < prices[inchi_key]:
+                    prices[inchi_key] = price
+        inchi_keys = sorted(prices)
+        yield inchi_keys, [prices[inchi_key] for inchi_key in inchi_keys]
+
+
+def convert_smiles_parallel(
+    smiles_list: _StrIterator, nprocs: int, chunk_size: int = 10000
+) -> _StrIterator:
+    """
+    Convert SMILES to InChI keys in a pool of processes. The SMILES are read
+    and converted in chunks, and only a few chunks are processed at a time
+    to save memory. The InChI keys are yielded in the order of the SMILES.
+
+    :params smiles_list: the SMILES
+    :params nprocs: the number of processes, if one the SMILES are converted
+                    in this process
+    :params chunk_size: the number of SMILES in a chunk
+    """
+    if nprocs <= 1:
+        yield from _convert_smiles(smiles_list)
+        return
+
+    smiles_iter = iter(smiles_list)
+    pending: deque = deque()
+    with multiprocessing.Pool(nprocs) as pool:
+        while True:
+            while len(pending) < 2 * nprocs:
+                chunk = list(itertools.islice(smiles_iter, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.apply_async(_convert_smiles_chunk, (chunk,)))
+            if not pending:
+                break
+            yield from pending.popleft().get()
+
+
+def convert_to_mmap_stock(
+    files: List[str],
+    filename: str,
+    inchi_key_col: str = "inchi_key",
+    price_col: Optional[str] = None,
+    chunk_size: int = 100000,
+) -> None:
+    """
+    Convert stocks of pre-computed InChI keys in HDF5 or CSV format to a
+    memory-mapped stock. Only unique inchi keys are stored, with their lowest price.
+
+    The CSV files are read in chunks, and the keys are deduplicated and sorted
+    in partitions, like in `make_mmap_stock`, to save memory.
+
+    :params files: the paths to the stocks
+    :params filename: the path to the memory-mapped stock
+    :params inchi_key_col: the name of the column of the InChI keys
+    :params price_col: the name of the column with the optional prices
+    :params chunk_size: the number of rows that are read at a time
+    :raises StockException: if the prices are not valid
+    """
+    columns = [inchi_key_col, price_col] if price_col else [inchi_key_col]
+
+    def frames() -> Iterator[pd.DataFrame]:
+        for stock_filename in files:
+            print(f"Processing {stock_filename}", flush=True)
+            if stock_filename.endswith((".h5", ".hdf5")):
+                yield pd.read_hdf(stock_filename, key="table")[columns]
+            else:
+                yield from pd.read_csv(
+                    stock_filename, usecols=columns, chunksize=chunk_size
+                )
+
+    def inchi_keys() -> _StrIterator:
+        for frame in frames():
+            yield from frame[inchi_key_col]
+
+    def keys_and_prices() -> Iterator[Tuple[str, float]]:
+        for frame in frames():
+            prices = frame[price_col]
+            if prices.isnull().any() or (prices < 0).any():
+                raise StockException("expected non-negative prices without nulls")
+            yield from zip(frame[inchi_key_col], prices)
+
+    dirname = os.path.dirname(os.path.abspath(filename))
+    with tempfile.TemporaryDirectory(dir=dirname) as tmpdir:
+        if price_col:
+            partitions, width = _partition_inchi_keys(
+                keys_and_prices(), tmpdir, chunk_size, with_prices=True
+            )
+            chunks: Iterable = _unique_priced_inchi_key_chunks(partitions)
+        else:
+            partitions, width = _partition_inchi_keys(inchi_keys(), tmpdir, chunk_size)
+            chunks = _unique_inchi_key_chunks(partitions)
+        nkeys = MemoryMappedInchiKeyQuery.create_from_sorted(
+            filename, chunks, width, with_prices=bool(price_col)
+        )
+    print(f"Created memory-mapped stock with {nkeys} unique compounds")
+
+
+def convert_to_sqlite_stock(
+    files: List[str],
+    filename: str,
+    inchi_key_col: str = "inchi_key",
+    price_col: Optional[str] = None,
+    amount_col: Optional[str] = None,
+) -> None:
+    """
+    Convert stocks of pre-computed InChI keys in HDF5 or CSV format to a
+    SQLite stock. The CSV files are read in chunks to save memory.
+    Only unique inchi keys are stored, with their lowest price and highest amount.
+
+    :params files: the paths to the stocks
+    :params filename: the path to the SQLite stock
+    :params inchi_key_col: the name of the column of the InChI keys
+    :params price_col: the name of the column with the optional prices
+    :params amount_col: the name of the column with the optional amounts
+    """
+
+    def rows() -> Iterator:
+        columns = [col for col in (inchi_key_col, price_col, amount_col) if col]
+        for stock_filename in files:
+            print(f"Processing {stock_filename}", flush=True)
+            if stock_filename.endswith((".h5", ".hdf5")):
+                chunks = [pd.read_hdf(stock_filename, key="table")[columns]]
+            else:
+                chunks = pd.read_csv(stock_filename, usecols=columns, chunksize=100000)
+            for chunk in chunks:
+                yield from zip(
+                    chunk[inchi_key_col],
+                    chunk[price_col] if price_col else itertools.repeat(None),
+                    chunk[amount_col] if amount_col else itertools.repeat(None),
+                )
+
+    nkeys = SqliteInchiKeyQuery.create(filename, rows())
+    print(f"Created SQLite stock with {nkeys} unique compounds")
+
+
 def extract_plain_smiles(files: List[str]) -> _StrIterator:
     """
     Extract SMILES from plain text files, one SMILES on each line.
@@ -106,16 +369,33 @@ def extract_smiles_from_module(files: List[str]) -> _StrIterator:
                 yield smiles
 
 
-def make_hdf5_stock(inchi_keys: _StrIterator, filename: str) -> None:
+def make_hdf5_stock(
+    inchi_keys: _StrIterator, filename: str, chunk_size: int = 100000
+) -> None:
     """
-    Put all the inchi keys from the given iterable in a pandas
-    dataframe and save it as an HDF5 file. Only unique inchi keys
-    are stored.
+    Put all the inchi keys from the given iterable in an HDF5 file
+    with a pandas dataframe. Only unique inchi keys are stored.
+
+    The keys are deduplicated by first writing them to temporary files,
+    partitioned by their first characters, next to the output file.
+    Then one partition at a time is appended to the HDF5 file, so the memory
+    use is bounded by the size of the largest partition.
     """
-    data = pd.DataFrame.from_dict({"inchi_key": inchi_keys})
-    data = data.drop_duplicates("inchi_key")
-    data.to_hdf(filename, "table")
-    print(f"Created HDF5 stock with {len(data)} unique compounds")
+    dirname = os.path.dirname(os.path.abspath(filename))
+    with tempfile.TemporaryDirectory(dir=dirname) as tmpdir:
+        partitions, width = _partition_inchi_keys(inchi_keys, tmpdir, chunk_size)
+        nkeys = 0
+        with pd.HDFStore(filename, mode="w") as store:
+            # Small partitions are appended together, which is faster
+            for chunk in _unique_inchi_key_chunks(partitions, chunk_size):
+                data = pd.DataFrame(
+                    {"inchi_key": chunk}, index=pd.RangeIndex(nkeys, nkeys + len(chunk))
+                )
+                store.append("table", data, min_itemsize={"inchi_key": width})
+                nkeys += len(chunk)
+            if not nkeys:
+                store.put("table", pd.DataFrame({"inchi_key": []}, dtype=object))
+    print(f"Created HDF5 stock with {nkeys} unique compounds")
 
 
 def make_molbloom(
@@ -169,6 +449,36 @@ def make_molbloom_inchi(
     print(f"Created bloom stock with {nadded} unique compounds")
 
 
+def make_mmap_stock(
+    inchi_keys: _StrIterator, filename: str, chunk_size: int = 100000
+) -> None:
+    """
+    Put all the inchi keys from the given iterable in a memory-mapped
+    stock file. Only unique inchi keys are stored.
+
+    The keys are deduplicated and sorted in partitions, like in `make_hdf5_stock`,
+    and the memory-mapped file is written one partition at a time.
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    with tempfile.TemporaryDirectory(dir=dirname) as tmpdir:
+        partitions, width = _partition_inchi_keys(inchi_keys, tmpdir, chunk_size)
+        nkeys = MemoryMappedInchiKeyQuery.create_from_sorted(
+            filename, _unique_inchi_key_chunks(partitions), width
+        )
+    print(f"Created memory-mapped stock with {nkeys} unique compounds")
+
+
+def make_sqlite_stock(inchi_keys: _StrIterator, filename: str) -> None:
+    """
+    Put all the inchi keys from the given iterable in a SQLite stock.
+    The keys are written in chunks and only unique inchi keys are stored.
+    """
+    nkeys = SqliteInchiKeyQuery.create(
+        filename, ((inchi_key, None, None) for inchi_key in inchi_keys)
+    )
+    print(f"Created SQLite stock with {nkeys} unique compounds")
+
+
 def make_mongo_stock(
     inchi_keys: _StrIterator, source_tag: str, host: Optional[str] = None
 ) -> None:
@@ -189,6 +499,29 @@ def make_mongo_stock(
 def main() -> None:
     """Entry-point for the smiles2stock tool"""
     args = _get_arguments()
+    if args.source == "stock":
+        if args.target == "mmap":
+            convert_to_mmap_stock(
+                args.files,
+                args.output,
+                args.inchi_key_column,
+                args.price_column,
+                args.chunk_size,
+            )
+        elif args.target == "sqlite":
+            convert_to_sqlite_stock(
+                args.files,
+                args.output,
+                args.inchi_key_column,
+                args.price_column,
+                args.amount_column,
+            )
+        else:
+            raise ValueError(
+                "Stocks can only be converted to a memory-mapped or SQLite stock"
+            )
+        return
+
     if args.source == "plain":
         smiles_gen = (smiles for smiles in extract_plain_smiles(args.files))
     else:
@@ -204,12 +537,16 @@ def main() -> None:
         make_molbloom(smiles_gen, args.output, *args.bloom_params)
         return
 
-    inchi_keys_gen = (inchi_key for inchi_key in _convert_smiles(smiles_gen))
+    inchi_keys_gen = convert_smiles_parallel(smiles_gen, args.nprocs, args.chunk_size)
 
     if args.target == "hdf5":
-        make_hdf5_stock(inchi_keys_gen, args.output)
+        make_hdf5_stock(inchi_keys_gen, args.output, args.chunk_size)
     elif args.target == "molbloom-inchi":
         make_molbloom_inchi(inchi_keys_gen, args.output, *args.bloom_params)
+    elif args.target == "mmap":
+        make_mmap_stock(inchi_keys_gen, args.output, args.chunk_size)
+    elif args.target == "sqlite":
+        make_sqlite_stock(inchi_keys_gen, args.output)
     else:
         make_mongo_stock(inchi_keys_gen, args.output, args.host)
 
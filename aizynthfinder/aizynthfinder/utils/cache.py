@@ -0,0 +1,167 @@
+""" Module containing a bounded least-recently-used cache and a persistent key-value store
+"""
+from __future__ import annotations
+
+import sqlite3
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aizynthfinder.utils.type_utils import Any, Callable, Dict, Hashable, Optional
+
+
+class LruCache:
+    """
+    A bounded mapping that evicts the least recently used item
+    when it grows beyond its maximum size.
+
+    The cache keeps count of the number of hits and misses of
+    the `get` and `get_or_create` methods.
+
+    .. code-block::
+
+        cache = LruCache(maxsize=100)
+        value = cache.get_or_create("key", expensive_function)
+
+    :ivar maxsize: the maximum number of items in the cache
+    :ivar hits: the number of lookups that found an item
+    :ivar misses: the number of lookups that did not find an item
+
+    :param maxsize: the maximum number of items, if zero or negative the cache is unbounded
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if 0 < self.maxsize < len(self._items):
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all items and reset the counters"""
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the item for a key, marking it as recently used
+
+        :param key: the key of the item
+        :param default: the value to return if the key is not cached
+        :return: the cached item or the default value
+        """
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the item for a key, creating and caching it if it is missing.
+
+        Exceptions raised by the factory are propagated and nothing is cached.
+
+        :param key: the key of the item
+        :param factory: a callable taking no arguments that creates the item
+        :return: the cached or created item
+        """
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            value = factory()
+            self[key] = value
+            return value
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Return the size of the cache and the hit and miss counters"""
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+class SqliteStore:
+    """
+    A persistent mapping of string keys to binary values, kept in a SQLite database.
+
+    New items are written in a transaction that is committed by `commit`,
+    so that several items can be added with one write to the disk.
+    The database is opened on first use.
+
+    .. code-block::
+
+        store = SqliteStore("cache.sqlite")
+        store["key"] = b"value"
+        store.commit()
+
+    :ivar filename: the path to the database file
+
+    :param filename: the path to the database file, created if it does not exist
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self._database().execute("SELECT COUNT(*) FROM store").fetchone()[0]
+
+    def __setitem__(self, key: str, value: bytes) -> None:
+        self._database().execute(
+            "INSERT OR REPLACE INTO store (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def close(self) -> None:
+        """Commit pending items and close the database"""
+        if self._connection is None:
+            return
+        self._connection.commit()
+        self._connection.close()
+        self._connection = None
+
+    def commit(self) -> None:
+        """Write the pending items to the disk"""
+        if self._connection is not None:
+            self._connection.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return the value for a key
+
+        :param key: the key of the item
+        :return: the value or None if the key is not in the store
+        """
+        row = (
+            self._database()
+            .execute("SELECT value FROM store WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def _database(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.filename, timeout=60)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS store (key TEXT PRIMARY KEY, value BLOB)"
+            )
+        return self._connection
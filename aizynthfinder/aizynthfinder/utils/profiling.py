@@ -0,0 +1,122 @@
+""" Module containing a profiler of the time spent in the phases of a tree search
+"""
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aizynthfinder.utils.type_utils import Any, Dict
+
+
+class PhaseProfiler:
+    """
+    Accumulates the wall time and the number of calls of named phases,
+    e.g. the expansion policy, template application or stock lookups.
+
+    The profiler is disabled by default, and then timing a phase
+    only costs a function call.
+
+    .. code-block::
+
+        profiler = phase_profiler()
+        profiler.enable()
+        with profiler.phase("stock lookup"):
+            in_stock = mol in stock
+        profiler.stats()
+
+    Phases may be nested, e.g. stock lookups happen during template application,
+    so the times of the phases do not add up to the time of the search.
+
+    :ivar enabled: if the phases are timed
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._times: Dict[str, float] = defaultdict(float)
+        self._calls: Dict[str, int] = defaultdict(int)
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Add a call of a phase
+
+        :param name: the name of the phase
+        :param seconds: the wall time of the call
+        """
+        self._times[name] += seconds
+        self._calls[name] += 1
+
+    def disable(self) -> None:
+        """Stop timing the phases, the collected statistics are kept"""
+        self.enabled = False
+
+    def enable(self) -> None:
+        """Reset the statistics and start timing the phases"""
+        self.reset()
+        self.enabled = True
+
+    def phase(self, name: str) -> Any:
+        """
+        Return a context manager that times a phase, if the profiler is enabled
+
+        :param name: the name of the phase
+        :return: the context manager
+        """
+        if not self.enabled:
+            return _NO_TIMER
+        return _PhaseTimer(self, name)
+
+    def reset(self) -> None:
+        """Remove the collected statistics"""
+        self._times.clear()
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return the cumulative wall time in seconds and the number of calls of each phase
+
+        :return: the statistics by the name of the phase
+        """
+        return {
+            name: {"time": self._times[name], "calls": self._calls[name]}
+            for name in sorted(self._times)
+        }
+
+
+class _PhaseTimer:
+    __slots__ = ("_profiler", "_name", "_time0")
+
+    def __init__(self, profiler: PhaseProfiler, name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+        self._time0 = 0.0
+
+    def __enter__(self) -> None:
+        self._time0 = time.perf_counter()
+
+    def __exit__(self, *_: Any) -> None:
+        self._profiler.add(self._name, time.perf_counter() - self._time0)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *_: Any) -> None:
+        pass
+
+
+_NO_TIMER = _NoTimer()
+_PROFILER = PhaseProfiler()
+
+
+def phase_profiler() -> PhaseProfiler:
+    """
+    Returns the profiler that is used by all classes
+
+    :return: the profiler object
+    """
+    return _PROFILER
@@ -2,6 +2,7 @@
 """
 # pylint: disable=unused-import
 from typing import Callable  # noqa
+from typing import Hashable  # noqa
 from typing import Iterable  # noqa
 from typing import List  # noqa
 from typing import Sequence  # noqa
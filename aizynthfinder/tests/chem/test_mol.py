@@ -1,7 +1,8 @@
+import numpy as np
 import pytest
 from rdkit import Chem
 
-from aizynthfinder.chem import MoleculeException, Molecule
+from aizynthfinder.chem import MoleculeException, Molecule, fingerprint_matrix
 
 
 def test_no_input():
@@ -98,3 +99,23 @@ def test_chiral_fingerprint():
     fp2 = mol2.fingerprint(radius=2, chiral=True)
 
     assert fp1.tolist() != fp2.tolist()
+
+    # Both fingerprints are cached on the same molecule
+    assert mol1.fingerprint(2, chiral=True).tolist() == fp2.tolist()
+    assert mol1.fingerprint(2, chiral=False).tolist() == fp1.tolist()
+
+
+def test_fingerprint_matrix():
+    mols = [Molecule(smiles="O"), Molecule(smiles="CCO"), Molecule(smiles="c1ccccc1")]
+    expected = mols[1].fingerprint(2, 1024)
+
+    matrix = fingerprint_matrix(mols, 2, 1024)
+
+    assert matrix.shape == (3, 1024)
+    assert matrix.dtype == np.uint8
+    assert matrix[1].tolist() == expected.tolist()
+    assert matrix.sum(axis=1).tolist() == [
+        sum(mol.fingerprint(2, 1024)) for mol in mols
+    ]
+    # The fingerprints are cached bit-packed
+    assert mols[0]._fingerprints[(2, 1024, False)].nbytes == 128
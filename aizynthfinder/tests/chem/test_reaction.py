@@ -6,6 +6,12 @@ from aizynthfinder.chem import (
     UniqueMolecule,
     hash_reactions,
 )
+from aizynthfinder.chem.reaction import (
+    clear_template_cache,
+    rdchiral_product,
+    release_rdchiral_product,
+    template_cache_stats,
+)
 
 
 def test_retro_reaction(get_action):
@@ -42,6 +48,42 @@ def test_reaction_failure_rdchiral(get_action, mocker):
     assert not products
 
 
+def test_retro_reaction_shares_compiled_template(get_action):
+    clear_template_cache()
+    reaction1 = get_action(applicable=True)
+    reaction2 = get_action(applicable=True)
+
+    _ = reaction1.reactants
+    _ = reaction2.reactants
+
+    assert template_cache_stats() == {"size": 1, "hits": 1, "misses": 1}
+
+    reaction1 = get_action(applicable=True, use_rdchiral=False)
+    reaction2 = get_action(applicable=True, use_rdchiral=False)
+
+    _ = reaction1.reactants
+    _ = reaction2.reactants
+
+    assert reaction1.rd_reaction is reaction2.rd_reaction
+    assert template_cache_stats() == {"size": 2, "hits": 2, "misses": 2}
+
+
+def test_retro_reaction_reuses_product(get_action):
+    reaction1 = get_action(applicable=True)
+    reaction2 = get_action(applicable=False)
+
+    _ = reaction1.reactants
+    product = rdchiral_product(reaction1.mol)
+    _ = reaction2.reactants
+
+    assert reaction2.mol is reaction1.mol
+    assert rdchiral_product(reaction2.mol) is product
+
+    release_rdchiral_product(reaction1.mol)
+
+    assert rdchiral_product(reaction1.mol) is not product
+
+
 def test_retro_reaction_with_rdkit(get_action):
     reaction = get_action(applicable=True, use_rdchiral=False)
 
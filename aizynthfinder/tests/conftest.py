@@ -19,9 +19,15 @@ from aizynthfinder.chem import (
     TemplatedRetroReaction,
     TreeMolecule,
 )
+from aizynthfinder.chem.reaction import clear_template_cache
 from aizynthfinder.chem.serialization import MoleculeDeserializer
 from aizynthfinder.context.config import Configuration
-from aizynthfinder.context.policy import ExpansionStrategy, FilterStrategy
+from aizynthfinder.context.policy import (
+    ExpansionStrategy,
+    FilterStrategy,
+    NovelTemplateExpansionStrategy,
+    TemplateBasedExpansionStrategy,
+)
 from aizynthfinder.context.stock import InMemoryInchiKeyQuery
 from aizynthfinder.search.andor_trees import (
     AndOrSearchTreeBase,
@@ -58,6 +64,14 @@ def pytest_configure(config):
     )
 
 
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    yield
+    clear_template_cache()
+    NovelTemplateExpansionStrategy.clear_applicability_cache()
+    TemplateBasedExpansionStrategy.clear_prediction_cache()
+
+
 @pytest.fixture
 def add_cli_arguments():
     saved_argv = list(sys.argv)
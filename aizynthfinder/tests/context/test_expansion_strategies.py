@@ -1,10 +1,15 @@
+import json
+import logging
+
 import pytest
 
 from aizynthfinder.chem import TreeMolecule
 from aizynthfinder.context.policy import (
     MultiExpansionStrategy,
+    NovelTemplateExpansionStrategy,
     TemplateBasedExpansionStrategy,
 )
+from aizynthfinder.utils.cache import SqliteStore
 from aizynthfinder.utils.exceptions import PolicyException
 
 
@@ -193,3 +198,238 @@ def test_load_templated_expansion_strategy_from_csv(
 
     assert len(strategy.templates) == 3
     assert list(strategy.templates.columns) == ["template", "metadata"]
+
+
+def test_templated_expansion_strategy_metadata(default_config, mock_onnx_model, tmpdir):
+    templates_filename = str(tmpdir / "temp.csv")
+    with open(templates_filename, "w") as fileobj:
+        fileobj.write("template_index\ttemplate\tmetadata\n")
+        fileobj.write("0\tAAA\tmetadata1\n")
+        fileobj.write("1\tBBB\tmetadata2\n")
+        fileobj.write("2\tCCC\tmetadata3\n")
+    strategy = TemplateBasedExpansionStrategy(
+        "default",
+        default_config,
+        model="dummy.onnx",
+        template=templates_filename,
+        template_column="template",
+    )
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    actions1, priors = strategy.get_actions(mols)
+    actions2, _ = strategy.get_actions(mols)
+
+    assert priors == [0.7, 0.2]
+    assert [action.smarts for action in actions1] == ["BBB", "AAA"]
+    assert actions1[0].metadata == {
+        "metadata": "metadata2",
+        "policy_probability": 0.7,
+        "policy_probability_rank": 0,
+        "policy_name": "default",
+        "template_code": 1,
+        "template": "BBB",
+    }
+    assert actions1[1].metadata["template_code"] == 0
+    assert actions1[1].metadata["policy_probability_rank"] == 1
+    assert actions2[0].metadata == actions1[0].metadata
+    assert actions2[0].metadata is not actions1[0].metadata
+
+
+def test_templated_expansion_strategy_prediction_store(
+    default_config, create_dummy_templates, mock_onnx_model, tmpdir
+):
+    templates_filename = create_dummy_templates(3)
+    store_filename = str(tmpdir / "predictions.sqlite")
+    kwargs = {
+        "model": "dummy.onnx",
+        "template": templates_filename,
+        "prediction_store": store_filename,
+    }
+    strategy = TemplateBasedExpansionStrategy("policy1", default_config, **kwargs)
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    _, priors1 = strategy.get_actions(mols)
+    strategy.reset_cache()
+    _, priors2 = strategy.get_actions(mols)
+
+    assert strategy.persistent_cache
+    assert priors2 == priors1
+    assert TemplateBasedExpansionStrategy.prediction_cache_stats() == {
+        "size": 1,
+        "hits": 1,
+        "misses": 1,
+    }
+
+    # A new process would only find the predictions on disk
+    TemplateBasedExpansionStrategy.clear_prediction_cache()
+    strategy2 = TemplateBasedExpansionStrategy("policy2", default_config, **kwargs)
+    records, priors3 = strategy2.get_action_records(mols)
+
+    assert priors3 == priors1
+    assert [record.template_index for record in records] == [1, 0]
+    assert TemplateBasedExpansionStrategy.prediction_cache_stats()["hits"] == 1
+
+    # Other cutoffs give other predictions
+    strategy3 = TemplateBasedExpansionStrategy(
+        "policy3", default_config, cutoff_number=1, **kwargs
+    )
+    _, priors4 = strategy3.get_actions(mols)
+
+    assert strategy3.prediction_cache_key != strategy2.prediction_cache_key
+    assert priors4 == priors1[:1]
+    assert TemplateBasedExpansionStrategy.prediction_cache_stats()["misses"] == 1
+
+
+def test_templated_expansion_strategy_no_persistent_cache(
+    default_config, setup_template_expansion_policy
+):
+    strategy, _ = setup_template_expansion_policy()
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    strategy.get_actions(mols)
+
+    assert not strategy.persistent_cache
+    assert TemplateBasedExpansionStrategy.prediction_cache_stats()["size"] == 0
+
+
+def test_novel_template_expansion_strategy(default_config, tmpdir):
+    applicable = (
+        "([#8:4]-[N;H0;D3;+0:5](-[C;D1;H3:6])-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3])"
+        ">>(Cl-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3]).([#8:4]-[NH;D2;+0:5]-[C;D1;H3:6])"
+    )
+    screened = "[c:2]-[Br;H0;D1;+0]>>[c:2]-[OH;D1;+0]"
+    invalid = "not a template"
+    filename = str(tmpdir / "novel.json")
+    with open(filename, "w") as fileobj:
+        json.dump({applicable: 0.8, screened: 0.5, invalid: 0.1}, fileobj)
+
+    strategy = NovelTemplateExpansionStrategy(
+        "novel", default_config, template=filename
+    )
+
+    assert strategy.templates == [applicable, screened]
+    assert list(strategy.scores) == [0.8, 0.5]
+
+    mol = TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)
+    assert strategy.screen_templates(mol) == [0]
+
+    actions, priors = strategy.get_actions([mol])
+
+    assert priors == [0.8]
+    assert len(actions) == 1
+    assert actions[0].smarts == applicable
+    assert actions[0].metadata["classification"] == "novel"
+    assert actions[0].metadata["policy_name"] == "novel"
+    assert actions[0].reactants[0][1].smiles == "CNO"
+
+    assert strategy.screen_templates(TreeMolecule(smiles="c1ccccc1", parent=None)) == []
+
+
+def test_novel_template_expansion_strategy_applicability_cache(
+    default_config, tmpdir, mocker
+):
+    applicable = (
+        "([#8:4]-[N;H0;D3;+0:5](-[C;D1;H3:6])-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3])"
+        ">>(Cl-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3]).([#8:4]-[NH;D2;+0:5]-[C;D1;H3:6])"
+    )
+    filename = str(tmpdir / "novel.json")
+    with open(filename, "w") as fileobj:
+        json.dump({applicable: 0.8}, fileobj)
+    store = str(tmpdir / "novel_store.sqlite")
+    strategy = NovelTemplateExpansionStrategy(
+        "novel", default_config, template=filename, applicability_store=store
+    )
+    screen_spy = mocker.spy(strategy, "screen_templates")
+
+    actions, _ = strategy.get_actions(
+        [TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)]
+    )
+    strategy.reset_cache()
+    actions2, _ = strategy.get_actions(
+        [TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)]
+    )
+
+    assert screen_spy.call_count == 1
+    assert len(actions) == len(actions2) == 1
+    assert actions2[0].unqueried
+    assert NovelTemplateExpansionStrategy.applicability_cache_stats() == {
+        "size": 1,
+        "hits": 1,
+        "misses": 1,
+    }
+
+    NovelTemplateExpansionStrategy.clear_applicability_cache()
+    strategy2 = NovelTemplateExpansionStrategy(
+        "novel", default_config, template=filename, applicability_store=store
+    )
+    screen_spy = mocker.spy(strategy2, "screen_templates")
+
+    actions3, _ = strategy2.get_actions(
+        [TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)]
+    )
+
+    screen_spy.assert_not_called()
+    assert actions3[0].smarts == applicable
+    assert len(SqliteStore(store)) == 1
+
+
+def test_novel_template_expansion_strategy_applicability_store(
+    default_config, tmpdir, mocker, caplog
+):
+    applicable = (
+        "([#8:4]-[N;H0;D3;+0:5](-[C;D1;H3:6])-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3])"
+        ">>(Cl-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3]).([#8:4]-[NH;D2;+0:5]-[C;D1;H3:6])"
+    )
+    filename = str(tmpdir / "novel.json")
+    with open(filename, "w") as fileobj:
+        json.dump({applicable: 0.8}, fileobj)
+    store = str(tmpdir / "novel_store.sqlite")
+    strategy = NovelTemplateExpansionStrategy(
+        "novel", default_config, template=filename, applicability_store=store
+    )
+    rdkit_strategy = NovelTemplateExpansionStrategy(
+        "novel", default_config, template=filename, use_rdchiral=False
+    )
+    # An entry written by another process, and a corrupt entry
+    other_store = SqliteStore(store)
+    other_key = TreeMolecule(smiles="CCO", parent=None).inchi_key
+    other_store[f"{other_key}:{strategy.template_set_hash}"] = b""
+    corrupt_key = TreeMolecule(smiles="c1ccccc1", parent=None).inchi_key
+    other_store[f"{corrupt_key}:{strategy.template_set_hash}"] = b"abc"
+    other_store.close()
+
+    assert rdkit_strategy.template_set_hash != strategy.template_set_hash
+
+    NovelTemplateExpansionStrategy.clear_applicability_cache()
+    strategy = NovelTemplateExpansionStrategy(
+        "novel", default_config, template=filename, applicability_store=store
+    )
+    screen_spy = mocker.spy(strategy, "screen_templates")
+    mols = [
+        TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None),
+        TreeMolecule(smiles="c1ccccc1", parent=None),
+        TreeMolecule(smiles="CCO", parent=None),
+    ]
+
+    with caplog.at_level(logging.WARNING):
+        actions, _ = strategy.get_actions(mols)
+
+    assert len(actions) == 1
+    assert screen_spy.call_count == 2
+    assert "corrupt entry" in caplog.text
+
+    NovelTemplateExpansionStrategy.clear_applicability_cache()
+    strategy2 = NovelTemplateExpansionStrategy(
+        "novel", default_config, template=filename, applicability_store=store
+    )
+    screen_spy = mocker.spy(strategy2, "screen_templates")
+    actions2, _ = strategy2.get_actions(mols)
+
+    screen_spy.assert_not_called()
+    assert [action.smarts for action in actions2] == [applicable]
+    assert len(SqliteStore(store)) == 3
+
+
+def test_novel_template_expansion_strategy_no_file(default_config):
+    with pytest.raises(PolicyException, match="template file"):
+        NovelTemplateExpansionStrategy("novel", default_config)
@@ -56,6 +56,8 @@ def test_load_from_file(write_yaml):
         "immediate_instantiation": (),
         "mcts_grouping": None,
         "search_rewards_weights": [],
+        "batch_size": 1,
+        "transposition_table": False,
     }
 
 
@@ -1,5 +1,8 @@
+import json
+
 import numpy as np
 import pytest
+from rdchiral import main as rdc
 
 from aizynthfinder.chem import (
     SmilesBasedRetroReaction,
@@ -7,6 +10,7 @@ from aizynthfinder.chem import (
     TreeMolecule,
 )
 from aizynthfinder.context.policy import (
+    ActionRecord,
     BondFilter,
     QuickKerasFilter,
     ReactantsCountFilter,
@@ -123,6 +127,149 @@ def test_get_actions(default_config, setup_template_expansion_policy):
     assert [round(prior, 4) for prior in priors] == [0.7778, 0.2222]
 
 
+def test_get_action_records(default_config, setup_template_expansion_policy):
+    strategy, _ = setup_template_expansion_policy()
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load(strategy)
+    expansion_policy.select("policy1")
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    records, priors = expansion_policy.get_action_records(mols)
+    actions, _ = expansion_policy.get_actions(mols)
+
+    assert priors == [0.7, 0.2]
+    assert all(isinstance(record, ActionRecord) for record in records)
+    assert [record.rank for record in records] == [0, 1]
+    for record, action in zip(records, actions):
+        new_action = expansion_policy.make_action(record)
+        assert isinstance(new_action, TemplatedRetroReaction)
+        assert new_action.mol is mols[0]
+        assert new_action.smarts == action.smarts
+        assert new_action.metadata == action.metadata
+    assert expansion_policy.make_action(actions[0]) is actions[0]
+
+
+def test_get_actions_popular_templates(
+    default_config, setup_template_expansion_policy, tmpdir, mocker
+):
+    strategy, _ = setup_template_expansion_policy(templates=["AAA", "BBB", "CCC"])
+    strategy.cutoff_number = 2
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load(strategy)
+    expansion_policy.select("policy1")
+    filename = str(tmpdir / "optimised.json")
+    with open(filename, "w") as fileobj:
+        json.dump({"CCC": 10.0}, fileobj)
+    default_config.search.optimisation_type = "popular"
+    default_config.search.custom_templates = filename
+    json_spy = mocker.spy(json, "load")
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+
+    actions, priors = expansion_policy.get_actions(mols)
+
+    assert [action.smarts for action in actions] == ["CCC", "BBB"]
+    assert [round(prior, 4) for prior in priors] == [0.5088, 0.4912]
+    assert actions[0].metadata["classification"] == "optimised"
+    assert "classification" not in actions[1].metadata
+
+    records, priors2 = expansion_policy.get_action_records(mols)
+
+    assert priors2 == priors
+    assert [record.template_index for record in records] == [2, 1]
+    assert json_spy.call_count == 1
+
+
+def test_get_actions_novel_templates(
+    default_config, setup_template_expansion_policy, tmpdir, mocker
+):
+    strategy, _ = setup_template_expansion_policy(templates=["AAA", "BBB", "CCC"])
+    strategy.cutoff_number = 2
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load(strategy)
+    expansion_policy.select("policy1")
+    novel = (
+        "([#8:4]-[N;H0;D3;+0:5](-[C;D1;H3:6])-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3])"
+        ">>(Cl-[C;H0;D3;+0:1](-[C:2])=[O;D1;H0:3]).([#8:4]-[NH;D2;+0:5]-[C;D1;H3:6])"
+    )
+    filename = str(tmpdir / "novel.json")
+    with open(filename, "w") as fileobj:
+        json.dump({novel: 0.8}, fileobj)
+    default_config.search.optimisation_type = "novel"
+    default_config.search.custom_templates = filename
+    run_spy = mocker.spy(rdc, "rdchiralRun")
+    mol = TreeMolecule(smiles="CCCCOc1ccc(CC(=O)N(C)O)cc1", parent=None)
+
+    actions, priors = expansion_policy.get_actions([mol])
+
+    assert [action.smarts for action in actions] == ["BBB", novel, "AAA"]
+    assert [round(prior, 4) for prior in priors] == [0.5833, 0.25, 0.1667]
+    assert actions[1].metadata["classification"] == "novel"
+    assert actions[1].metadata["policy_probability"] == pytest.approx(0.3)
+    assert actions[1].reactants[0][1].smiles == "CNO"
+    # The reactants of the novel template are computed once, by the strategy
+    assert run_spy.call_count == 1
+
+
+def test_get_actions_popular_templates_same_rule(
+    default_config, setup_template_expansion_policy, tmpdir
+):
+    strategy, _ = setup_template_expansion_policy(templates=["AAA", "BBB", "CCC"])
+    strategy.cutoff_number = 2
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load(strategy)
+    expansion_policy.select("policy1")
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+    # The rule of strategies that are not template-based, applied after the cutoff
+    actions, priors = strategy.get_actions(mols)
+    actions, priors = expansion_policy._optimise_templates(
+        actions, priors, [("AAA", 10.0)]
+    )
+    expected = {action.smarts: prior for action, prior in zip(actions, priors)}
+    filename = str(tmpdir / "optimised.json")
+    with open(filename, "w") as fileobj:
+        json.dump({"AAA": 10.0}, fileobj)
+    default_config.search.optimisation_type = "popular"
+    default_config.search.custom_templates = filename
+
+    actions, priors = expansion_policy.get_actions(mols)
+
+    assert [action.smarts for action in actions] == ["AAA", "BBB"]
+    assert [round(prior, 4) for prior in priors] == [0.541, 0.459]
+    assert priors == pytest.approx([expected["AAA"], expected["BBB"]])
+
+
+def test_get_actions_popular_templates_cleared(
+    default_config, setup_template_expansion_policy, tmpdir
+):
+    strategy, _ = setup_template_expansion_policy(templates=["AAA", "BBB", "CCC"])
+    strategy.cutoff_number = 2
+    expansion_policy = default_config.expansion_policy
+    expansion_policy.load(strategy)
+    expansion_policy.select("policy1")
+    filename = str(tmpdir / "optimised.json")
+    with open(filename, "w") as fileobj:
+        json.dump({"CCC": 10.0}, fileobj)
+    default_config.search.optimisation_type = "popular"
+    default_config.search.custom_templates = filename
+    mols = [TreeMolecule(smiles="CCO", parent=None)]
+    expansion_policy.get_actions(mols)
+
+    default_config.search.optimisation_type = ""
+    actions, priors = expansion_policy.get_actions(mols)
+
+    assert strategy.template_boost is None
+    assert [action.smarts for action in actions] == ["BBB", "AAA"]
+    assert priors == [0.7, 0.2]
+
+    default_config.search.optimisation_type = "popular"
+    expansion_policy.get_actions(mols)
+    default_config.search.optimisation_type = ""
+    records, priors = expansion_policy.get_action_records(mols)
+
+    assert [record.template_index for record in records] == [1, 0]
+    assert priors == [0.7, 0.2]
+
+
 def test_get_actions_two_policies(default_config, setup_template_expansion_policy):
     expansion_policy = default_config.expansion_policy
     strategy1, _ = setup_template_expansion_policy("policy1")
@@ -5,14 +5,23 @@ import pandas as pd
 
 from aizynthfinder.chem import Molecule
 from aizynthfinder.context.stock import (
+    CachedStockQuery,
+    InMemoryInchiKeyQuery,
+    MemoryMappedInchiKeyQuery,
+    SqliteInchiKeyQuery,
     StockException,
 )
 from aizynthfinder.context.stock.queries import HAS_MOLBLOOM
 from aizynthfinder.tools.make_stock import (
+    convert_to_mmap_stock,
+    convert_to_sqlite_stock,
+    convert_smiles_parallel,
     extract_plain_smiles,
     extract_smiles_from_module,
     make_hdf5_stock,
+    make_mmap_stock,
     make_mongo_stock,
+    make_sqlite_stock,
     make_molbloom,
     make_molbloom_inchi,
 )
@@ -112,6 +121,51 @@ def test_availability_string_multi(
     assert stock.availability_string(benzene) == "source1,stock1"
 
 
+def test_availability_lists(
+    default_config, setup_stock_with_query, create_dummy_stock1, create_dummy_stock2
+):
+    stock = default_config.stock
+    stock.load(setup_stock_with_query(create_dummy_stock1("hdf5")), "stock1")
+    stock.load(setup_stock_with_query(create_dummy_stock2), "stock2")
+    stock.select(["stock1", "stock2"])
+    mols = [
+        Molecule(smiles="CCO"),
+        Molecule(smiles="c1ccccc1"),
+        Molecule(smiles="Cc1ccccc1"),
+    ]
+
+    assert stock.availability_lists(mols) == [
+        stock.availability_list(mol) for mol in mols
+    ]
+    assert stock.availability_lists(mols)[1] == ["stock1", "stock2"]
+
+
+def test_contains_many(
+    default_config, setup_stock_with_query, create_dummy_stock1, create_dummy_stock2
+):
+    stock = default_config.stock
+    stock.load(setup_stock_with_query(create_dummy_stock1("hdf5")), "stock1")
+    stock.load(setup_stock_with_query(create_dummy_stock2), "stock2")
+    mols = [
+        Molecule(smiles="CCO"),
+        Molecule(smiles="c1ccccc1"),
+        Molecule(smiles="Cc1ccccc1"),
+        Molecule(smiles="Oc1ccccc1"),
+    ]
+
+    assert stock.contains_many(mols) == [False] * 4
+
+    stock.select(["stock1", "stock2"])
+
+    assert stock.contains_many(mols) == [False, True, True, True]
+    assert stock.contains_many(mols) == [mol in stock for mol in mols]
+    assert stock.contains_many([]) == []
+
+    stock.exclude(mols[2])
+
+    assert stock.contains_many(mols) == [False, True, False, True]
+
+
 def test_mol_in_stock(setup_stock_with_query):
     stock = setup_stock_with_query()
 
@@ -211,6 +265,165 @@ def test_load_csv_stock_with_negative_price(tmpdir, default_config):
         )
 
 
+def test_mmap_stock(tmpdir):
+    filename = str(tmpdir / "stock.mmap")
+    inchi_keys = [
+        "YXFVVABEGXRONW-UHFFFAOYSA-N",
+        "UHOVQNZJYSORNB-UHFFFAOYSA-N",
+        "YXFVVABEGXRONW-UHFFFAOYSA-N",
+    ]
+
+    MemoryMappedInchiKeyQuery.create(filename, inchi_keys, [10.0, 5.0, 8.0])
+    query = MemoryMappedInchiKeyQuery(filename)
+
+    assert len(query) == 2
+    assert Molecule(smiles="c1ccccc1") in query
+    assert Molecule(smiles="CCO") not in query
+    assert query.price(Molecule(smiles="c1ccccc1")) == 5.0
+    assert query.price(Molecule(smiles="Cc1ccccc1")) == 8.0
+    with pytest.raises(StockException, match="no price info"):
+        query.price(Molecule(smiles="CCO"))
+
+
+def test_mmap_stock_many(tmpdir):
+    filename = str(tmpdir / "stock.mmap")
+    MemoryMappedInchiKeyQuery.create(
+        filename,
+        ["YXFVVABEGXRONW-UHFFFAOYSA-N", "UHOVQNZJYSORNB-UHFFFAOYSA-N"],
+        [10.0, 5.0],
+    )
+    query = MemoryMappedInchiKeyQuery(filename)
+    mols = [
+        Molecule(smiles="c1ccccc1"),
+        Molecule(smiles="CCO"),
+        Molecule(smiles="Cc1ccccc1"),
+    ]
+
+    assert query.contains_many(mols) == [True, False, True]
+    assert query.prices_many(mols) == [5.0, None, 10.0]
+
+
+def test_sqlite_stock(tmpdir):
+    filename = str(tmpdir / "stock.sqlite")
+    nkeys = SqliteInchiKeyQuery.create(
+        filename,
+        [
+            ("YXFVVABEGXRONW-UHFFFAOYSA-N", 10.0, 1.0),
+            ("UHOVQNZJYSORNB-UHFFFAOYSA-N", 5.0, None),
+            ("YXFVVABEGXRONW-UHFFFAOYSA-N", 8.0, 3.0),
+            ("LFQSCWFLJHTTHZ-UHFFFAOYSA-N", None, 2.0),
+        ],
+    )
+    query = SqliteInchiKeyQuery(filename)
+    benzene = Molecule(smiles="c1ccccc1")
+    toluene = Molecule(smiles="Cc1ccccc1")
+    ethanol = Molecule(smiles="CCO")
+    phenol = Molecule(smiles="Oc1ccccc1")
+
+    assert nkeys == len(query) == 3
+    assert benzene in query
+    assert phenol not in query
+    assert query.contains_many([benzene, phenol, toluene]) == [True, False, True]
+    assert query.price(toluene) == 8.0
+    assert query.amount(toluene) == 3.0
+    assert query.prices_many([benzene, ethanol, phenol]) == [5.0, None, None]
+    assert sorted(query.inchi_keys()) == [
+        "LFQSCWFLJHTTHZ-UHFFFAOYSA-N",
+        "UHOVQNZJYSORNB-UHFFFAOYSA-N",
+        "YXFVVABEGXRONW-UHFFFAOYSA-N",
+    ]
+    with pytest.raises(StockException, match="no price"):
+        query.price(ethanol)
+    with pytest.raises(StockException, match="no amount"):
+        query.amount(benzene)
+    with pytest.raises(StockException, match="no price"):
+        query.price(phenol)
+
+
+def test_sqlite_stock_batches(tmpdir, monkeypatch):
+    filename = str(tmpdir / "stock.sqlite")
+    mols = [Molecule(smiles="C" * length + "O") for length in range(1, 8)]
+    SqliteInchiKeyQuery.create(
+        filename, [(mol.inchi_key, None, None) for mol in mols[::2]]
+    )
+    query = SqliteInchiKeyQuery(filename)
+    monkeypatch.setattr(SqliteInchiKeyQuery, "_BATCH_SIZE", 2)
+
+    assert query.contains_many(mols + mols[:1]) == [True, False] * 3 + [True] * 2
+    assert query.contains_many([]) == []
+
+
+def test_sqlite_stock_connection_per_process(tmpdir, mocker):
+    filename = str(tmpdir / "stock.sqlite")
+    SqliteInchiKeyQuery.create(filename, [("UHOVQNZJYSORNB-UHFFFAOYSA-N", 5.0, 1.0)])
+    query = SqliteInchiKeyQuery(filename)
+    benzene = Molecule(smiles="c1ccccc1")
+
+    assert benzene in query
+    connection = query._connection
+    assert benzene in query
+    assert query._connection is connection
+
+    mocker.patch("aizynthfinder.context.stock.queries.os.getpid", return_value=-1)
+
+    assert benzene in query
+    assert query._connection is not connection
+
+
+def test_sqlite_stock_raises(tmpdir):
+    filename = str(tmpdir / "stock.sqlite")
+
+    with pytest.raises(StockException, match="not a SQLite stock"):
+        SqliteInchiKeyQuery(filename)
+
+    with pytest.raises(StockException, match="non-negative"):
+        SqliteInchiKeyQuery.create(filename, [("key1", -1.0, None)])
+
+
+def test_sqlite_stock_stop_criteria(default_config, tmpdir):
+    filename = str(tmpdir / "stock.sqlite")
+    SqliteInchiKeyQuery.create(
+        filename,
+        [
+            ("UHOVQNZJYSORNB-UHFFFAOYSA-N", 5.0, 100.0),
+            ("YXFVVABEGXRONW-UHFFFAOYSA-N", 20.0, 1.0),
+        ],
+    )
+    stock = default_config.stock
+    stock.load_from_config(**{"stock1": filename})
+    stock.select(["stock1"])
+    stock.set_stop_criteria({"price": 10, "amount": 50})
+
+    assert isinstance(stock["stock1"], SqliteInchiKeyQuery)
+    assert Molecule(smiles="c1ccccc1") in stock
+    assert Molecule(smiles="Cc1ccccc1") not in stock
+
+
+def test_mmap_stock_no_prices(tmpdir):
+    filename = str(tmpdir / "stock.mmap")
+
+    MemoryMappedInchiKeyQuery.create(filename, ["UHOVQNZJYSORNB-UHFFFAOYSA-N"])
+    query = MemoryMappedInchiKeyQuery(filename)
+
+    assert Molecule(smiles="c1ccccc1") in query
+    with pytest.raises(StockException, match="no prices"):
+        query.price(Molecule(smiles="c1ccccc1"))
+
+    MemoryMappedInchiKeyQuery.create(filename, [])
+
+    assert len(MemoryMappedInchiKeyQuery(filename)) == 0
+    assert Molecule(smiles="c1ccccc1") not in MemoryMappedInchiKeyQuery(filename)
+
+
+def test_mmap_stock_not_a_stock(tmpdir):
+    filename = str(tmpdir / "stock.mmap")
+    with open(filename, "w") as fileobj:
+        fileobj.write("UHOVQNZJYSORNB-UHFFFAOYSA-N")
+
+    with pytest.raises(StockException, match="not a memory-mapped stock"):
+        MemoryMappedInchiKeyQuery(filename)
+
+
 def test_exclude(default_config, setup_stock_with_query):
     stock_query = setup_stock_with_query()
     stock = default_config.stock
@@ -274,6 +487,26 @@ def test_price_with_price(default_config, make_stock_query):
     assert stock.price(mol) == 14
 
 
+def test_prices_many(default_config, create_dummy_stock1, make_stock_query):
+    benzene = Molecule(smiles="c1ccccc1")
+    toluene = Molecule(smiles="Cc1ccccc1")
+    ethanol = Molecule(smiles="CCO")
+    stock = default_config.stock
+    stock.load_from_config(
+        **{
+            "stock1": {
+                "type": "InMemoryInchiKeyQuery",
+                "path": create_dummy_stock1("csv"),
+                "price_col": "price",
+            }
+        }
+    )
+    stock.load(make_stock_query([benzene, ethanol], price={benzene: 2.0}), "stock2")
+    stock.select_all()
+
+    assert stock.prices_many([benzene, toluene, ethanol]) == [2.0, 10.0, None]
+
+
 def test_price_with_price_raises(default_config, make_stock_query):
     mol = Molecule(smiles="c1ccccc1")
     stock_query = make_stock_query([mol])
@@ -428,6 +661,17 @@ def test_mongodb_contains(mocked_mongo_db_query):
     assert toluene not in query
 
 
+def test_mongodb_contains_many(mocked_mongo_db_query):
+    _, query = mocked_mongo_db_query()
+    query.molecules.distinct.return_value = ["UHOVQNZJYSORNB-UHFFFAOYSA-N"]
+    mols = [Molecule(smiles="CCO"), Molecule(smiles="c1ccccc1")]
+
+    assert query.contains_many(mols) == [False, True]
+    query.molecules.distinct.assert_called_once_with(
+        "inchi_key", {"inchi_key": {"$in": [mol.inchi_key for mol in mols]}}
+    )
+
+
 def test_mongodb_availability(mocked_mongo_db_query):
     _, query = mocked_mongo_db_query()
     query.molecules.find.return_value = [{"source": "source1"}, {"source": "source2"}]
@@ -492,6 +736,136 @@ def test_make_hdf5_stock(default_config, tmpdir):
     assert len(stock) == 2
 
 
+def test_make_mmap_stock(default_config, tmpdir):
+    filename = str(tmpdir / "temp.mmap")
+    inchi_keys = ("key1", "key2", "key1")
+
+    make_mmap_stock(inchi_keys, filename)
+    stock = default_config.stock
+    stock.load_from_config(**{"stock1": filename})
+    stock.select(["stock1"])
+
+    assert isinstance(stock["stock1"], MemoryMappedInchiKeyQuery)
+    assert len(stock) == 2
+
+
+def test_convert_to_mmap_stock(default_config, create_dummy_stock1, tmpdir):
+    filename = str(tmpdir / "temp.mmap")
+
+    convert_to_mmap_stock(
+        [create_dummy_stock1("hdf5"), create_dummy_stock1("csv")],
+        filename,
+        price_col="price",
+    )
+    stock = default_config.stock
+    stock.load_from_config(**{"stock1": {"type": "mmap", "path": filename}})
+    stock.select(["stock1"])
+
+    assert len(stock) == 2
+    assert stock.price(Molecule(smiles="Cc1ccccc1")) == 10.0
+
+
+def test_convert_to_mmap_stock_in_chunks(tmpdir, mocker):
+    filename = str(tmpdir / "temp.mmap")
+    csv_filename = str(tmpdir / "stock.csv")
+    pd.DataFrame(
+        {
+            "inchi_key": ["key1", "akey22", "key1", "b", "zz", "akey22", "key3"],
+            "price": [3.0, 2.0, 1.0, 5.0, 4.0, 6.0, 7.0],
+        }
+    ).to_csv(csv_filename, index=False)
+    create_spy = mocker.spy(MemoryMappedInchiKeyQuery, "create_from_sorted")
+
+    convert_to_mmap_stock([csv_filename], filename, price_col="price", chunk_size=2)
+    query = MemoryMappedInchiKeyQuery(filename)
+
+    assert create_spy.call_count == 1
+    assert list(query.inchi_keys()) == ["akey22", "b", "key1", "key3", "zz"]
+    assert query._prices.tolist() == [2.0, 5.0, 1.0, 7.0, 4.0]
+    assert not any(tmpdir.listdir(lambda path: path.isdir()))
+
+    convert_to_mmap_stock([csv_filename], filename, chunk_size=2)
+    query = MemoryMappedInchiKeyQuery(filename)
+
+    assert len(query) == 5
+    assert query.prices_many([Molecule(smiles="CCO")]) == [None]
+
+    pd.DataFrame({"inchi_key": ["key1"], "price": [-1.0]}).to_csv(
+        csv_filename, index=False
+    )
+    with pytest.raises(StockException, match="non-negative"):
+        convert_to_mmap_stock([csv_filename], filename, price_col="price")
+
+
+def test_make_hdf5_stock_in_chunks(default_config, tmpdir):
+    filename = str(tmpdir / "temp.hdf5")
+    inchi_keys = ["key1", "akey22", "key1", "b", "zz", "akey22", "key3"]
+
+    make_hdf5_stock(inchi_keys, filename, chunk_size=2)
+    data = pd.read_hdf(filename, key="table")
+
+    assert data["inchi_key"].tolist() == sorted(set(inchi_keys))
+    assert not any(tmpdir.listdir(lambda path: path.isdir()))
+
+    make_hdf5_stock([], filename)
+
+    assert len(pd.read_hdf(filename, key="table")) == 0
+
+
+def test_make_mmap_stock_in_chunks(tmpdir):
+    filename = str(tmpdir / "temp.mmap")
+    mols = [Molecule(smiles="C" * length + "O") for length in range(1, 9)]
+    inchi_keys = [mol.inchi_key for mol in mols] * 2 + ["short"]
+
+    make_mmap_stock(inchi_keys, filename, chunk_size=3)
+    query = MemoryMappedInchiKeyQuery(filename)
+
+    assert len(query) == 9
+    assert list(query.inchi_keys()) == sorted(set(inchi_keys))
+    assert query.contains_many(mols) == [True] * 8
+
+    make_mmap_stock([], filename)
+
+    assert len(MemoryMappedInchiKeyQuery(filename)) == 0
+
+
+def test_convert_smiles_parallel():
+    smiles = ["c1ccccc1", "Cc1ccccc1", "CCO", "c1ccccc1", "N1#CC1", "CCCO"] * 3
+    expected = [Molecule(smiles=smi).inchi_key for smi in smiles if smi != "N1#CC1"]
+
+    assert list(convert_smiles_parallel(smiles, 2, chunk_size=4)) == expected
+    assert list(convert_smiles_parallel(iter(smiles), 1)) == expected
+
+
+def test_make_sqlite_stock(default_config, tmpdir):
+    filename = str(tmpdir / "temp.sqlite")
+    inchi_keys = ("key1", "key2", "key1")
+
+    make_sqlite_stock(inchi_keys, filename)
+    stock = default_config.stock
+    stock.load_from_config(**{"stock1": {"type": "sqlite", "path": filename}})
+    stock.select(["stock1"])
+
+    assert isinstance(stock["stock1"], SqliteInchiKeyQuery)
+    assert len(stock) == 2
+
+
+def test_convert_to_sqlite_stock(default_config, create_dummy_stock1, tmpdir):
+    filename = str(tmpdir / "temp.sqlite")
+
+    convert_to_sqlite_stock(
+        [create_dummy_stock1("hdf5"), create_dummy_stock1("csv")],
+        filename,
+        price_col="price",
+    )
+    stock = default_config.stock
+    stock.load_from_config(**{"stock1": filename})
+    stock.select(["stock1"])
+
+    assert len(stock) == 2
+    assert stock.price(Molecule(smiles="Cc1ccccc1")) == 10.0
+
+
 def test_make_mongodb_stock(mocked_mongo_db_query):
     inchi_keys = ("key1", "key2", "key1")
     _, query = mocked_mongo_db_query()
@@ -537,3 +911,124 @@ def test_make_bloom_inchi_filter(default_config, tmpdir):
     stock.load_from_config(molbloom=filename)
 
     assert "molbloom" in stock.items
+
+
+def test_cached_stock_query(mocker, create_dummy_stock1):
+    backend = InMemoryInchiKeyQuery(create_dummy_stock1("hdf5"))
+    spy = mocker.spy(backend, "contains_many")
+    query = CachedStockQuery(backend, build_filter=True)
+    mols = [
+        Molecule(smiles="c1ccccc1"),
+        Molecule(smiles="CCO"),
+        Molecule(smiles="Cc1ccccc1"),
+    ]
+
+    assert query.contains_many(mols) == [True, False, True]
+    assert query.contains_many(mols) == [True, False, True]
+    assert mols[1] not in query
+    assert len(query) == 2
+    assert sorted(query.inchi_keys()) == sorted(backend.inchi_keys())
+    stats = query.stats()
+    assert stats["lookups"] == 7
+    assert stats["backend_queries"] == spy.call_count == 1
+    assert stats["backend_lookups"] == 2
+    assert stats["cache_hits"] == 2
+    assert stats["filtered"] == 3
+
+
+def test_cached_stock_query_repeated_key(mocker, create_dummy_stock1):
+    backend = InMemoryInchiKeyQuery(create_dummy_stock1("hdf5"))
+    spy = mocker.spy(backend, "contains_many")
+    query = CachedStockQuery(backend, build_filter=True)
+    toluene = Molecule(smiles="Cc1ccccc1")
+    ethanol = Molecule(smiles="CCO")
+    mols = [toluene, ethanol, Molecule(smiles="Cc1ccccc1"), ethanol]
+
+    assert query.contains_many(mols) == [True, False, True, False]
+    assert len(spy.call_args[0][0]) == 1
+    stats = query.stats()
+    assert stats["lookups"] == 4
+    assert stats["backend_lookups"] == 1
+    assert stats["filtered"] == 1
+
+
+def test_cached_stock_query_without_filter(mocker, create_dummy_stock1):
+    backend = InMemoryInchiKeyQuery(create_dummy_stock1("hdf5"))
+    spy = mocker.spy(backend, "contains_many")
+    query = CachedStockQuery(backend, cache_size=1)
+    benzene = Molecule(smiles="c1ccccc1")
+    ethanol = Molecule(smiles="CCO")
+
+    assert benzene in query
+    assert ethanol not in query
+    assert ethanol not in query
+    assert benzene in query
+
+    assert spy.call_count == 3
+    assert query.stats()["filtered"] == 0
+    assert query.stats()["cache_hits"] == 1
+
+
+def test_cached_stock_query_from_config(default_config, create_dummy_stock1):
+    stock = default_config.stock
+    stock.load_from_config(
+        **{
+            "cached": {
+                "type": "cached",
+                "query": {
+                    "type": "inchiset",
+                    "path": create_dummy_stock1("csv"),
+                    "price_col": "price",
+                },
+                "build_filter": True,
+            }
+        }
+    )
+    stock.select("cached")
+    toluene = Molecule(smiles="Cc1ccccc1")
+
+    assert isinstance(stock["cached"], CachedStockQuery)
+    assert toluene in stock
+    assert stock.price(toluene) == 10.0
+
+
+@pytest.mark.xfail(condition=not HAS_MOLBLOOM, reason="molbloom package not installed")
+def test_cached_stock_query_molbloom(tmpdir, create_dummy_stock1):
+    filename = str(tmpdir / "stock.bloom")
+    make_molbloom_inchi(["UHOVQNZJYSORNB-UHFFFAOYSA-N"], filename, 1000, 10)
+    backend = InMemoryInchiKeyQuery(create_dummy_stock1("hdf5"))
+    query = CachedStockQuery(backend, bloom_path=filename)
+
+    # Toluene is in the wrapped stock, but not in the filter
+    assert query.contains_many(
+        [Molecule(smiles="c1ccccc1"), Molecule(smiles="Cc1ccccc1")]
+    ) == [True, False]
+    assert query.stats()["filtered"] == 1
+
+
+def test_cached_stock_query_mongodb(mocker):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    mocker.patch(
+        "aizynthfinder.context.stock.queries.get_mongo_client", return_value=client
+    )
+    smiles = ["c1ccccc1", "Cc1ccccc1", "Oc1ccccc1"]
+    client["stock_db"]["molecules"].insert_many(
+        [
+            {"inchi_key": Molecule(smiles=smi).inchi_key, "source": "zinc"}
+            for smi in smiles
+        ]
+    )
+    query = CachedStockQuery({"type": "mongodb"}, build_filter=True)
+    spy = mocker.spy(query.query.molecules, "distinct")
+    mols = [Molecule(smiles=smi) for smi in smiles] + [
+        Molecule(smiles="C" * length + "O") for length in range(1, 21)
+    ]
+
+    for _ in range(10):
+        assert query.contains_many(mols) == [True] * 3 + [False] * 20
+
+    stats = query.stats()
+    assert stats["lookups"] == 230
+    assert stats["backend_queries"] == spy.call_count == 1
+    assert stats["backend_lookups"] < 23
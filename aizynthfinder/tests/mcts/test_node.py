@@ -1,3 +1,6 @@
+from aizynthfinder.context.policy import ActionRecord
+
+
 def test_root_state_properties(generate_root):
     root = generate_root("CCCCOc1ccc(CC(=O)N(C)O)cc1")
     root2 = generate_root("CCCCOc1ccc(CC(=O)N(C)O)cc1")
@@ -24,6 +27,35 @@ def test_expand_root_node(setup_mcts_search):
     assert view["objects"] == [None, None, None]
 
 
+def test_expand_root_with_action_records(setup_mcts_search, mocker):
+    root, expansion_strategy, _ = setup_mcts_search
+    actions, priors = expansion_strategy.get_actions(root.state.expandable_mols)
+    records = [
+        ActionRecord(expansion_strategy.key, action.mol, idx, idx, prior)
+        for idx, (action, prior) in enumerate(zip(actions, priors))
+    ]
+    mocker.patch.object(
+        expansion_strategy, "get_action_records", return_value=(records, priors)
+    )
+    make_action = mocker.patch.object(
+        expansion_strategy,
+        "make_action",
+        side_effect=lambda record: actions[record.template_index],
+    )
+
+    root.expand()
+
+    make_action.assert_not_called()
+
+    root.promising_child()
+
+    make_action.assert_called_once_with(records[0])
+
+    view = root.children_view()
+    assert view["actions"] == actions
+    assert view["priors"] == [0.7, 0.5, 0.3]
+
+
 def test_expand_root_with_default_priors(setup_mcts_search, set_default_prior):
     root, _, _ = setup_mcts_search
     set_default_prior(0.01)
@@ -135,6 +167,30 @@ def test_backpropagate(setup_mcts_search):
     assert view_prior["values"][1:] == view_post["values"][1:]
 
 
+def test_backpropagate_uses_child_index(setup_mcts_search):
+    root, _, _ = setup_mcts_search
+    root.expand()
+    child = root.promising_child()
+    root.backpropagate(child, 1.5)
+
+    # Grow the statistics past the capacity of the arrays
+    for _ in range(5):
+        root._expand_children_lists(0, 1)
+
+    view = root.children_view()
+    assert len(view["values"]) == 8
+    assert view["values"][3:] == [view["values"][0]] * 5
+    assert view["visitations"][3:] == [2] * 5
+    assert child._index_in_parent == 0
+    assert root[child]["visitations"] == 2
+
+    root.backpropagate(child, 1.0)
+
+    view = root.children_view()
+    assert view["visitations"][0] == 3
+    assert view["visitations"][3:] == [2] * 5
+
+
 def test_expand_dead_end(setup_policies, generate_root):
     root_smiles = "CCCCOc1ccc(CC(=O)N(C)O)cc1"
     expansions = {root_smiles: []}
@@ -163,3 +219,33 @@ def test_expand_recursive(setup_policies, generate_root, default_config):
     child = node.promising_child()
 
     assert child is None
+
+
+def test_degenerate_children_by_state(setup_policies, generate_root, default_config):
+    root_smiles = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    reactants_smiles = "CN1CCC(Cl)CC1.N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"
+    expansions = {
+        root_smiles: [
+            {"smiles": reactants_smiles, "prior": 0.7},
+            {"smiles": reactants_smiles, "prior": 0.5},
+            {"smiles": "CN1CCC(Cl)CC1.N#Cc1cccc(N)c1F", "prior": 0.3},
+        ]
+    }
+    setup_policies(expansions)
+    default_config.search.algorithm_config["mcts_grouping"] = "full"
+    node = generate_root(root_smiles, default_config)
+    node.expand()
+
+    (child1,) = node._instantiate_child(0)
+    degenerate_children = node._instantiate_child(1)
+    (child2,) = node._instantiate_child(2)
+
+    view = node.children_view()
+    assert degenerate_children == []
+    assert view["objects"] == [child1, None, child2]
+    assert view["values"][1] == -1e6
+    assert len(view["actions"][0].metadata["additional_actions"]) == 1
+    assert node._children_by_state == {
+        hash(child1.state): child1,
+        hash(child2.state): child2,
+    }
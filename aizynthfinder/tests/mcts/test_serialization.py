@@ -156,3 +156,4 @@ def test_serialize_deserialize_tree(
     assert new_child.is_expanded
     assert str(root_new.state) == str(root.state)
     assert str(new_child.state) == str(child.state)
+    assert new_tree.nodes() == [root_new, new_child] + new_child.children
@@ -0,0 +1,45 @@
+from aizynthfinder.chem import TreeMolecule
+from aizynthfinder.search.mcts.state import MctsState
+
+
+def test_state_from_parent(default_config, setup_stock):
+    setup_stock(default_config, "CCN", "O")
+    mol1 = TreeMolecule(smiles="CCNC(=O)CCO", parent=None)
+    mol2 = TreeMolecule(smiles="O", parent=None)
+    mol3 = TreeMolecule(smiles="c1ccccc1", parent=None)
+    parent = MctsState([mol1, mol2, mol3], default_config)
+    reactants = [
+        TreeMolecule(smiles="CCN", parent=mol1),
+        TreeMolecule(smiles="OC(=O)CCO", parent=mol1),
+    ]
+
+    state = MctsState.from_parent(parent, mol1, reactants, default_config)
+    expected = MctsState([mol2, mol3] + reactants, default_config)
+
+    assert state.mols == expected.mols
+    assert state.in_stock_list == [True, False, True, False]
+    assert state.in_stock_list == expected.in_stock_list
+    assert state.expandable_mols == expected.expandable_mols
+    assert state.max_transforms == expected.max_transforms == 1
+    assert not state.is_solved
+    assert not state.is_terminal
+    assert state == expected
+    assert hash(state) == hash(expected)
+    assert state.expandables_hash == expected.expandables_hash
+
+
+def test_solved_state_from_parent(default_config, setup_stock):
+    setup_stock(default_config, "CCN", "OC(=O)CCO")
+    mol1 = TreeMolecule(smiles="CCNC(=O)CCO", parent=None)
+    parent = MctsState([mol1], default_config)
+    reactants = [
+        TreeMolecule(smiles="CCN", parent=mol1),
+        TreeMolecule(smiles="OC(=O)CCO", parent=mol1),
+    ]
+
+    state = MctsState.from_parent(parent, mol1, reactants, default_config)
+
+    assert state.is_solved
+    assert state.is_terminal
+    assert state.expandable_mols == []
+    assert state == MctsState(reactants, default_config)
@@ -1,3 +1,8 @@
+from aizynthfinder.chem import RetroReaction, TreeMolecule
+from aizynthfinder.context.policy import ActionRecord
+from aizynthfinder.search.mcts.search import MctsSearchTree, TranspositionRecord
+
+
 def test_select_leaf_root(setup_complete_mcts_tree):
     tree, nodes = setup_complete_mcts_tree
     nodes[0].is_expanded = False
@@ -48,3 +53,98 @@ def test_create_graph(setup_complete_mcts_tree):
     assert len(graph) == 3
     assert list(graph.successors(nodes[0])) == [nodes[1]]
     assert list(graph.successors(nodes[1])) == [nodes[2]]
+
+
+def test_node_registry(setup_complete_mcts_tree):
+    tree, nodes = setup_complete_mcts_tree
+
+    assert tree.nodes() == nodes
+    assert tree.leaves() == [nodes[2]]
+
+    tree.root = nodes[1]
+
+    assert tree.nodes() == nodes[1:]
+    assert tree.leaves() == [nodes[2]]
+
+
+def test_add_remove_virtual_loss(setup_complete_mcts_tree):
+    tree, nodes = setup_complete_mcts_tree
+    visitations = nodes[0].children_view()["visitations"]
+
+    nodes[0].add_virtual_loss(nodes[1])
+
+    view = nodes[0].children_view()
+    assert view["visitations"][0] == visitations[0] + 1
+
+    nodes[0].remove_virtual_loss(nodes[1])
+
+    assert nodes[0].children_view()["visitations"] == visitations
+
+
+def test_transposition_record_expansion():
+    mol1 = TreeMolecule(smiles="CCO", parent=None)
+    mol2 = TreeMolecule(smiles="CCN", parent=None)
+    other_mol1 = TreeMolecule(smiles="CCO", parent=None)
+    other_mol2 = TreeMolecule(smiles="CCN", parent=None)
+    record = TranspositionRecord()
+    actions = [
+        ActionRecord("dummy", mol1, 0, 0, 0.7),
+        ActionRecord("dummy", mol2, 1, 0, 0.3),
+    ]
+
+    record.store_expansion(actions, [0.7, 0.3])
+    new_actions, priors = record.expansion([other_mol2, other_mol1])
+
+    assert record.has_expansion
+    assert [action.mol for action in new_actions] == [other_mol1, other_mol2]
+    assert new_actions[0].mol is other_mol1
+    assert [action.template_index for action in new_actions] == [0, 1]
+    assert priors == [0.7, 0.3]
+
+
+def test_transposition_record_reactions_not_stored(mocker):
+    record = TranspositionRecord()
+
+    record.store_expansion([mocker.MagicMock(spec=RetroReaction)], [1.0])
+
+    assert not record.has_expansion
+
+
+def test_transposition_table(setup_complete_mcts_tree):
+    tree, nodes = setup_complete_mcts_tree
+    tree.transpositions = {}
+
+    record = tree.transposition(nodes[1].state)
+    record.add_visit(0.5)
+    record.add_visit(0.25)
+
+    assert tree.transposition(nodes[1].state) is record
+    assert tree.transposition(nodes[2].state) is not record
+    assert record.nodes == 2
+    assert record.visitations == 2
+    assert record.value == 0.75
+
+
+def test_transposition_reward_shared(setup_complete_mcts_tree):
+    tree, nodes = setup_complete_mcts_tree
+    record = TranspositionRecord()
+    record.reward = 0.5
+    nodes[1].transposition = record
+
+    assert tree.compute_reward(nodes[1]) == 0.5
+
+
+def test_transposition_reward_not_shared(setup_complete_mcts_tree, default_config):
+    _, nodes = setup_complete_mcts_tree
+    default_config.search.algorithm_config["search_rewards"] = [
+        "state score",
+        "number of reactions",
+    ]
+    default_config.search.algorithm_config["search_rewards_weights"] = [1.0, 1.0]
+    tree = MctsSearchTree(default_config)
+    record = TranspositionRecord()
+    record.reward = 0.5
+    nodes[1].transposition = record
+
+    assert tree.compute_reward(nodes[1]) != 0.5
+    assert record.reward == 0.5
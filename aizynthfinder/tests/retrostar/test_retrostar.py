@@ -117,6 +117,35 @@ def test_split_andor_tree(shared_datadir, default_config):
     assert len(routes) == 97
 
 
+def test_select_from_frontier(shared_datadir, default_config):
+    def lowest_target_value():
+        scores = [
+            node.target_value if node.expandable else np.inf for node in tree.mol_nodes
+        ]
+        return tree.mol_nodes[int(np.argmin(scores))]
+
+    tree = SearchTree.from_json(
+        str(shared_datadir / "andor_tree_for_clustering.json"), default_config
+    )
+
+    node = tree._select()
+    assert node is lowest_target_value()
+
+    tree._update(node)
+
+    assert not node.expandable
+    assert tree._select() is lowest_target_value()
+
+    # Make the target value of the last expandable node the lowest one
+    last_node = [node for node in tree.mol_nodes if node.expandable][-1]
+    changed = last_node.parent.update(-100, from_mol=last_node.mol)
+    tree._update_frontier(changed)
+
+    assert last_node.parent in changed
+    assert tree._select() is last_node
+    assert tree._select() is lowest_target_value()
+
+
 def test_update(shared_datadir, default_config, setup_stock):
     # Todo: re-write
     setup_stock(
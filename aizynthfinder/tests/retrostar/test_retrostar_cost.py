@@ -15,6 +15,25 @@ def test_retrostar_cost(setup_mocked_model):
     assert pytest.approx(cost.calculate(mol), abs=0.001) == 30
 
 
+def test_retrostar_cost_many(setup_mocked_model, mocker):
+    mols = [Molecule(smiles="CCCC"), Molecule(smiles="CCCCO"), Molecule(smiles="CCCC")]
+    cost = RetroStarCost(model_path="dummy", fingerprint_length=10, deterministic=True)
+    predict_spy = mocker.spy(cost, "_predict")
+
+    costs = cost.calculate_many(mols)
+
+    assert cost.deterministic
+    assert len(costs) == 3
+    assert pytest.approx(costs[0], abs=0.001) == 30
+    assert costs[2] == costs[0]
+    assert predict_spy.call_count == 1
+    assert predict_spy.call_args[0][0].shape == (3, 10)
+
+    # The costs are now cached
+    assert cost.calculate_many(mols[:2]) == costs[:2]
+    assert predict_spy.call_count == 1
+
+
 def test_zero_molecule_cost():
     mol = Molecule(smiles="CCCC")
 
@@ -32,6 +51,22 @@ def test_molecule_cost_zero(default_config):
     assert molecule_cost == 0.0
 
 
+def test_molecule_cost_precompute(default_config, mocker):
+    molecule_cost = MoleculeCost(default_config)
+    calculate_many_spy = mocker.spy(molecule_cost.molecule_cost, "calculate_many")
+    calculate_spy = mocker.spy(molecule_cost.molecule_cost, "calculate")
+    mols = [Molecule(smiles="CCCC"), Molecule(smiles="CCCCO")]
+
+    molecule_cost.precompute(mols)
+
+    assert molecule_cost(mols[1]) == 0.0
+    calculate_many_spy.assert_called_once_with(mols)
+    calculate_spy.assert_not_called()
+
+    assert molecule_cost(Molecule(smiles="CCCCN")) == 0.0
+    calculate_spy.assert_called_once()
+
+
 def test_molecule_cost_retrostar(default_config, setup_mocked_model):
     default_config.search.algorithm_config["molecule_cost"] = {
         "cost": "aizynthfinder.search.retrostar.cost.RetroStarCost",
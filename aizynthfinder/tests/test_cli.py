@@ -9,7 +9,7 @@ import pytest
 import yaml
 
 from aizynthfinder.analysis import RouteCollection
-from aizynthfinder.chem import MoleculeException
+from aizynthfinder.chem import Molecule, MoleculeException
 from aizynthfinder.interfaces import AiZynthApp
 from aizynthfinder.interfaces.aizynthapp import main as app_main
 from aizynthfinder.interfaces.aizynthcli import main as cli_main
@@ -386,6 +386,24 @@ def test_make_stock_from_plain_file(
     assert len(default_config.stock) == 3
 
 
+def test_make_mmap_stock_in_processes(
+    create_dummy_smiles_source, tmpdir, add_cli_arguments, default_config
+):
+    output_name = str(tmpdir / "temp.mmap")
+    filename = create_dummy_smiles_source("txt")
+    add_cli_arguments(
+        f"--files {filename} --output {output_name} --target mmap "
+        "--nprocs 2 --chunk_size 2"
+    )
+
+    make_stock_main()
+
+    default_config.stock.load_from_config(stock1=output_name)
+    default_config.stock.select(["stock1"])
+    assert len(default_config.stock) == 3
+    assert Molecule(smiles="CCO") in default_config.stock
+
+
 def test_cat_main(tmpdir, add_cli_arguments, create_dummy_stock1, create_dummy_stock2):
     filename = str(tmpdir / "output.hdf")
     inputs = [create_dummy_stock1("hdf5"), create_dummy_stock2]
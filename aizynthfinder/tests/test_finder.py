@@ -268,6 +268,162 @@ def test_two_expansions_two_children(setup_aizynthfinder):
     assert nodes[4].created_at_iteration == 2
 
 
+def test_two_expansions_two_children_batched(setup_aizynthfinder):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    child2_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: [
+            {"smiles": ".".join(child1_smi), "prior": 0.7},
+            {"smiles": ".".join(child2_smi), "prior": 0.3},
+        ],
+        child1_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+        child2_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+    }
+    finder = setup_aizynthfinder(
+        lookup, [child1_smi[0], child1_smi[2]] + grandchild_smi
+    )
+    finder.config.search.algorithm_config["batch_size"] = 4
+
+    finder.tree_search()
+
+    nodes = list(finder.tree.graph())
+    assert len(nodes) == 5
+    assert state_smiles(nodes[0].state) == [root_smi]
+    assert finder.search_stats["iterations"] == 100
+    assert finder.search_stats["iterations_per_second"] > 0
+    assert finder.tree.profiling["iterations"] >= 100
+    # All the virtual losses are removed again
+    view = nodes[0].children_view()
+    assert sum(view["visitations"]) == finder.tree.profiling["iterations"] + 2
+
+
+def test_two_expansions_ensemble(setup_aizynthfinder):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    child2_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: [
+            {"smiles": ".".join(child1_smi), "prior": 0.7},
+            {"smiles": ".".join(child2_smi), "prior": 0.3},
+        ],
+        child1_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+        child2_smi[1]: {"smiles": ".".join(grandchild_smi), "prior": 0.7},
+    }
+    finder = setup_aizynthfinder(
+        lookup, [child1_smi[0], child1_smi[2]] + grandchild_smi
+    )
+    finder.config.search.algorithm = (
+        "aizynthfinder.search.mcts.ensemble.MctsEnsembleSearch"
+    )
+    finder.config.search.algorithm_config["ensemble_size"] = 3
+    finder.config.search.algorithm_config["ensemble_processes"] = 2
+    finder.config.search.iteration_limit = 10
+
+    finder.tree_search()
+    finder.build_routes()
+
+    assert finder.search_stats["iterations"] == 2
+    assert finder.tree.seeds == [0, 1, 2]
+    assert finder.tree.profiling["ensemble_size"] == 3
+    assert finder.tree.profiling["iterations"] == 30
+    # The same routes are found by all the trees, but are only kept once
+    routes = finder.tree.routes()
+    assert len({route.hash_key() for route in routes}) == len(routes)
+    assert routes[0].is_solved
+    assert finder.routes.reaction_trees[0].is_solved
+    assert len(finder.routes.reaction_trees) <= len(routes)
+    assert finder.extract_statistics()["is_solved"]
+
+
+def test_phase_profile(setup_aizynthfinder):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F", "O"]
+    lookup = {root_smi: {"smiles": ".".join(child1_smi), "prior": 1.0}}
+    finder = setup_aizynthfinder(lookup, child1_smi)
+
+    finder.tree_search()
+    finder.build_routes()
+
+    assert finder.extract_statistics()["phase_profile"] == {}
+
+    finder.config.search.profile_phases = True
+    finder.prepare_tree()
+    finder.tree_search()
+    finder.build_routes()
+
+    profile = finder.extract_statistics()["phase_profile"]
+    assert profile["expansion policy"]["calls"] == 1
+    assert profile["stock lookup"]["calls"] > 0
+    assert profile["scoring: state score"]["calls"] > 0
+    assert all(phase["time"] >= 0.0 for phase in profile.values())
+
+
+def test_transposition_table(setup_aizynthfinder):
+    """
+    Test the building of this tree, where the same state is reached twice:
+                root
+                  |
+                child 1
+                /     \\
+          child 2    child 3
+                \\     /
+            child 4 child 5 (same state)
+    """
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild1_smi = "CN1CCC(Br)CC1"
+    grandchild2_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: {"smiles": ".".join(child1_smi), "prior": 1.0},
+        child1_smi[0]: {"smiles": grandchild1_smi, "prior": 0.5},
+        child1_smi[1]: {"smiles": ".".join(grandchild2_smi), "prior": 0.5},
+    }
+    finder = setup_aizynthfinder(lookup, grandchild2_smi)
+    finder.config.search.algorithm_config["transposition_table"] = True
+
+    finder.tree_search()
+
+    leaves = [node for node in finder.tree.graph() if not node.children]
+    assert len(leaves) == 2
+    assert leaves[0].state == leaves[1].state
+    assert leaves[0].transposition is leaves[1].transposition
+    assert leaves[0].transposition.nodes == 2
+    assert len(finder.tree.transpositions) == 5
+    # Both paths are explored, and the visits are pooled in the shared record
+    visits = [node.parent[node]["visitations"] - 1 for node in leaves]
+    assert min(visits) > 0
+    assert leaves[0].transposition.visitations == sum(visits)
+
+
+def test_transposition_table_pooled_q(setup_aizynthfinder):
+    root_smi = "CN1CCC(C(=O)c2cccc(NC(=O)c3ccc(F)cc3)c2F)CC1"
+    child1_smi = ["CN1CCC(Cl)CC1", "N#Cc1cccc(NC(=O)c2ccc(F)cc2)c1F"]
+    grandchild1_smi = "CN1CCC(Br)CC1"
+    grandchild2_smi = ["N#Cc1cccc(N)c1F", "O=C(Cl)c1ccc(F)cc1"]
+    lookup = {
+        root_smi: {"smiles": ".".join(child1_smi), "prior": 1.0},
+        child1_smi[0]: {"smiles": grandchild1_smi, "prior": 0.5},
+        child1_smi[1]: {"smiles": ".".join(grandchild2_smi), "prior": 0.5},
+    }
+    finder = setup_aizynthfinder(lookup, grandchild2_smi)
+    finder.config.search.algorithm_config["transposition_table"] = True
+
+    finder.tree_search()
+
+    leaves = [node for node in finder.tree.graph() if not node.children]
+    record = leaves[0].transposition
+    assert record.nodes == 2
+    for leaf in leaves:
+        parent = leaf.parent
+        children_q = parent._children_q()
+        assert children_q[parent._child_index(leaf)] == pytest.approx(
+            (0.5 + record.value) / (1 + record.visitations)
+        )
+
+
 def test_three_expansions(setup_aizynthfinder):
     """
     Test the building of this tree:
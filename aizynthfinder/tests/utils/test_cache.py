@@ -0,0 +1,50 @@
+from aizynthfinder.utils.cache import LruCache, SqliteStore
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LruCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+
+    assert cache.get("a") == 1
+
+    cache["c"] = 3
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+def test_lru_cache_get_or_create():
+    cache = LruCache(maxsize=10)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_create("key", factory) == "value"
+    assert cache.get_or_create("key", factory) == "value"
+    assert cache.get("missing") is None
+
+    assert len(calls) == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+    cache.clear()
+
+    assert cache.stats() == {"size": 0, "hits": 0, "misses": 0}
+
+
+def test_sqlite_store(tmpdir):
+    filename = str(tmpdir / "store.sqlite")
+    store = SqliteStore(filename)
+
+    store["a"] = b"\x00\x01"
+    store.commit()
+    store.close()
+    store2 = SqliteStore(filename)
+
+    assert len(store2) == 1
+    assert "a" in store2
+    assert store2.get("a") == b"\x00\x01"
+    assert store2.get("b") is None
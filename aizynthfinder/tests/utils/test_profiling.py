@@ -0,0 +1,38 @@
+from aizynthfinder.utils.profiling import PhaseProfiler
+
+
+def test_disabled_profiler_does_not_time():
+    profiler = PhaseProfiler()
+
+    with profiler.phase("stock lookup"):
+        pass
+
+    assert not profiler.enabled
+    assert profiler.stats() == {}
+
+
+def test_profiler_accumulates_phases():
+    profiler = PhaseProfiler()
+    profiler.enable()
+
+    with profiler.phase("stock lookup"):
+        pass
+    with profiler.phase("stock lookup"):
+        pass
+    profiler.add("scoring", 0.5)
+
+    stats = profiler.stats()
+    assert list(stats) == ["scoring", "stock lookup"]
+    assert stats["stock lookup"]["calls"] == 2
+    assert stats["stock lookup"]["time"] >= 0.0
+    assert stats["scoring"] == {"time": 0.5, "calls": 1}
+
+    profiler.disable()
+    with profiler.phase("stock lookup"):
+        pass
+
+    assert profiler.stats()["stock lookup"]["calls"] == 2
+
+    profiler.enable()
+
+    assert profiler.stats() == {}
@@ -14,11 +14,12 @@ from route_finders.route_finder import RouteFinder
 from aizynthfinder.aizynthfinder import AiZynthFinder
 
 class AizRouteFinder(RouteFinder):
-    def __init__(self, configfile, smiles, nproc, configdict=None):
+    def __init__(self, configfile, smiles, nproc, configdict=None, profile_phases=False):
         self.configfile = configfile
         self.smiles = smiles
         self.nproc = nproc
         self.configdict = configdict
+        self.profile_phases = profile_phases
        
     def process_smiles(self, smi, finder):
         """
@@ -30,7 +31,9 @@ class AizRouteFinder(RouteFinder):
         :type smi: str
         :param finder: Route finder object that implements the retrosynthetic search algorithm
         :type finder: AiZynthFinder object
-        :return: Dictionary containing search statistics and generated routes
+        :return: Dictionary containing search statistics and generated routes,
+            with the time spent in each phase of the search in 'phase_profile'
+            if phase profiling is enabled
         :rtype: dict
         """
         
@@ -47,6 +50,8 @@ class AizRouteFinder(RouteFinder):
             finder = AiZynthFinder(configfile=self.configfile)
         else:
             finder = AiZynthFinder(configdict=self.configdict)
+        if self.profile_phases:
+            finder.config.search.profile_phases = True
 
         finder.stock.select('molport')
         finder.expansion_policy.select('uspto')
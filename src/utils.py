@@ -192,6 +192,8 @@ def generate_aiz_configs(config, type, templates):
         
         if type == 'novel':
             config['expansion']['uspto']['novel_template_path'] = templates
+            # applicable novel templates per molecule, re-used by later runs
+            config['search']['custom_templates_store'] = os.path.splitext(templates)[0] + '_applicability.sqlite'
         
         return config
     else: